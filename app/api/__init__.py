@@ -2,4 +2,6 @@ from .auth import router as auth_router
 from .user import router as user_router
 from .category import router as category_router
 from .budget import router as budget_router
-from .expense import router as expense_router
\ No newline at end of file
+from .expense import router as expense_router
+from .dashboard import router as dashboard_router
+from .sync import router as sync_router
\ No newline at end of file
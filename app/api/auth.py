@@ -1,69 +1,107 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 from datetime import timedelta
 
-from ..database import get_db
+from ..database import RequestDB, UnitOfWorkRoute, get_db
 from ..schemas.user import UserCreate, UserResponse, Token
 from ..crud import user as crud_user
-from ..auth.password import verify_password
-from ..auth.jwt import create_access_token, verify_token
+from ..crud.user import user_snapshot
+from ..auth.password import PasswordHasherBusy, get_password_hash_async, verify_and_update_password_async
+from ..auth.jwt import create_access_token, decode_access_token
+from ..auth.principal_cache import principal_cache
+from ..models.user import User
 from ..config import settings
 from ..utils.email import send_welcome_email
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=UnitOfWorkRoute)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 # Dependency to get current user
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: RequestDB = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token_data = verify_token(token, credentials_exception)
-    user = crud_user.get_user_by_username(db, username=token_data.username)
-    
-    if user is None:
-        raise credentials_exception
-    
-    return user
+    cached = principal_cache.get(token)
+    if cached is not None:
+        _, snapshot = cached
+    else:
+        claims = decode_access_token(token, credentials_exception)
+        user = await db.run(crud_user.get_user_by_username, username=claims["sub"])
+        
+        if user is None:
+            raise credentials_exception
+        
+        snapshot = user_snapshot(user)
+        principal_cache.put(token, claims, snapshot)
+    # A fresh transient instance per request, on a cache hit or a miss alike:
+    # only its columns are set, and relationships on it are always empty
+    # rather than loaded, so handlers must query through crud instead
+    return User(**snapshot)
+
+def _hasher_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is temporarily overloaded, please retry",
+        headers={"Retry-After": "1"},
+    )
 
+# bcrypt runs on the dedicated password pool, so a hash in flight holds
+# neither a request threadpool worker nor a pooled database connection.
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: RequestDB = Depends(get_db)):
     # Check if user already exists
-    db_user = crud_user.get_user_by_email(db, email=user.email)
-    if db_user:
+    if await db.run(crud_user.email_exists, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    db_user = crud_user.get_user_by_username(db, username=user.username)
-    if db_user:
+    if await db.run(crud_user.username_exists, user.username):
         raise HTTPException(status_code=400, detail="Username already taken")
     
+    # Return the connection to the pool while bcrypt runs
+    await db.close()
+    try:
+        hashed_password = await get_password_hash_async(user.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    
     # Create user
-    new_user = crud_user.create_user(db=db, user=user)
+    new_user = await db.run(crud_user.create_user, user, hashed_password)
     
-    # Send welcome email
+    # Queue welcome email
     try:
-        send_welcome_email(new_user.email, new_user.username)
+        await db.run(send_welcome_email, new_user.email, new_user.username)
     except Exception as e:
-        print(f"Failed to send welcome email: {e}")
+        print(f"Failed to queue welcome email: {e}")
     
     return new_user
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud_user.get_user_by_username(db, username=form_data.username)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: RequestDB = Depends(get_db)):
+    user = await db.run(crud_user.get_user_by_username, form_data.username)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        # Return the connection to the pool while bcrypt runs; user stays loaded
+        await db.close()
+        try:
+            valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+        except PasswordHasherBusy:
+            raise _hasher_busy()
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Cost parameters changed since this hash was made
+    if new_hash:
+        await db.run(crud_user.update_password_hash, user.id, new_hash)
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -72,5 +110,5 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user = Depends(get_current_user)):
+async def read_users_me(current_user = Depends(get_current_user)):
     return current_user
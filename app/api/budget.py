@@ -1,110 +1,167 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Optional, Union
 from datetime import datetime
 
-from ..database import get_db
-from ..schemas.budget import BudgetCreate, BudgetUpdate, BudgetResponse
+from ..config import settings
+from ..database import RequestDB, UnitOfWorkRoute, get_db
+from ..schemas.budget import BudgetCreate, BudgetUpdate, BudgetResponse, BudgetPage
 from ..crud import budget as crud_budget
 from ..crud import category as crud_category
-from ..crud import expense as crud_expense
 from ..models.user import User
+from ..result_cache import BUDGET_SUMMARY, result_cache
+from ..utils.dates import month_span, months_between
+from ..utils.fast_json import fast_json_response
+from ..utils.pagination import decode_id_cursor, page
 from .auth import get_current_user
+from .etag import check_data_etag
 
-router = APIRouter(prefix="/budgets", tags=["Budgets"])
+router = APIRouter(prefix="/budgets", tags=["Budgets"], route_class=UnitOfWorkRoute)
 
-@router.get("/", response_model=List[BudgetResponse])
-def get_budgets(
-    skip: int = 0,
-    limit: int = 100,
+async def _summary_rows(db: RequestDB, user_id: int, months: list, data_version: int) -> list:
+    """get_budget_summary rows for consecutive months, from the result cache
+    where it has them for data_version and one query spanning the months it doesn't"""
+    by_month = {month: result_cache.get(user_id, BUDGET_SUMMARY, month, data_version) for month in months}
+    missing = [month for month, rows in by_month.items() if rows is None]
+    if missing:
+        ticket = result_cache.ticket()
+        rows = await db.run(crud_budget.get_budget_summary, user_id, missing[0], missing[-1])
+        fetched = {month: [] for month in missing}
+        for row in rows:
+            if row["month"] in fetched:
+                fetched[row["month"]].append(row)
+        # Empty months outside the ones that had budgets are left uncached,
+        # so a wide range can't fill the cache with empty lists
+        found = [month for month, month_rows in fetched.items() if month_rows]
+        for month, month_rows in fetched.items():
+            if found and found[0] <= month <= found[-1]:
+                result_cache.put(user_id, BUDGET_SUMMARY, month, month_rows, ticket, data_version)
+        by_month.update(fetched)
+    return [row for month in months for row in by_month[month]]
+
+@router.get("/", response_model=Union[List[BudgetResponse], BudgetPage], dependencies=[Depends(check_data_etag)])
+async def get_budgets(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    return crud_budget.get_budgets(db, current_user.id, skip, limit)
+    """List budgets. Passing `cursor` (empty for the first page) switches to keyset pagination."""
+    if cursor is not None:
+        try:
+            after_id = decode_id_cursor(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        rows = await db.run(crud_budget.get_budgets_page, current_user.id, limit + 1, after_id)
+        items, next_cursor = page(rows, limit, lambda budget: (budget["id"],))
+        return fast_json_response({"items": items, "next_cursor": next_cursor}, BudgetPage, response)
+    
+    rows = await db.run(crud_budget.get_budgets, current_user.id, skip, limit)
+    return fast_json_response(rows, List[BudgetResponse], response)
 
 @router.post("/", response_model=BudgetResponse, status_code=status.HTTP_201_CREATED)
-def create_budget(
+async def create_budget(
     budget: BudgetCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
     # Verify category belongs to user
-    category = crud_category.get_category_by_id(db, budget.category_id, current_user.id)
-    if not category:
+    if not await db.run(crud_category.category_exists, budget.category_id, current_user.id):
         raise HTTPException(status_code=404, detail="Category not found")
     
     # Check if budget already exists for this category and month
-    existing = crud_budget.get_budget_by_category(db, budget.category_id, budget.month, current_user.id)
-    if existing:
+    if await db.run(crud_budget.budget_exists, budget.category_id, budget.month, current_user.id):
         raise HTTPException(status_code=400, detail="Budget already exists for this category and month")
     
-    db_budget = crud_budget.create_budget(db, budget, current_user.id)
+    db_budget = await db.run(crud_budget.create_budget, budget, current_user.id)
     if not db_budget:
         raise HTTPException(status_code=400, detail="Failed to create budget")
     
     return db_budget
 
 @router.get("/summary")
-def get_budget_summary(
+async def get_budget_summary(
     month: str = None,
+    month_from: Optional[str] = Query(None, alias="from"),
+    month_to: Optional[str] = Query(None, alias="to"),
+    data_version: int = Depends(check_data_etag),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    """Get budget vs actual spending summary for all categories"""
-    if not month:
-        month = datetime.now().strftime("%Y-%m")
+    """Get budget vs actual spending summary for all categories.
     
-    budgets = crud_budget.get_budgets(db, current_user.id)
-    summary = []
-    
-    for budget in budgets:
-        if budget.month == month:
-            category = crud_category.get_category_by_id(db, budget.category_id, current_user.id)
-            spent = crud_expense.get_total_spent_by_category_month(
-                db, budget.category_id, current_user.id, month
-            )
-            
-            summary.append({
-                "category": category.name,
-                "budget": budget.amount,
-                "spent": spent,
-                "remaining": budget.amount - spent,
-                "percentage": (spent / budget.amount * 100) if budget.amount > 0 else 0,
-                "status": "exceeded" if spent > budget.amount else "within"
+    With `from`/`to` (YYYY-MM) the response is a budget-vs-actual matrix
+    covering every month in the range instead of a single month's list.
+    """
+    if month_from or month_to:
+        month_from = month_from or month_to
+        month_to = month_to or month_from
+        try:
+            span = month_span(month_from, month_to)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid month, expected YYYY-MM")
+        if span < 1:
+            raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+        if span > settings.SUMMARY_MAX_MONTHS:
+            raise HTTPException(status_code=400, detail=f"Range spans more than {settings.SUMMARY_MAX_MONTHS} months")
+        months = months_between(month_from, month_to)
+        
+        rows = await _summary_rows(db, current_user.id, months, data_version)
+        
+        matrix = {}
+        for row in rows:
+            entry = matrix.setdefault(row["category_id"], {
+                "category_id": row["category_id"],
+                "category": row["category"],
+                "months": {}
             })
+            entry["months"][row["month"]] = {
+                key: row[key] for key in ("budget", "spent", "remaining", "percentage", "status", "projected_spend", "projected_overrun_date")
+            }
+        
+        return {
+            "from": month_from,
+            "to": month_to,
+            "months": months,
+            "categories": sorted(matrix.values(), key=lambda entry: entry["category"])
+        }
+    
+    if not month:
+        month = datetime.now().strftime("%Y-%m")
     
-    return summary
+    return await _summary_rows(db, current_user.id, [month], data_version)
 
 @router.get("/{budget_id}", response_model=BudgetResponse)
-def get_budget(
+async def get_budget(
     budget_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    budget = crud_budget.get_budget_by_id(db, budget_id, current_user.id)
+    budget = await db.run(crud_budget.get_budget_by_id, budget_id, current_user.id)
     if not budget:
         raise HTTPException(status_code=404, detail="Budget not found")
     return budget
 
 @router.put("/{budget_id}", response_model=BudgetResponse)
-def update_budget(
+async def update_budget(
     budget_id: int,
     budget_update: BudgetUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    budget = crud_budget.update_budget(db, budget_id, current_user.id, budget_update)
+    budget = await db.run(crud_budget.update_budget, budget_id, current_user.id, budget_update)
     if not budget:
         raise HTTPException(status_code=404, detail="Budget not found")
     return budget
 
 @router.delete("/{budget_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_budget(
+async def delete_budget(
     budget_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    success = crud_budget.delete_budget(db, budget_id, current_user.id)
+    success = await db.run(crud_budget.delete_budget, budget_id, current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="Budget not found")
     return None
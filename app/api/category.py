@@ -1,66 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Optional, Union
 
-from ..database import get_db
-from ..schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
+from ..database import RequestDB, UnitOfWorkRoute, get_db
+from ..schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse, CategoryPage
 from ..crud import category as crud_category
+from ..utils.fast_json import fast_json_response
+from ..utils.pagination import decode_id_cursor, page
 from .auth import get_current_user
+from .etag import check_data_etag
 
-router = APIRouter(prefix="/categories", tags=["Categories"])
+router = APIRouter(prefix="/categories", tags=["Categories"], route_class=UnitOfWorkRoute)
 
-@router.get("/", response_model=List[CategoryResponse])
-def get_categories(
-    skip: int = 0,
-    limit: int = 100,
+@router.get("/", response_model=Union[List[CategoryResponse], CategoryPage], dependencies=[Depends(check_data_etag)])
+async def get_categories(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    return crud_category.get_categories(db, current_user.id, skip, limit)
+    """List categories. Passing `cursor` (empty for the first page) switches to keyset pagination."""
+    if cursor is not None:
+        try:
+            after_id = decode_id_cursor(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        rows = await db.run(crud_category.get_categories_page, current_user.id, limit + 1, after_id)
+        items, next_cursor = page(rows, limit, lambda category: (category["id"],))
+        return fast_json_response({"items": items, "next_cursor": next_cursor}, CategoryPage, response)
+    
+    rows = await db.run(crud_category.get_categories, current_user.id, skip, limit)
+    return fast_json_response(rows, List[CategoryResponse], response)
 
 @router.post("/", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
-def create_category(
+async def create_category(
     category: CategoryCreate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
     # Check if category name already exists for this user
-    existing = crud_category.get_category_by_name(db, category.name, current_user.id)
-    if existing:
+    if await db.run(crud_category.category_name_exists, category.name, current_user.id):
         raise HTTPException(status_code=400, detail="Category name already exists")
     
-    return crud_category.create_category(db, category, current_user.id)
+    return await db.run(crud_category.create_category, category, current_user.id)
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-def get_category(
+async def get_category(
     category_id: int,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    category = crud_category.get_category_by_id(db, category_id, current_user.id)
+    category = await db.run(crud_category.get_category_by_id, category_id, current_user.id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     return category
 
 @router.put("/{category_id}", response_model=CategoryResponse)
-def update_category(
+async def update_category(
     category_id: int,
     category_update: CategoryUpdate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    category = crud_category.update_category(db, category_id, current_user.id, category_update)
+    category = await db.run(crud_category.update_category, category_id, current_user.id, category_update)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     return category
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(
+async def delete_category(
     category_id: int,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    success = crud_category.delete_category(db, category_id, current_user.id)
+    success = await db.run(crud_category.delete_category, category_id, current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="Category not found")
     return None
\ No newline at end of file
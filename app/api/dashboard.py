@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+
+from ..database import RequestDB, UnitOfWorkRoute, get_db
+from ..schemas.dashboard import DashboardResponse
+from ..crud import dashboard as crud_dashboard
+from ..crud import expense as crud_expense
+from ..crud.budget import projection_fields
+from ..models.user import User
+from .auth import get_current_user
+from .etag import check_data_etag
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"], route_class=UnitOfWorkRoute)
+
+@router.get("/", response_model=DashboardResponse, dependencies=[Depends(check_data_etag)])
+async def get_dashboard(
+    recent: int = Query(100, ge=0, le=500),
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Everything the dashboard page shows for the current month.
+    
+    One authentication and one session; categories, month totals and the
+    budget summary come from a single query and the newest `recent`
+    expenses from a second one.
+    """
+    month = datetime.now().strftime("%Y-%m")
+    overview = await db.run(crud_dashboard.get_category_overview, current_user.id, month)
+    expenses = await db.run(crud_expense.get_expenses_page, current_user.id, recent) if recent else []
+    
+    budget_summary = [
+        {
+            "budget_id": row.budget_id,
+            "category_id": row.category_id,
+            "category": row.category,
+            "month": month,
+            "budget": row.budget,
+            "spent": row.spent,
+            "remaining": row.budget - row.spent,
+            "percentage": (row.spent / row.budget * 100) if row.budget > 0 else 0,
+            "status": "exceeded" if row.spent > row.budget else "within",
+            **projection_fields(row)
+        }
+        for row in overview if row.budget_id is not None
+    ]
+    
+    total_budget = sum(item["budget"] for item in budget_summary)
+    total_spent = sum(item["spent"] for item in budget_summary)
+    return {
+        "month": month,
+        "categories": [
+            {"id": row.category_id, "name": row.category, "user_id": current_user.id}
+            for row in overview
+        ],
+        "recent_expenses": expenses,
+        "month_totals": [
+            {"category_id": row.category_id, "category": row.category, "total": row.spent, "count": row.count}
+            for row in overview if row.count
+        ],
+        "budget_summary": budget_summary,
+        "totals": {
+            "total_budget": total_budget,
+            "total_spent": total_spent,
+            "remaining": total_budget - total_spent,
+            "budget_count": len(budget_summary)
+        }
+    }
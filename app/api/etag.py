@@ -0,0 +1,40 @@
+from fastapi import Depends, HTTPException, Request, Response, status
+from datetime import datetime
+
+from ..database import RequestDB, get_db
+from ..crud import data_version as crud_data_version
+from ..models.user import User
+from .auth import get_current_user
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison against an If-None-Match list"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+async def check_data_etag(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+) -> int:
+    """Weak ETag for everything derived from the user's data.
+    
+    Every crud write bumps the user's data_version, so the version alone
+    identifies the response. Used as a route dependency it runs before the
+    handler: a matching If-None-Match ends the request with 304 after one
+    primary-key lookup, otherwise the tag is added to the response and the
+    version returned, for routes that also key caches on it.
+    """
+    version = await db.run(crud_data_version.get_data_version, current_user.id)
+    # Summaries default to the current month, so it is part of the tag too
+    etag = f'W/"{current_user.id}-{version}-{datetime.now().strftime("%Y-%m")}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return version
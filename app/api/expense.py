@@ -1,175 +1,632 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+import csv
+import io
+import json
 
-from ..database import get_db
-from ..schemas.expense import ExpenseCreate, ExpenseUpdate, ExpenseResponse
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import List, Optional, Union
+from datetime import date, datetime, time, timedelta
+
+from ..database import RequestDB, UnitOfWorkRoute, get_db
+from ..schemas.expense import (
+    ExpenseCreate, ExpenseUpdate, ExpenseResponse, ExpensePage, ExpenseSearchResult,
+    ExpenseImportRow, ExpenseImportResult, ExpenseImportReport,
+    ExpenseBulkDelete, ExpenseBulkDeleteResult, ExpenseRecategorize, ExpenseRecategorizeResult
+)
 from ..crud import expense as crud_expense
 from ..crud import category as crud_category
 from ..crud import budget as crud_budget
+from ..crud.expense_search import search_terms
 from ..models.user import User
+from ..result_cache import EXPENSE_REPORT, result_cache
+from ..config import settings
 from ..utils.email import send_budget_exceeded_email, send_budget_warning_email
+from ..utils.dates import add_months, bucket_count, bucket_start, buckets_between, month_bounds, months_between
+from ..utils.pagination import decode_date_id_cursor, page
+from ..utils.csv_stream import iter_csv_records
+from ..utils.fast_json import fast_json_response
 from .auth import get_current_user
+from .etag import check_data_etag
+
+router = APIRouter(prefix="/expenses", tags=["Expenses"], route_class=UnitOfWorkRoute)
 
-router = APIRouter(prefix="/expenses", tags=["Expenses"])
+async def _expense_page(db: RequestDB, user_id: int, cursor: str, limit: int, category_id: int = None):
+    """Keyset page ordered newest first; an empty cursor starts from the top"""
+    try:
+        after = decode_date_id_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    rows = await db.run(crud_expense.get_expenses_page, user_id, limit + 1, after, category_id)
+    items, next_cursor = page(rows, limit, lambda expense: (expense["date"], expense["id"]))
+    return {"items": items, "next_cursor": next_cursor}
 
-@router.get("/", response_model=List[ExpenseResponse])
-def get_expenses(
-    skip: int = 0,
-    limit: int = 100,
+@router.get("/", response_model=Union[List[ExpenseResponse], ExpensePage], dependencies=[Depends(check_data_etag)])
+async def get_expenses(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    return crud_expense.get_expenses(db, current_user.id, skip, limit)
+    """List expenses. Passing `cursor` (empty for the first page) switches to keyset pagination."""
+    if cursor is not None:
+        return fast_json_response(await _expense_page(db, current_user.id, cursor, limit), ExpensePage, response)
+    rows = await db.run(crud_expense.get_expenses, current_user.id, skip, limit)
+    return fast_json_response(rows, List[ExpenseResponse], response)
 
 @router.post("/", response_model=ExpenseResponse, status_code=status.HTTP_201_CREATED)
-def create_expense(
+async def create_expense(
     expense: ExpenseCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
     # Verify category belongs to user
-    category = crud_category.get_category_by_id(db, expense.category_id, current_user.id)
-    if not category:
+    category_name = await db.run(crud_category.get_category_name, expense.category_id, current_user.id)
+    if category_name is None:
         raise HTTPException(status_code=404, detail="Category not found")
     
     # Create the expense
-    db_expense = crud_expense.create_expense(db, expense, current_user.id)
+    db_expense = await db.run(crud_expense.create_expense, expense, current_user.id)
     
-    # Check if budget exists and send notifications
+    # Check if budget exists and queue notifications
     current_month = datetime.now().strftime("%Y-%m")
-    budget = crud_budget.get_budget_by_category(db, expense.category_id, current_month, current_user.id)
+    budget_amount = await db.run(crud_budget.get_budget_amount, expense.category_id, current_month, current_user.id)
     
-    if budget:
-        total_spent = crud_expense.get_total_spent_by_category_month(
-            db, expense.category_id, current_user.id, current_month
+    if budget_amount is not None:
+        total_spent = await db.run(
+            crud_expense.get_total_spent_by_category_month,
+            expense.category_id, current_user.id, current_month
         )
         
-        percentage = (total_spent / budget.amount) * 100 if budget.amount > 0 else 0
+        percentage = (total_spent / budget_amount) * 100 if budget_amount > 0 else 0
         
         # Send warning at 80% (and only once - between 80-99%)
         if 80 <= percentage < 100:
             try:
-                send_budget_warning_email(
+                await db.run(
+                    send_budget_warning_email,
                     to_email=current_user.email,
-                    category_name=category.name,
-                    budget_amount=budget.amount,
+                    category_name=category_name,
+                    budget_amount=budget_amount,
                     spent_amount=total_spent
                 )
             except Exception as e:
-                print(f"Failed to send warning email: {e}")
+                print(f"Failed to queue warning email: {e}")
         
         # Send alert when exceeded
-        elif total_spent > budget.amount:
+        elif total_spent > budget_amount:
             try:
-                send_budget_exceeded_email(
+                await db.run(
+                    send_budget_exceeded_email,
                     to_email=current_user.email,
-                    category_name=category.name,
-                    budget_amount=budget.amount,
+                    category_name=category_name,
+                    budget_amount=budget_amount,
                     spent_amount=total_spent
                 )
             except Exception as e:
-                print(f"Failed to send email: {e}")
+                print(f"Failed to queue email: {e}")
     
     return db_expense
 
-@router.get("/report/{year}/{month}")
-def get_monthly_report(
-    year: int,
-    month: int,
+async def _import_records(request: Request):
+    """Yield raw rows from a JSON array or a streamed text/csv body"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    
+    if content_type == "text/csv":
+        async for record in iter_csv_records(request.stream()):
+            yield record
+    elif content_type in ("application/json", ""):
+        try:
+            records = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of expenses")
+        for record in records:
+            yield record
+    else:
+        raise HTTPException(status_code=415, detail="Send application/json or text/csv")
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+async def _notify_budget_crossings(db: RequestDB, current_user: User, imported: dict):
+    """Queue alerts for budgets that this import pushed past 80% or 100%"""
+    months = sorted(month for _, month in imported)
+    summary = await db.run(crud_budget.get_budget_summary, current_user.id, months[0], months[-1])
+    
+    for entry in summary:
+        added = imported.get((entry["category_id"], entry["month"]))
+        if added is None or entry["budget"] <= 0:
+            continue
+        
+        spent, budget = entry["spent"], entry["budget"]
+        before = spent - added
+        if before <= budget < spent:
+            send_email = send_budget_exceeded_email
+        elif before < budget * 0.8 <= spent <= budget:
+            send_email = send_budget_warning_email
+        else:
+            continue
+        
+        try:
+            await db.run(
+                send_email,
+                to_email=current_user.email,
+                category_name=entry["category"],
+                budget_amount=budget,
+                spent_amount=spent
+            )
+        except Exception as e:
+            print(f"Failed to queue email: {e}")
+
+@router.post("/bulk", response_model=ExpenseImportReport)
+async def bulk_import_expenses(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    """Get detailed monthly expense report"""
-    if month < 1 or month > 12:
-        raise HTTPException(status_code=400, detail="Invalid month")
+    """Import many expenses from a JSON array or a CSV upload (Content-Type: text/csv).
+    
+    Each row has description, amount, category_id and an optional date.
+    Valid rows are inserted in one transaction; invalid ones are reported
+    per row without failing the import.
+    """
+    # Don't hold a pooled connection while the body streams in
+    await db.close()
+    
+    results = []
+    rows = []
+    async for record in _import_records(request):
+        if len(results) >= settings.BULK_IMPORT_MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {settings.BULK_IMPORT_MAX_ROWS} rows per import"
+            )
+        result = ExpenseImportResult(row=len(results) + 1, status="error")
+        results.append(result)
+        try:
+            row = ExpenseImportRow.model_validate(record)
+        except ValidationError as e:
+            result.error = _validation_message(e)
+            continue
+        rows.append((result, row))
+    
+    # One ownership check for all distinct categories
+    category_ids = {row.category_id for _, row in rows}
+    owned_ids = await db.run(crud_category.get_owned_category_ids, category_ids, current_user.id)
+    
+    valid = []
+    for result, row in rows:
+        if row.category_id in owned_ids:
+            valid.append((result, row))
+        else:
+            result.error = "Category not found"
+    
+    if valid:
+        now = datetime.utcnow()
+        values = [{**row.dict(), "date": row.date or now} for _, row in valid]
+        ids = await db.run(crud_expense.create_expenses_bulk, values, current_user.id, settings.BULK_IMPORT_BATCH_SIZE)
+        
+        imported = {}
+        for (result, _), value, expense_id in zip(valid, values, ids):
+            result.status, result.id = "created", expense_id
+            key = (value["category_id"], value["date"].strftime("%Y-%m"))
+            imported[key] = imported.get(key, 0) + value["amount"]
+        
+        await _notify_budget_crossings(db, current_user, imported)
+    
+    return {
+        "created": len(valid),
+        "failed": len(results) - len(valid),
+        "results": results
+    }
+
+def _check_bulk_ids(ids: list):
+    if len(ids) > settings.BULK_EDIT_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_EDIT_MAX_IDS} ids per request")
+
+@router.post("/bulk/delete", response_model=ExpenseBulkDeleteResult)
+async def bulk_delete_expenses(
+    selection: ExpenseBulkDelete,
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Delete expenses by `ids`, or every expense between `from` and `to` (inclusive days).
+    
+    Runs as a few set-based statements however many rows match; ids that
+    aren't the user's are ignored.
+    """
+    if selection.ids is not None:
+        if selection.date_from or selection.date_to:
+            raise HTTPException(status_code=400, detail="Pass either 'ids' or a 'from'/'to' range, not both")
+        _check_bulk_ids(selection.ids)
+        if not selection.ids:
+            return {"deleted": 0}
+        deleted = await db.run(crud_expense.delete_expenses, current_user.id, selection.ids)
+        return {"deleted": deleted}
     
-    expenses = crud_expense.get_expenses_by_month(db, current_user.id, year, month)
+    if not selection.date_from and not selection.date_to:
+        raise HTTPException(status_code=400, detail="Pass 'ids' or at least one of 'from' and 'to'")
+    if selection.date_from and selection.date_to and selection.date_from > selection.date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    start = datetime.combine(selection.date_from, time.min) if selection.date_from else None
+    end = datetime.combine(selection.date_to, time.min) + timedelta(days=1) if selection.date_to else None
+    deleted = await db.run(crud_expense.delete_expenses, current_user.id, None, start, end)
+    return {"deleted": deleted}
+
+@router.post("/bulk/recategorize", response_model=ExpenseRecategorizeResult)
+async def bulk_recategorize_expenses(
+    change: ExpenseRecategorize,
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Move expenses to another category in one statement; ids that aren't the user's are ignored"""
+    _check_bulk_ids(change.ids)
+    if not await db.run(crud_category.category_exists, change.category_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Category not found")
+    if not change.ids:
+        return {"updated": 0}
+    updated = await db.run(crud_expense.recategorize_expenses, current_user.id, change.ids, change.category_id)
+    return {"updated": updated}
+
+# The end of a report or month is the first instant after it, which has to
+# be representable too
+MAX_YEAR = 9998
+
+async def _build_report(db: RequestDB, current_user: User, start: datetime, end: datetime):
+    """Aggregate start <= date < end into per-category and per-month breakdowns"""
+    rows = await db.run(crud_expense.get_category_month_totals, current_user.id, start, end)
     
-    # Group by category
     category_totals = {}
-    for expense in expenses:
-        category = crud_category.get_category_by_id(db, expense.category_id, current_user.id)
-        if category.name not in category_totals:
-            category_totals[category.name] = 0
-        category_totals[category.name] += expense.amount
+    month_totals = {}
+    for row in rows:
+        category_totals[row.category] = category_totals.get(row.category, 0) + row.total
+        month_totals[row.month] = month_totals.get(row.month, 0) + row.total
     
     total_spent = sum(category_totals.values())
+    months = months_between(start.strftime("%Y-%m"), (end - timedelta(microseconds=1)).strftime("%Y-%m"))
+    income = current_user.monthly_income * len(months)
     
     return {
-        "month": f"{year}-{month:02d}",
-        "total_expenses": len(expenses),
+        "from": start.date().isoformat(),
+        "to": (end - timedelta(days=1)).date().isoformat(),
+        "total_expenses": sum(row.count for row in rows),
         "total_spent": total_spent,
         "monthly_income": current_user.monthly_income,
-        "savings": current_user.monthly_income - total_spent,
-        "savings_percentage": ((current_user.monthly_income - total_spent) / current_user.monthly_income * 100) if current_user.monthly_income > 0 else 0,
-        "by_category": category_totals
+        "income": income,
+        "savings": income - total_spent,
+        "savings_percentage": ((income - total_spent) / income * 100) if income > 0 else 0,
+        "by_category": category_totals,
+        "by_month": {month: month_totals.get(month, 0) for month in months},
+        "breakdown": [
+            {"month": row.month, "category": row.category, "total": row.total, "count": row.count}
+            for row in rows
+        ]
+    }
+
+@router.get("/report")
+async def get_range_report(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Get expense report for an arbitrary inclusive date range"""
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if date_to.year > MAX_YEAR:
+        raise HTTPException(status_code=400, detail="'to' is out of range")
+    
+    start = datetime.combine(date_from, time.min)
+    end = datetime.combine(date_to, time.min) + timedelta(days=1)
+    return await _build_report(db, current_user, start, end)
+
+@router.get("/report/{year}")
+async def get_yearly_report(
+    year: int = Path(..., ge=1, le=MAX_YEAR),
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Get expense report for a calendar year"""
+    return {"year": year, **await _build_report(db, current_user, datetime(year, 1, 1), datetime(year + 1, 1, 1))}
+
+@router.get("/report/{year}/quarter/{quarter}")
+async def get_quarterly_report(
+    year: int = Path(..., ge=1, le=MAX_YEAR),
+    quarter: int = Path(...),
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Get expense report for a calendar quarter (1-4)"""
+    if quarter < 1 or quarter > 4:
+        raise HTTPException(status_code=400, detail="Invalid quarter")
+    
+    first_month = (quarter - 1) * 3 + 1
+    end_year, end_month = add_months(year, first_month, 3)
+    report = await _build_report(db, current_user, datetime(year, first_month, 1), datetime(end_year, end_month, 1))
+    return {"quarter": f"{year}-Q{quarter}", **report}
+
+@router.get("/report/{year}/{month}")
+async def get_monthly_report(
+    year: int = Path(..., ge=1, le=MAX_YEAR),
+    month: int = Path(...),
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Get detailed monthly expense report"""
+    if month < 1 or month > 12:
+        raise HTTPException(status_code=400, detail="Invalid month")
+    
+    start, end = month_bounds(year, month)
+    key = f"{year}-{month:02d}"
+    
+    async def build():
+        return {"month": key, **await _build_report(db, current_user, start, end)}
+    
+    return await result_cache.get_or_compute(current_user.id, EXPENSE_REPORT, key, build)
+
+EXPORT_COLUMNS = ("id", "date", "description", "amount", "category_id", "category")
+
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+
+@router.get("/export")
+async def export_expenses(
+    export_format: str = Query("csv", alias="format"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Stream expenses oldest first as CSV or NDJSON, optionally limited to an inclusive date range.
+    
+    Rows come off a server-side cursor EXPORT_BATCH_SIZE at a time as plain
+    tuples, so memory stays flat regardless of how many expenses there are.
+    """
+    if export_format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Unknown format, expected csv or ndjson")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    
+    start = datetime.combine(date_from, time.min) if date_from else None
+    end = datetime.combine(date_to, time.min) + timedelta(days=1) if date_to else None
+    stmt = crud_expense.expense_export_query(current_user.id, start, end)
+    write_chunk = _csv_chunk if export_format == "csv" else _ndjson_chunk
+    
+    # get_db's cleanup runs once the response has been sent, so the session
+    # stays open for as long as the body is streaming
+    async def body():
+        if export_format == "csv":
+            yield _csv_chunk([EXPORT_COLUMNS])
+        async for rows in db.stream(stmt, settings.EXPORT_BATCH_SIZE):
+            yield write_chunk(
+                (expense_id, expense_date.isoformat(), description, amount, category_id, category)
+                for expense_id, expense_date, description, amount, category_id, category in rows
+            )
+    
+    return StreamingResponse(
+        body(),
+        media_type="text/csv" if export_format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="expenses.{export_format}"'}
+    )
+
+@router.get("/query", response_model=List[ExpenseResponse], dependencies=[Depends(check_data_etag)])
+async def query_expenses(
+    response: Response,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    category_id: Optional[List[int]] = Query(None, max_length=100),
+    prefix: Optional[str] = Query(None, min_length=1, max_length=100),
+    sort: str = Query("date", pattern="^(date|amount|description)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Filter and sort expenses.
+    
+    Amounts and dates are inclusive ranges, `category_id` may be repeated
+    to match any of several categories and `prefix` matches the start of
+    the description, ignoring case. Ties in the sort key are broken by id
+    in the same direction.
+    """
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise HTTPException(status_code=400, detail="'min_amount' must not be above 'max_amount'")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    
+    start = datetime.combine(date_from, time.min) if date_from else None
+    end = datetime.combine(date_to, time.min) + timedelta(days=1) if date_to else None
+    rows = await db.run(
+        crud_expense.query_expenses, current_user.id, skip, limit,
+        min_amount, max_amount, start, end, category_id, prefix, sort, order == "desc"
+    )
+    return fast_json_response(rows, List[ExpenseResponse], response)
+
+@router.get("/search", response_model=List[ExpenseSearchResult], dependencies=[Depends(check_data_etag)])
+async def search_expenses(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    category_id: Optional[int] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Search expense descriptions, best match first.
+    
+    Every word in `q` must match the start of a word in the description
+    ("uber" finds "Uber Eats"). Optionally narrowed to a category and an
+    inclusive date range.
+    """
+    if not search_terms(q):
+        raise HTTPException(status_code=400, detail="Search query has no words")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    
+    if category_id is not None:
+        if not await db.run(crud_category.category_exists, category_id, current_user.id):
+            raise HTTPException(status_code=404, detail="Category not found")
+    
+    start = datetime.combine(date_from, time.min) if date_from else None
+    end = datetime.combine(date_to, time.min) + timedelta(days=1) if date_to else None
+    rows = await db.run(crud_expense.search_expenses, current_user.id, q, skip, limit, category_id, start, end)
+    return fast_json_response(rows, List[ExpenseSearchResult], response)
+
+def _default_timeseries_start(end: date, granularity: str) -> date:
+    """30 days, 12 weeks or 12 months ending with `end`"""
+    if granularity == "month":
+        year, month = add_months(end.year, end.month, -11)
+        return date(year, month, 1)
+    if granularity == "week":
+        return bucket_start(end, "week") - timedelta(weeks=11)
+    return end - timedelta(days=29)
+
+@router.get("/timeseries")
+async def get_timeseries(
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    category_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Spend per day, ISO week (starting Monday) or month over an inclusive date range.
+    
+    Every bucket in the range is returned, zero-filled, with its total,
+    count and the cumulative spend since `from`. Buckets are labelled by
+    their first day; the first and last may be partial. Defaults to the
+    last 30 days, 12 weeks or 12 months up to today.
+    """
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or _default_timeseries_start(date_to, granularity)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    
+    if bucket_count(date_from, date_to, granularity) > settings.TIMESERIES_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range spans more than {settings.TIMESERIES_MAX_BUCKETS} {granularity} buckets"
+        )
+    buckets = buckets_between(date_from, date_to, granularity)
+    
+    if category_id is not None:
+        if not await db.run(crud_category.category_exists, category_id, current_user.id):
+            raise HTTPException(status_code=404, detail="Category not found")
+    
+    start = datetime.combine(date_from, time.min)
+    end = datetime.combine(date_to, time.min) + timedelta(days=1)
+    rows = await db.run(crud_expense.get_spend_timeseries, current_user.id, granularity, start, end, category_id)
+    by_bucket = {row.bucket: row for row in rows}
+    
+    series = []
+    cumulative = 0.0
+    for bucket in buckets:
+        row = by_bucket.get(bucket.isoformat())
+        if row is not None:
+            cumulative = row.cumulative
+        series.append({
+            "start": bucket.isoformat(),
+            "total": row.total if row is not None else 0.0,
+            "count": row.count if row is not None else 0,
+            "cumulative": cumulative
+        })
+    
+    return {
+        "granularity": granularity,
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "category_id": category_id,
+        "total": cumulative,
+        "count": sum(row.count for row in rows),
+        "buckets": series
     }
 
 @router.get("/{expense_id}", response_model=ExpenseResponse)
-def get_expense(
+async def get_expense(
     expense_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    expense = crud_expense.get_expense_by_id(db, expense_id, current_user.id)
+    expense = await db.run(crud_expense.get_expense_by_id, expense_id, current_user.id)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     return expense
 
-@router.get("/category/{category_id}", response_model=List[ExpenseResponse])
-def get_expenses_by_category(
+@router.get("/category/{category_id}", response_model=Union[List[ExpenseResponse], ExpensePage], dependencies=[Depends(check_data_etag)])
+async def get_expenses_by_category(
     category_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
     # Verify category belongs to user
-    category = crud_category.get_category_by_id(db, category_id, current_user.id)
-    if not category:
+    if not await db.run(crud_category.category_exists, category_id, current_user.id):
         raise HTTPException(status_code=404, detail="Category not found")
     
-    return crud_expense.get_expenses_by_category(db, category_id, current_user.id, skip, limit)
+    if cursor is not None:
+        return fast_json_response(await _expense_page(db, current_user.id, cursor, limit, category_id), ExpensePage, response)
+    rows = await db.run(crud_expense.get_expenses_by_category, category_id, current_user.id, skip, limit)
+    return fast_json_response(rows, List[ExpenseResponse], response)
 
-@router.get("/month/{year}/{month}", response_model=List[ExpenseResponse])
-def get_expenses_by_month(
-    year: int,
-    month: int,
+@router.get("/month/{year}/{month}", response_model=List[ExpenseResponse], dependencies=[Depends(check_data_etag)])
+async def get_expenses_by_month(
+    response: Response,
+    year: int = Path(..., ge=1, le=MAX_YEAR),
+    month: int = Path(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
     if month < 1 or month > 12:
         raise HTTPException(status_code=400, detail="Invalid month")
     
-    return crud_expense.get_expenses_by_month(db, current_user.id, year, month)
+    rows = await db.run(crud_expense.get_expenses_by_month, current_user.id, year, month)
+    return fast_json_response(rows, List[ExpenseResponse], response)
 
 @router.put("/{expense_id}", response_model=ExpenseResponse)
-def update_expense(
+async def update_expense(
     expense_id: int,
     expense_update: ExpenseUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
     # If category is being updated, verify it belongs to user
     if expense_update.category_id:
-        category = crud_category.get_category_by_id(db, expense_update.category_id, current_user.id)
-        if not category:
+        if not await db.run(crud_category.category_exists, expense_update.category_id, current_user.id):
             raise HTTPException(status_code=404, detail="Category not found")
     
-    expense = crud_expense.update_expense(db, expense_id, current_user.id, expense_update)
+    expense = await db.run(crud_expense.update_expense, expense_id, current_user.id, expense_update)
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     return expense
 
 @router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_expense(
+async def delete_expense(
     expense_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    success = crud_expense.delete_expense(db, expense_id, current_user.id)
+    success = await db.run(crud_expense.delete_expense, expense_id, current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="Expense not found")
     return None
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import Optional
+
+from ..database import RequestDB, UnitOfWorkRoute, get_db
+from ..schemas.sync import SyncResponse
+from ..crud import change_log as crud_change_log
+from ..crud import expense as crud_expense
+from ..crud import category as crud_category
+from ..crud import budget as crud_budget
+from ..models.user import User
+from ..utils.fast_json import fast_json_response
+from ..utils.pagination import decode_id_cursor, encode_cursor
+from .auth import get_current_user
+
+router = APIRouter(prefix="/sync", tags=["Sync"], route_class=UnitOfWorkRoute)
+
+# entity name in the change log -> (response key, loader of current rows by id)
+SYNCED_ENTITIES = {
+    "category": ("categories", crud_category.get_categories_by_ids),
+    "budget": ("budgets", crud_budget.get_budgets_by_ids),
+    "expense": ("expenses", crud_expense.get_expenses_by_ids),
+}
+
+@router.get("", response_model=SyncResponse)
+async def sync(
+    response: Response,
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    db: RequestDB = Depends(get_db)
+):
+    """Expenses, categories and budgets changed after `since`, plus ids deleted since then.
+
+    Start without `since` to receive everything, then pass back the returned
+    `cursor`; keep going while `has_more` is set. Entities are sent in their
+    current state, so applying a page is idempotent. A deleted category
+    also deletes its expenses and budget on the client, as it does here.
+    """
+    try:
+        after = decode_id_cursor(since) if since else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    changes = await db.run(crud_change_log.get_changes, current_user.id, after, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # Only the last change to each entity in the page matters
+    latest = {}
+    for _, entity, entity_id, deleted in changes:
+        latest[(entity, entity_id)] = deleted
+
+    content = {
+        "cursor": encode_cursor(changes[-1].change_seq) if changes else encode_cursor(after),
+        "has_more": has_more,
+        "deleted": {},
+    }
+    for entity, (key, load) in SYNCED_ENTITIES.items():
+        deleted_ids = [entity_id for (kind, entity_id), deleted in latest.items() if kind == entity and deleted]
+        changed_ids = [entity_id for (kind, entity_id), deleted in latest.items() if kind == entity and not deleted]
+        rows = await db.run(load, current_user.id, changed_ids) if changed_ids else []
+        # Gone since it was logged, e.g. with a deleted category
+        found = {row["id"] for row in rows}
+        deleted_ids += [entity_id for entity_id in changed_ids if entity_id not in found]
+        content[key] = rows
+        content["deleted"][key] = deleted_ids
+    return fast_json_response(content, SyncResponse, response)
\ No newline at end of file
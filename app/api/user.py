@@ -1,34 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import RequestDB, UnitOfWorkRoute, get_db
 from ..schemas.user import UserResponse, UserUpdate
 from ..crud import user as crud_user
 from .auth import get_current_user
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=UnitOfWorkRoute)
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_profile(current_user = Depends(get_current_user)):
+async def get_current_user_profile(current_user = Depends(get_current_user)):
     return current_user
 
 @router.put("/me", response_model=UserResponse)
-def update_current_user(
+async def update_current_user(
     user_update: UserUpdate,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    updated_user = crud_user.update_user(db, current_user.id, user_update)
+    updated_user = await db.run(crud_user.update_user, current_user.id, user_update)
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     return updated_user
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
-def delete_current_user(
+async def delete_current_user(
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: RequestDB = Depends(get_db)
 ):
-    success = crud_user.delete_user(db, current_user.id)
+    success = await db.run(crud_user.delete_user, current_user.id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     return None
\ No newline at end of file
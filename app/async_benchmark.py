@@ -0,0 +1,65 @@
+"""Requests per second and tail latency of the sync and async database
+paths, run with `python -m app.cli bench-async`.
+
+Starts the API twice, once with DATABASE_ASYNC off (SyncDB, a crud call
+per threadpool worker) and once with it on (AsyncDB on aiosqlite /
+asyncpg), and seeds the same data into each. Clients then cycle through
+a read mix of list, summary and report endpoints plus an expense create,
+at every concurrency level in turn. SQLite serializes writers whichever
+path is used, so pass --database-url to compare on PostgreSQL.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+
+from .http_benchmark import ScratchServer, load, register
+
+async def seed(client) -> dict:
+    headers = await register(client, f"bench_{uuid.uuid4().hex[:12]}")
+    month = datetime.utcnow().strftime("%Y-%m")
+    category_ids = []
+    for i in range(10):
+        response = await client.post("/categories/", json={"name": f"Category {i}"}, headers=headers)
+        category_ids.append(response.json()["id"])
+        await client.post("/budgets/", json={"category_id": category_ids[-1], "amount": 500.0, "month": month}, headers=headers)
+    await client.post("/expenses/bulk", json=[
+        {"description": f"Expense {i}", "amount": 1.0 + i % 50, "category_id": category_ids[i % 10]}
+        for i in range(2000)
+    ], headers=headers)
+    return {"headers": headers, "category_id": category_ids[0]}
+
+async def measure(base_url: str, concurrency: list, duration: float) -> list:
+    import httpx
+
+    now = datetime.utcnow()
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=httpx.Limits(max_connections=max(concurrency))) as client:
+        data = await seed(client)
+        headers = data["headers"]
+        requests = [
+            lambda: client.get("/expenses/?limit=50", headers=headers),
+            lambda: client.get("/categories/", headers=headers),
+            lambda: client.get("/budgets/summary", headers=headers),
+            lambda: client.get(f"/expenses/report/{now.year}/{now.month}", headers=headers),
+            lambda: client.get(f"/expenses/category/{data['category_id']}?limit=50", headers=headers),
+            lambda: client.post("/expenses/", json={"description": "Coffee", "amount": 3.5, "category_id": data["category_id"]}, headers=headers),
+        ]
+
+        async def send(i):
+            return await requests[i % len(requests)]()
+
+        results = []
+        for clients in concurrency:
+            result = await load(send, clients, duration)
+            results.append({"concurrency": clients, **result})
+        return results
+
+def run(concurrency=(16, 64, 256), duration: float = 10.0, modes=("sync", "async"), database_url: str = None) -> dict:
+    """{mode: [result per concurrency level]}; database_url replaces the scratch SQLite file"""
+    results = {}
+    for mode in modes:
+        env = {"DATABASE_ASYNC": "true" if mode == "async" else "false"}
+        if database_url:
+            env["DATABASE_URL"] = database_url
+        with ScratchServer(env) as server:
+            results[mode] = asyncio.run(measure(server.base_url, list(concurrency), duration))
+    return results
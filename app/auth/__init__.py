@@ -1,2 +1,10 @@
-from .password import verify_password, get_password_hash
-from .jwt import create_access_token, verify_token
\ No newline at end of file
+from .password import (
+    PasswordHasherBusy,
+    verify_password,
+    verify_and_update_password,
+    get_password_hash,
+    verify_and_update_password_async,
+    get_password_hash_async
+)
+from .jwt import create_access_token, decode_access_token, verify_token
+from .principal_cache import PrincipalCache, principal_cache
\ No newline at end of file
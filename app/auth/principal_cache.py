@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from ..config import settings
+
+class PrincipalCache:
+    """Bounded LRU of token -> (claims, user snapshot).
+
+    Entries live for at most `ttl` seconds and never past the token's own
+    `exp`. The user snapshot is a plain dict of column values, so nothing
+    here holds on to a Session. Writes to a user must call invalidate_user.
+
+    The cache and its invalidations are per process. With several workers,
+    a user changed or deleted through one worker is still served from the
+    others' caches for up to `ttl` seconds, so keep PRINCIPAL_CACHE_TTL
+    short there (or 0 entries to disable it).
+    """
+    def __init__(self, maxsize: int, ttl: float, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._tokens_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, claims, snapshot = entry
+            if expires_at <= self.clock():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return claims, snapshot
+
+    def put(self, token: str, claims: dict, snapshot: dict):
+        if self.maxsize <= 0:
+            return
+        expires_at = self.clock() + self.ttl
+        if claims.get("exp") is not None:
+            expires_at = min(expires_at, claims["exp"])
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (expires_at, claims, snapshot)
+            self._tokens_by_user.setdefault(snapshot["id"], set()).add(token)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, token: str):
+        _, _, snapshot = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(snapshot["id"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[snapshot["id"]]
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL)
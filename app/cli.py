@@ -0,0 +1,250 @@
+"""Maintenance commands, e.g. `python -m app.cli rollup verify`"""
+import argparse
+import sys
+from datetime import date
+
+from .database import SessionLocal, engine, Base
+from . import models  # noqa: F401 - register tables before create_all
+from .crud import monthly_total as crud_monthly_total
+from .migrations import run_migrations
+from .utils.email_worker import OutboxWorker
+
+def migrate(args):
+    applied = run_migrations(engine)
+    print(f"Applied migrations: {', '.join(applied) or 'none'}")
+    return 0
+
+def email_worker(args):
+    worker = OutboxWorker(SessionLocal)
+    if args.once:
+        print(f"Sent {worker.drain_once()} emails")
+        return 0
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.sender.close()
+    return 0
+
+def rollup_rebuild(args):
+    db = SessionLocal()
+    try:
+        rows = crud_monthly_total.rebuild_monthly_totals(db, args.user_id)
+        print(f"Rebuilt monthly_category_totals: {rows} rows")
+    finally:
+        db.close()
+    return 0
+
+def rollup_verify(args):
+    db = SessionLocal()
+    try:
+        mismatches = crud_monthly_total.verify_monthly_totals(db, args.user_id)
+    finally:
+        db.close()
+
+    for row in mismatches:
+        print(
+            f"user={row['user_id']} category={row['category_id']} month={row['month']}: "
+            f"expected {row['expected_total']:.2f} ({row['expected_count']}), "
+            f"stored {row['stored_total']:.2f} ({row['stored_count']})"
+        )
+    print(f"{len(mismatches)} mismatched rows")
+    return 1 if mismatches else 0
+
+def projections(args):
+    # NumPy is only needed by this batch, not by the API process
+    from .projections import run_projections
+    
+    db = SessionLocal()
+    try:
+        count = run_projections(db, args.as_of)
+    finally:
+        db.close()
+    print(f"Projected {count} budgets")
+    return 0
+
+def bench_crud(args):
+    from .crud_benchmark import run
+    
+    results = run(args.calls, only=args.only)
+    width = max(len(name) for name, _, _ in results)
+    print(f"{'function':<{width}}  {'median us':>10}  {'p90 us':>10}")
+    for name, median, p90 in results:
+        print(f"{name:<{width}}  {median:>10.1f}  {p90:>10.1f}")
+    return 0
+
+def bench_indexes(args):
+    from .index_benchmark import run
+    
+    results = run(args.rows, args.users, args.queries, only=args.only, path=args.path)
+    width = max(len(name) for name, *_ in results)
+    print(f"{'query':<{width}}  {'indexes':<7}  {'median ms':>10}  {'p90 ms':>10}  plan")
+    for name, indexes, median, p90, plan in results:
+        print(f"{name:<{width}}  {indexes:<7}  {median:>10.3f}  {p90:>10.3f}  {plan}")
+    return 0
+
+def bench_email(args):
+    from .email_benchmark import run
+    
+    for workers in args.workers:
+        result = run(args.messages, args.batch_size, workers)
+        print(
+            f"workers={workers}: {result['delivered']}/{result['messages']} delivered in {result['seconds']:.2f}s, "
+            f"{result['messages_per_second']:.0f} msgs/sec"
+        )
+    return 0
+
+def bench_login(args):
+    from .login_benchmark import run
+    
+    env = {"BCRYPT_ROUNDS": str(args.rounds)} if args.rounds else None
+    results = run(args.logins, args.readers, args.duration, env)
+    print(
+        f"{'logins':>6}  {'logins/s':>8}  {'login p99':>9}  {'503s':>5}  "
+        f"{'reads/s':>8}  {'read p50 ms':>11}  {'read p99 ms':>11}  {'read errors':>11}"
+    )
+    for row in results:
+        print(
+            f"{row['login_clients']:>6}  {row['logins_per_second']:>8.1f}  {row['login_p99_ms']:>9.1f}  "
+            f"{row['logins_rejected']:>5}  {row['read_rps']:>8.1f}  {row['read_p50_ms']:>11.1f}  "
+            f"{row['read_p99_ms']:>11.1f}  {row['read_errors']:>11}"
+        )
+    return 0
+
+def bench_async(args):
+    from .async_benchmark import run
+    
+    results = run(args.concurrency, args.duration, database_url=args.database_url)
+    print(f"{'mode':<5}  {'clients':>7}  {'rps':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+    for mode, rows in results.items():
+        for row in rows:
+            print(
+                f"{mode:<5}  {row['concurrency']:>7}  {row['rps']:>8.1f}  {row['p50_ms']:>8.1f}  "
+                f"{row['p99_ms']:>8.1f}  {row['requests'] - row['ok']:>6}"
+            )
+    return 0
+
+def bench_export(args):
+    from .export_benchmark import run
+    
+    results = run(args.sizes, args.formats)
+    print(f"{'expenses':>9}  {'format':<6}  {'MB':>7}  {'rows/sec':>9}  {'idle RSS MB':>11}  {'peak RSS MB':>11}")
+    for row in results:
+        print(
+            f"{row['expenses']:>9}  {row['format']:<6}  {row['megabytes']:>7.1f}  {row['rows_per_second']:>9.0f}  "
+            f"{row['idle_rss_mb']:>11.1f}  {row['peak_rss_mb']:>11.1f}"
+        )
+    return 0
+
+def bench_dashboard(args):
+    from .dashboard_benchmark import run
+    
+    results = run(args.concurrency, args.duration, args.categories, args.expenses, not args.no_principal_cache)
+    print(f"{'pattern':<11}  {'clients':>7}  {'loads/s':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+    for row in results:
+        print(
+            f"{row['pattern']:<11}  {row['concurrency']:>7}  {row['rps']:>8.1f}  {row['p50_ms']:>8.1f}  "
+            f"{row['p99_ms']:>8.1f}  {row['requests'] - row['ok']:>6}"
+        )
+    return 0
+
+def bench_lists(args):
+    from .list_benchmark import run
+    
+    results = run(args.categories, args.expenses, args.requests, args.modes, args.only)
+    width = max(len(row["endpoint"]) for row in results)
+    print(f"{'mode':<9}  {'endpoint':<{width}}  {'rows':>5}  {'rows/s':>9}  {'p50 ms':>8}  {'p99 ms':>8}")
+    for row in results:
+        print(
+            f"{row['mode']:<9}  {row['endpoint']:<{width}}  {row['rows']:>5}  {row['rows_per_second']:>9.0f}  "
+            f"{row['p50_ms']:>8.1f}  {row['p99_ms']:>8.1f}"
+        )
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Money Manager maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_command = commands.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_command.set_defaults(func=migrate)
+
+    worker = commands.add_parser("email-worker", help="Deliver queued emails from the outbox")
+    worker.add_argument("--once", action="store_true", help="Deliver one batch and exit")
+    worker.set_defaults(func=email_worker)
+
+    rollup = commands.add_parser("rollup", help="Maintain the monthly_category_totals rollup")
+    rollup_commands = rollup.add_subparsers(dest="action", required=True)
+
+    rebuild = rollup_commands.add_parser("rebuild", help="Recompute the rollup from the expenses table")
+    rebuild.add_argument("--user-id", type=int, default=None)
+    rebuild.set_defaults(func=rollup_rebuild)
+
+    verify = rollup_commands.add_parser("verify", help="Report rollup rows that disagree with the expenses table")
+    verify.add_argument("--user-id", type=int, default=None)
+    verify.set_defaults(func=rollup_verify)
+
+    projection = commands.add_parser("projections", help="Recompute month-end projections for this month's budgets")
+    projection.add_argument("--as-of", type=date.fromisoformat, default=None, help="YYYY-MM-DD, default today (UTC)")
+    projection.set_defaults(func=projections)
+
+    bench = commands.add_parser("bench-crud", help="Time each crud function against a scratch in-memory database")
+    bench.add_argument("--calls", type=int, default=1000, help="Timed calls per function")
+    bench.add_argument("--only", default=None, help="Only functions whose name contains this")
+    bench.set_defaults(func=bench_crud)
+
+    bench_index = commands.add_parser("bench-indexes", help="Query plans and latency of the expense queries before and after migration 0001")
+    bench_index.add_argument("--rows", type=int, default=1_000_000, help="Expenses to seed")
+    bench_index.add_argument("--users", type=int, default=1000, help="Users the expenses are spread over")
+    bench_index.add_argument("--queries", type=int, default=200, help="Timed calls per query")
+    bench_index.add_argument("--only", default=None, help="Only queries whose name contains this")
+    bench_index.add_argument("--path", default=None, help="SQLite file to seed (default: a temporary file)")
+    bench_index.set_defaults(func=bench_indexes)
+
+    bench_mail = commands.add_parser("bench-email", help="Outbox delivery throughput against a local SMTP sink")
+    bench_mail.add_argument("--messages", type=int, default=2000, help="Queued messages per run")
+    bench_mail.add_argument("--batch-size", type=int, default=50, help="Messages claimed per drain")
+    bench_mail.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="Concurrent workers, one run each")
+    bench_mail.set_defaults(func=bench_email)
+
+    bench_logins = commands.add_parser("bench-login", help="Login throughput against the latency of other endpoints")
+    bench_logins.add_argument("--logins", type=int, nargs="+", default=[0, 4, 16, 64], help="Concurrent login clients, one run each")
+    bench_logins.add_argument("--readers", type=int, default=8, help="Concurrent clients on the read endpoints")
+    bench_logins.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    bench_logins.add_argument("--rounds", type=int, default=None, help="BCRYPT_ROUNDS for the server (default: its setting)")
+    bench_logins.set_defaults(func=bench_login)
+
+    bench_modes = commands.add_parser("bench-async", help="RPS and tail latency with DATABASE_ASYNC off and on")
+    bench_modes.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256], help="Concurrent clients, one run each")
+    bench_modes.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    bench_modes.add_argument("--database-url", default=None, help="Database for the server (default: a scratch SQLite file)")
+    bench_modes.set_defaults(func=bench_async)
+
+    bench_exports = commands.add_parser("bench-export", help="Peak server RSS and rows/sec of GET /expenses/export")
+    bench_exports.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Expenses per run")
+    bench_exports.add_argument("--formats", nargs="+", choices=["csv", "ndjson"], default=["csv", "ndjson"])
+    bench_exports.set_defaults(func=bench_export)
+
+    bench_dash = commands.add_parser("bench-dashboard", help="GET /dashboard against the three calls it replaced")
+    bench_dash.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64], help="Concurrent page loads, one run each")
+    bench_dash.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    bench_dash.add_argument("--categories", type=int, default=20, help="Categories, each with a budget")
+    bench_dash.add_argument("--expenses", type=int, default=5000, help="Expenses this month")
+    bench_dash.add_argument("--no-principal-cache", action="store_true", help="Authenticate every call from the database")
+    bench_dash.set_defaults(func=bench_dashboard)
+
+    bench_list = commands.add_parser("bench-lists", help="Rows per second of each list endpoint")
+    bench_list.add_argument("--categories", type=int, default=500, help="Categories, each with a budget")
+    bench_list.add_argument("--expenses", type=int, default=5000, help="Expenses this month")
+    bench_list.add_argument("--requests", type=int, default=50, help="Timed requests per endpoint")
+    bench_list.add_argument("--modes", nargs="+", choices=["trusted", "validated"], default=["trusted", "validated"])
+    bench_list.add_argument("--only", default=None, help="Only endpoints whose name contains this")
+    bench_list.set_defaults(func=bench_lists)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    Base.metadata.create_all(bind=engine)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,86 @@
 from pydantic_settings import BaseSettings
 
+from typing import Optional
+
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Serve requests through AsyncSession (aiosqlite / asyncpg); the async URL
+    # is derived from DATABASE_URL unless given explicitly
+    DATABASE_ASYNC: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Connections of the sync engine's pool; in sync mode, requests beyond
+    # their sum wait for a free connection before taking a threadpool worker
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Authenticated users per token. Invalidation is per process, so with
+    # several workers the TTL is how long other workers may still see a
+    # user as it was before an update or deletion
+    PRINCIPAL_CACHE_SIZE: int = 10000  # 0 disables the cache
+    PRINCIPAL_CACHE_TTL: float = 60.0
+    
+    # Budget summary and monthly report results per (user, month); 0 disables
+    # the in-process LRU. RESULT_CACHE_URL (redis://, needs the optional redis
+    # package) shares one cache between workers instead. Current and future
+    # months expire after RESULT_CACHE_TTL, past months after
+    # RESULT_CACHE_CLOSED_TTL. On the LRU a write only invalidates the
+    # worker that handled it, so with several workers the TTLs bound how long
+    # the others serve stale results. With RESULT_CACHE_URL past months can
+    # be kept until a write (RESULT_CACHE_CLOSED_TTL empty).
+    RESULT_CACHE_SIZE: int = 10000
+    RESULT_CACHE_TTL: float = 300.0
+    RESULT_CACHE_CLOSED_TTL: Optional[float] = 3600.0
+    RESULT_CACHE_URL: Optional[str] = None
+    
+    # Password hashing; raising BCRYPT_ROUNDS rehashes users on their next login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32
     
     SMTP_HOST: str
     SMTP_PORT: int
     SMTP_USER: str
     SMTP_PASSWORD: str
     EMAIL_FROM: str
+    SMTP_STARTTLS: bool = True
+    
+    # Outbox worker. Run it as its own process (`python -m app.cli email-worker`);
+    # EMAIL_WORKER_ENABLED also starts one inside every API worker instead.
+    # Claims older than EMAIL_CLAIM_TIMEOUT seconds are retried.
+    EMAIL_WORKER_ENABLED: bool = False
+    EMAIL_CLAIM_TIMEOUT: float = 300.0
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_POLL_INTERVAL: float = 2.0
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_CIRCUIT_FAILURE_THRESHOLD: int = 3
+    EMAIL_CIRCUIT_RESET_SECONDS: float = 60.0
+    
+    # POST /expenses/bulk: rows per request and rows per INSERT
+    BULK_IMPORT_MAX_ROWS: int = 10000
+    BULK_IMPORT_BATCH_SIZE: int = 500
+    # Ids per POST /expenses/bulk/delete or /expenses/bulk/recategorize
+    BULK_EDIT_MAX_IDS: int = 10000
+    # Rows fetched per round trip by GET /expenses/export
+    EXPORT_BATCH_SIZE: int = 1000
+    # Zero-filled buckets per GET /expenses/timeseries response
+    TIMESERIES_MAX_BUCKETS: int = 1000
+    # Months per GET /budgets/summary?from=&to= matrix
+    SUMMARY_MAX_MONTHS: int = 120
+    
+    # List endpoints encode trusted DB rows straight to JSON; set this to run
+    # them through the response model's TypeAdapter first
+    VALIDATE_LIST_RESPONSES: bool = False
+    
+    # Serve Prometheus metrics at /metrics; off means no instrumentation at all
+    METRICS_ENABLED: bool = False
+    
+    # Log requests over QUERY_BUDGET statements or repeating one statement
+    # N_PLUS_ONE_THRESHOLD times
+    QUERY_TRACKING_ENABLED: bool = False
+    QUERY_BUDGET: int = 20
+    N_PLUS_ONE_THRESHOLD: int = 5
     
     class Config:
         env_file = ".env"
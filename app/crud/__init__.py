@@ -2,33 +2,89 @@ from .user import (
     get_user_by_email,
     get_user_by_username,
     get_user_by_id,
+    email_exists,
+    username_exists,
     create_user,
     update_user,
+    update_password_hash,
     delete_user
 )
 from .category import (
     get_categories,
+    get_categories_page,
+    get_categories_by_ids,
     get_category_by_id,
+    category_exists,
+    get_category_name,
+    get_owned_category_ids,
     get_category_by_name,
+    category_name_exists,
     create_category,
     update_category,
     delete_category
 )
 from .budget import (
     get_budgets,
+    get_budgets_page,
+    get_budgets_by_ids,
     get_budget_by_id,
     get_budget_by_category,
+    get_budget_amount,
+    budget_exists,
+    get_budget_summary,
     create_budget,
     update_budget,
     delete_budget
 )
 from .expense import (
     get_expenses,
+    get_expenses_page,
+    get_expenses_by_ids,
     get_expense_by_id,
     get_expenses_by_category,
     get_expenses_by_month,
+    query_expenses,
+    search_expenses,
+    expense_export_query,
     get_total_spent_by_category_month,
+    get_category_month_totals,
+    get_spend_timeseries,
     create_expense,
+    create_expenses_bulk,
     update_expense,
-    delete_expense
+    delete_expense,
+    delete_expenses,
+    recategorize_expenses
+)
+from .monthly_total import (
+    apply_expense_delta,
+    expense_day_column,
+    get_month_total,
+    rebuild_monthly_totals,
+    verify_monthly_totals
+)
+from .email_outbox import (
+    enqueue_email,
+    claim_pending_emails,
+    release_emails,
+    mark_email_sent,
+    mark_email_failed
+)
+from .data_version import (
+    bump_data_version,
+    invalidate_results,
+    get_data_version
+)
+from .change_log import (
+    record_changes,
+    record_selected_changes,
+    get_changes
+)
+from .dashboard import (
+    get_category_overview
+)
+from .budget_projection import (
+    get_month_budgets,
+    get_daily_budget_spend,
+    replace_budget_projections
 )
\ No newline at end of file
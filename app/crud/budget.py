@@ -1,33 +1,120 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, lambda_stmt, select
 from ..models.budget import Budget
+from ..models.category import Category
+from ..models.monthly_category_total import MonthlyCategoryTotal
+from ..models.budget_projection import BudgetProjection
 from ..schemas.budget import BudgetCreate, BudgetUpdate
+from .change_log import record_changes
+from .data_version import invalidate_results
+from ..result_cache import BUDGET_SUMMARY
+from .rows import fetch_rows
+
+BUDGET_COLUMNS = (Budget.id, Budget.category_id, Budget.amount, Budget.month, Budget.user_id)
 
 def get_budgets(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Budget).filter(Budget.user_id == user_id).offset(skip).limit(limit).all()
+    return fetch_rows(db, lambda_stmt(lambda: select(*BUDGET_COLUMNS).where(Budget.user_id == user_id).order_by(Budget.id).offset(skip).limit(limit)))
+
+def get_budgets_page(db: Session, user_id: int, limit: int = 100, after_id: int = None):
+    stmt = lambda_stmt(lambda: select(*BUDGET_COLUMNS).where(Budget.user_id == user_id))
+    if after_id is not None:
+        stmt += lambda s: s.where(Budget.id > after_id)
+    stmt += lambda s: s.order_by(Budget.id).limit(limit)
+    return fetch_rows(db, stmt)
+
+def get_budgets_by_ids(db: Session, user_id: int, budget_ids: list):
+    budget_ids = list(budget_ids)
+    return fetch_rows(db, lambda_stmt(lambda: select(*BUDGET_COLUMNS).where(Budget.user_id == user_id, Budget.id.in_(budget_ids))))
 
 def get_budget_by_id(db: Session, budget_id: int, user_id: int):
-    return db.query(Budget).filter(
+    return db.scalars(lambda_stmt(lambda: select(Budget).where(
         Budget.id == budget_id,
         Budget.user_id == user_id
-    ).first()
+    ).limit(1))).first()
 
 def get_budget_by_category(db: Session, category_id: int, month: str, user_id: int):
-    return db.query(Budget).filter(
+    return db.scalars(lambda_stmt(lambda: select(Budget).where(
+        Budget.category_id == category_id,
+        Budget.month == month,
+        Budget.user_id == user_id
+    ).limit(1))).first()
+
+def get_budget_amount(db: Session, category_id: int, month: str, user_id: int):
+    """Amount of the category's budget for month, or None if there is none"""
+    return db.scalar(lambda_stmt(lambda: select(Budget.amount).where(
         Budget.category_id == category_id,
         Budget.month == month,
         Budget.user_id == user_id
-    ).first()
+    ).limit(1)))
+
+def budget_exists(db: Session, category_id: int, month: str, user_id: int) -> bool:
+    return get_budget_amount(db, category_id, month, user_id) is not None
+
+def projection_fields(row) -> dict:
+    """Stored month-end projection columns of a summary row; None until the batch has run"""
+    return {
+        "projected_spend": row.projected_spend,
+        "projected_overrun_date": row.projected_overrun_date,
+        "projected_as_of": row.projected_as_of
+    }
+
+def get_budget_summary(db: Session, user_id: int, month_from: str, month_to: str = None):
+    """Budget, category name, spend and projection for every budget in [month_from, month_to] in one query"""
+    month_to = month_to or month_from
+    
+    rows = db.execute(lambda_stmt(lambda: select(
+        Budget.id,
+        Budget.category_id,
+        Budget.month,
+        Budget.amount,
+        Category.name.label("category"),
+        func.coalesce(MonthlyCategoryTotal.total, 0.0).label("spent"),
+        BudgetProjection.projected_spend,
+        BudgetProjection.projected_overrun_date,
+        BudgetProjection.as_of.label("projected_as_of")
+    ).join(
+        Category, Category.id == Budget.category_id
+    ).outerjoin(
+        MonthlyCategoryTotal,
+        and_(
+            MonthlyCategoryTotal.user_id == Budget.user_id,
+            MonthlyCategoryTotal.category_id == Budget.category_id,
+            MonthlyCategoryTotal.month == Budget.month
+        )
+    ).outerjoin(
+        BudgetProjection, BudgetProjection.budget_id == Budget.id
+    ).where(
+        Budget.user_id == user_id,
+        Budget.month >= month_from,
+        Budget.month <= month_to
+    ).order_by(Budget.month, Category.name))).all()
+    
+    return [
+        {
+            "budget_id": row.id,
+            "category_id": row.category_id,
+            "category": row.category,
+            "month": row.month,
+            "budget": row.amount,
+            "spent": row.spent,
+            "remaining": row.amount - row.spent,
+            "percentage": (row.spent / row.amount * 100) if row.amount > 0 else 0,
+            "status": "exceeded" if row.spent > row.amount else "within",
+            **projection_fields(row)
+        }
+        for row in rows
+    ]
 
 def create_budget(db: Session, budget: BudgetCreate, user_id: int):
     # Check if budget already exists for this category and month
-    existing = get_budget_by_category(db, budget.category_id, budget.month, user_id)
-    if existing:
+    if budget_exists(db, budget.category_id, budget.month, user_id):
         return None
     
     db_budget = Budget(**budget.dict(), user_id=user_id)
     db.add(db_budget)
-    db.commit()
-    db.refresh(db_budget)
+    db.flush()
+    record_changes(db, user_id, "budget", [db_budget.id])
+    invalidate_results(db, user_id, [db_budget.month], [BUDGET_SUMMARY])
     return db_budget
 
 def update_budget(db: Session, budget_id: int, user_id: int, budget_update: BudgetUpdate):
@@ -35,18 +122,22 @@ def update_budget(db: Session, budget_id: int, user_id: int, budget_update: Budg
     if not db_budget:
         return None
     
+    old_month = db_budget.month
     update_data = budget_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_budget, field, value)
     
-    db.commit()
-    db.refresh(db_budget)
+    record_changes(db, user_id, "budget", [db_budget.id])
+    invalidate_results(db, user_id, [old_month, db_budget.month], [BUDGET_SUMMARY])
+    db.flush()
     return db_budget
 
 def delete_budget(db: Session, budget_id: int, user_id: int):
     db_budget = get_budget_by_id(db, budget_id, user_id)
     if db_budget:
         db.delete(db_budget)
-        db.commit()
+        record_changes(db, user_id, "budget", [budget_id], deleted=True)
+        invalidate_results(db, user_id, [db_budget.month], [BUDGET_SUMMARY])
+        db.flush()
         return True
     return False
\ No newline at end of file
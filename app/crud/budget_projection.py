@@ -0,0 +1,63 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, delete, insert, lambda_stmt, select, update
+from datetime import datetime
+from ..models.budget import Budget
+from ..models.budget_projection import BudgetProjection
+from ..models.expense import Expense
+from ..models.user import User
+from .monthly_total import expense_day_column
+from ..result_cache import BUDGET_SUMMARY, result_cache
+
+def get_month_budgets(db: Session, month: str, after_id: int = 0, limit: int = 50000):
+    """(id, amount) of budgets for month in id order, one chunk at a time"""
+    return db.execute(lambda_stmt(lambda: select(Budget.id, Budget.amount).where(
+        Budget.month == month,
+        Budget.id > after_id
+    ).order_by(Budget.id).limit(limit))).all()
+
+def get_daily_budget_spend(db: Session, month: str, start: datetime, end: datetime, first_id: int, last_id: int):
+    """(budget_id, day, total) for budgets first_id..last_id of month, expenses start <= date < end"""
+    day = expense_day_column(db)
+    return db.execute(select(
+        Budget.id,
+        day.label("day"),
+        func.sum(Expense.amount)
+    ).join(
+        Expense,
+        and_(
+            Expense.user_id == Budget.user_id,
+            Expense.category_id == Budget.category_id
+        )
+    ).where(
+        Budget.month == month,
+        Budget.id >= first_id,
+        Budget.id <= last_id,
+        Expense.date >= start,
+        Expense.date < end
+    ).group_by(Budget.id, day)).all()
+
+def replace_budget_projections(db: Session, month: str, first_id: int, last_id: int, projections: list):
+    """Swap the stored projections of month's budgets first_id..last_id for new ones in one transaction.
+    
+    The owners' data_version is bumped in the same transaction: it drives
+    the ETags and the budget summary cache of every API process, which
+    this one's result_cache can't reach unless it is shared.
+    """
+    budgets = select(Budget.id, Budget.user_id).where(
+        Budget.month == month,
+        Budget.id >= first_id,
+        Budget.id <= last_id
+    ).subquery()
+    budget_ids = select(budgets.c.id)
+    db.execute(
+        delete(BudgetProjection).where(BudgetProjection.budget_id.in_(budget_ids)),
+        execution_options={"synchronize_session": False}
+    )
+    if projections:
+        db.execute(insert(BudgetProjection.__table__), projections)
+    db.execute(
+        update(User).where(User.id.in_(select(budgets.c.user_id))).values(data_version=User.data_version + 1),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    result_cache.invalidate_month(month, [BUDGET_SUMMARY])
\ No newline at end of file
@@ -1,27 +1,76 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import delete, lambda_stmt, select
 from ..models.category import Category
+from ..models.expense import Expense
 from ..schemas.category import CategoryCreate, CategoryUpdate
+from .change_log import record_changes
+from .data_version import invalidate_results
+from .expense_search import unindex_expenses
+from .rows import fetch_rows
+
+CATEGORY_COLUMNS = (Category.id, Category.name, Category.user_id)
 
 def get_categories(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Category).filter(Category.user_id == user_id).offset(skip).limit(limit).all()
+    return fetch_rows(db, lambda_stmt(lambda: select(*CATEGORY_COLUMNS).where(Category.user_id == user_id).order_by(Category.id).offset(skip).limit(limit)))
+
+def get_categories_page(db: Session, user_id: int, limit: int = 100, after_id: int = None):
+    stmt = lambda_stmt(lambda: select(*CATEGORY_COLUMNS).where(Category.user_id == user_id))
+    if after_id is not None:
+        stmt += lambda s: s.where(Category.id > after_id)
+    stmt += lambda s: s.order_by(Category.id).limit(limit)
+    return fetch_rows(db, stmt)
+
+def get_categories_by_ids(db: Session, user_id: int, category_ids: list):
+    category_ids = list(category_ids)
+    return fetch_rows(db, lambda_stmt(lambda: select(*CATEGORY_COLUMNS).where(Category.user_id == user_id, Category.id.in_(category_ids))))
 
 def get_category_by_id(db: Session, category_id: int, user_id: int):
-    return db.query(Category).filter(
-        Category.id == category_id, 
+    return db.scalars(lambda_stmt(lambda: select(Category).where(
+        Category.id == category_id,
+        Category.user_id == user_id
+    ).limit(1))).first()
+
+def category_exists(db: Session, category_id: int, user_id: int) -> bool:
+    """Ownership check without loading the row"""
+    return db.scalar(lambda_stmt(lambda: select(Category.id).where(
+        Category.id == category_id,
+        Category.user_id == user_id
+    ).limit(1))) is not None
+
+def get_category_name(db: Session, category_id: int, user_id: int):
+    """Name of the user's category, or None if it isn't theirs"""
+    return db.scalar(lambda_stmt(lambda: select(Category.name).where(
+        Category.id == category_id,
         Category.user_id == user_id
-    ).first()
+    ).limit(1)))
+
+def get_owned_category_ids(db: Session, category_ids, user_id: int) -> set:
+    """The ids among category_ids that belong to the user, in one query"""
+    if not category_ids:
+        return set()
+    category_ids = list(category_ids)
+    return set(db.scalars(lambda_stmt(lambda: select(Category.id).where(
+        Category.id.in_(category_ids),
+        Category.user_id == user_id
+    ))))
 
 def get_category_by_name(db: Session, name: str, user_id: int):
-    return db.query(Category).filter(
+    return db.scalars(lambda_stmt(lambda: select(Category).where(
+        Category.name == name,
+        Category.user_id == user_id
+    ).limit(1))).first()
+
+def category_name_exists(db: Session, name: str, user_id: int) -> bool:
+    return db.scalar(lambda_stmt(lambda: select(Category.id).where(
         Category.name == name,
         Category.user_id == user_id
-    ).first()
+    ).limit(1))) is not None
 
 def create_category(db: Session, category: CategoryCreate, user_id: int):
     db_category = Category(**category.dict(), user_id=user_id)
     db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
+    db.flush()
+    record_changes(db, user_id, "category", [db_category.id])
     return db_category
 
 def update_category(db: Session, category_id: int, user_id: int, category_update: CategoryUpdate):
@@ -33,14 +82,22 @@ def update_category(db: Session, category_id: int, user_id: int, category_update
     for field, value in update_data.items():
         setattr(db_category, field, value)
     
-    db.commit()
-    db.refresh(db_category)
+    record_changes(db, user_id, "category", [db_category.id])
+    # Cached summaries and reports show the name in every month
+    invalidate_results(db, user_id)
+    db.flush()
     return db_category
 
 def delete_category(db: Session, category_id: int, user_id: int):
-    db_category = get_category_by_id(db, category_id, user_id)
-    if db_category:
-        db.delete(db_category)
-        db.commit()
-        return True
-    return False
\ No newline at end of file
+    """Delete the category; its expenses, budget and rollup rows go with it via
+    ON DELETE CASCADE, and sync clients drop them on the category's tombstone"""
+    unindex_expenses(db, select(Expense.id).where(Expense.category_id == category_id, Expense.user_id == user_id))
+    result = db.execute(
+        delete(Category).where(Category.id == category_id, Category.user_id == user_id),
+        execution_options={"synchronize_session": False}
+    )
+    if not result.rowcount:
+        return False
+    record_changes(db, user_id, "category", [category_id], deleted=True)
+    invalidate_results(db, user_id)
+    return True
\ No newline at end of file
@@ -0,0 +1,54 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, lambda_stmt, literal, select, update
+from ..models.user import User
+from ..models.change_log import ChangeLog
+
+def _reserve_change_seqs(db: Session, user_id: int, count: int) -> int:
+    """Bump the user's data_version by count and return the first of the
+    count seqs that the bump covers"""
+    last = db.execute(
+        update(User).where(User.id == user_id).values(data_version=User.data_version + count).returning(User.data_version),
+        execution_options={"synchronize_session": False}
+    ).scalar_one()
+    return last - count + 1
+
+def record_changes(db: Session, user_id: int, entity: str, entity_ids: list, deleted: bool = False):
+    """Log a write to each of entity_ids and bump the user's data_version;
+    takes the place of bump_data_version for synced entities"""
+    if not entity_ids:
+        return
+    first = _reserve_change_seqs(db, user_id, len(entity_ids))
+    db.execute(insert(ChangeLog), [
+        {"user_id": user_id, "change_seq": first + offset, "entity": entity, "entity_id": entity_id, "deleted": deleted}
+        for offset, entity_id in enumerate(entity_ids)
+    ])
+
+def record_selected_changes(db: Session, user_id: int, entity: str, id_column, conditions: list, count: int, deleted: bool = False):
+    """record_changes for the count rows matching conditions, in one
+    INSERT ... SELECT; run it before a set-based UPDATE or DELETE of them"""
+    if not count:
+        return
+    first = _reserve_change_seqs(db, user_id, count)
+    db.execute(insert(ChangeLog).from_select(
+        ["user_id", "change_seq", "entity", "entity_id", "deleted"],
+        select(
+            literal(user_id),
+            literal(first - 1) + func.row_number().over(order_by=id_column),
+            literal(entity),
+            id_column,
+            literal(deleted)
+        ).where(*conditions)
+    ))
+
+def get_changes(db: Session, user_id: int, since: int, limit: int):
+    """Up to limit (change_seq, entity, entity_id, deleted) rows after since,
+    oldest first; a client that is up to date costs one index probe"""
+    return db.execute(lambda_stmt(lambda: select(
+        ChangeLog.change_seq,
+        ChangeLog.entity,
+        ChangeLog.entity_id,
+        ChangeLog.deleted
+    ).where(
+        ChangeLog.user_id == user_id,
+        ChangeLog.change_seq > since
+    ).order_by(ChangeLog.change_seq).limit(limit))).all()
\ No newline at end of file
@@ -0,0 +1,36 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, lambda_stmt, select
+from ..models.budget import Budget
+from ..models.budget_projection import BudgetProjection
+from ..models.category import Category
+from ..models.monthly_category_total import MonthlyCategoryTotal
+
+def get_category_overview(db: Session, user_id: int, month: str):
+    """Every category with its spend, budget and budget projection for month, in one query"""
+    return db.execute(lambda_stmt(lambda: select(
+        Category.id.label("category_id"),
+        Category.name.label("category"),
+        func.coalesce(MonthlyCategoryTotal.total, 0.0).label("spent"),
+        func.coalesce(MonthlyCategoryTotal.count, 0).label("count"),
+        Budget.id.label("budget_id"),
+        Budget.amount.label("budget"),
+        BudgetProjection.projected_spend,
+        BudgetProjection.projected_overrun_date,
+        BudgetProjection.as_of.label("projected_as_of")
+    ).outerjoin(
+        MonthlyCategoryTotal,
+        and_(
+            MonthlyCategoryTotal.user_id == Category.user_id,
+            MonthlyCategoryTotal.category_id == Category.id,
+            MonthlyCategoryTotal.month == month
+        )
+    ).outerjoin(
+        Budget,
+        and_(
+            Budget.user_id == Category.user_id,
+            Budget.category_id == Category.id,
+            Budget.month == month
+        )
+    ).outerjoin(
+        BudgetProjection, BudgetProjection.budget_id == Budget.id
+    ).where(Category.user_id == user_id).order_by(Category.name))).all()
@@ -0,0 +1,40 @@
+from functools import partial
+from sqlalchemy.orm import Session
+from sqlalchemy import event, lambda_stmt, select, update
+from ..models.user import User
+from ..result_cache import ENDPOINTS, result_cache
+
+def bump_data_version(db: Session, user_id: int):
+    """Mark the user's data as changed, inside the caller's transaction"""
+    db.execute(
+        lambda_stmt(lambda: update(User).where(User.id == user_id).values(data_version=User.data_version + 1)),
+        execution_options={"synchronize_session": False}
+    )
+
+def _invalidate_pending(session):
+    pending = session.info["pending_invalidations"]
+    while pending:
+        pending.pop()()
+
+def invalidate_after_commit(db: Session, invalidate):
+    """Call invalidate() once the session's transaction commits"""
+    # One listener per session; once=True listeners are never removed, only disarmed
+    pending = db.info.get("pending_invalidations")
+    if pending is None:
+        pending = db.info["pending_invalidations"] = []
+        event.listen(db, "after_commit", _invalidate_pending)
+    pending.append(invalidate)
+
+def invalidate_results(db: Session, user_id: int, months=None, endpoints=ENDPOINTS):
+    """Drop the user's cached results for months (all of them when None) now and
+    again once the transaction commits, so a request that reads the old rows
+    in between can't leave them cached"""
+    if months is None:
+        invalidate = partial(result_cache.invalidate_user, user_id)
+    else:
+        invalidate = partial(result_cache.invalidate, user_id, set(months), endpoints)
+    invalidate()
+    invalidate_after_commit(db, invalidate)
+
+def get_data_version(db: Session, user_id: int) -> int:
+    return db.scalar(lambda_stmt(lambda: select(User.data_version).where(User.id == user_id))) or 0
\ No newline at end of file
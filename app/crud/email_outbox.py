@@ -0,0 +1,63 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, select, update
+from ..models.email_outbox import EmailOutbox
+from datetime import datetime, timedelta
+
+def enqueue_email(db: Session, to_email: str, subject: str, body: str):
+    db_email = EmailOutbox(to_email=to_email, subject=subject, body=body, next_attempt_at=datetime.utcnow())
+    db.add(db_email)
+    db.flush()
+    return db_email
+
+def claim_pending_emails(db: Session, limit: int = 50, claim_timeout: float = 300.0):
+    """Mark up to `limit` due messages as sending and return them, oldest first.
+
+    The claim is a single UPDATE, so two workers can never take the same
+    row: on SQLite the statement holds the write lock, on PostgreSQL the
+    subquery's SKIP LOCKED keeps workers off each other's rows. Messages
+    left in sending for longer than `claim_timeout` seconds belong to a
+    worker that died mid-batch and are claimed again. Commit before
+    sending so the claim is visible to other workers.
+    """
+    now = datetime.utcnow()
+    due = select(EmailOutbox.id).where(or_(
+        and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == "sending", EmailOutbox.claimed_at < now - timedelta(seconds=claim_timeout))
+    )).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(limit).with_for_update(skip_locked=True)
+    claimed = db.scalars(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due.scalar_subquery()))
+        .values(status="sending", claimed_at=now)
+        .returning(EmailOutbox),
+        execution_options={"synchronize_session": False}
+    ).all()
+    return sorted(claimed, key=lambda db_email: (db_email.next_attempt_at, db_email.id))
+
+def release_emails(db: Session, ids: list):
+    """Hand claimed messages back unsent, without counting an attempt"""
+    if ids:
+        db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids), EmailOutbox.status == "sending")
+            .values(status="pending", claimed_at=None),
+            execution_options={"synchronize_session": False}
+        )
+
+def mark_email_sent(db_email: EmailOutbox):
+    db_email.status = "sent"
+    db_email.attempts += 1
+    db_email.sent_at = datetime.utcnow()
+    db_email.claimed_at = None
+    db_email.last_error = None
+
+def mark_email_failed(db_email: EmailOutbox, error: str, max_attempts: int, base_delay: float = 30.0, max_delay: float = 3600.0):
+    """Schedule an exponential-backoff retry, or give up after max_attempts"""
+    db_email.attempts += 1
+    db_email.last_error = error[:500]
+    db_email.claimed_at = None
+    if db_email.attempts >= max_attempts:
+        db_email.status = "failed"
+        return
+    delay = min(base_delay * 2 ** (db_email.attempts - 1), max_delay)
+    db_email.status = "pending"
+    db_email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
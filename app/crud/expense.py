@@ -1,68 +1,365 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import delete, func, insert, lambda_stmt, literal_column, select, tuple_, update
 from ..models.expense import Expense
+from ..models.category import Category
+from ..models.monthly_category_total import MonthlyCategoryTotal
 from ..schemas.expense import ExpenseCreate, ExpenseUpdate
+from ..utils.dates import month_bounds
+from .monthly_total import apply_expense_delta, expense_month_column, get_month_total, month_key
+from .change_log import record_changes, record_selected_changes
+from .data_version import invalidate_results
+from .expense_search import index_expenses, ranked_search, reindex_expense, search_terms, unindex_expenses
+from .rows import fetch_rows
 from datetime import datetime
+from typing import Optional
+
+# ExpenseResponse columns; list reads project just these into plain dicts
+EXPENSE_COLUMNS = (Expense.id, Expense.description, Expense.amount, Expense.category_id, Expense.date, Expense.user_id)
 
 def get_expenses(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Expense).filter(Expense.user_id == user_id).offset(skip).limit(limit).all()
+    return fetch_rows(db, lambda_stmt(lambda: select(*EXPENSE_COLUMNS).where(Expense.user_id == user_id).order_by(Expense.id).offset(skip).limit(limit)))
+
+def get_expenses_page(db: Session, user_id: int, limit: int = 100, after: tuple = None, category_id: int = None):
+    """Newest-first keyset page; `after` is the (date, id) of the last row already seen"""
+    stmt = lambda_stmt(lambda: select(*EXPENSE_COLUMNS).where(Expense.user_id == user_id))
+    if category_id is not None:
+        stmt += lambda s: s.where(Expense.category_id == category_id)
+    if after is not None:
+        after_date, after_id = after
+        stmt += lambda s: s.where(tuple_(Expense.date, Expense.id) < tuple_(after_date, after_id))
+    stmt += lambda s: s.order_by(Expense.date.desc(), Expense.id.desc()).limit(limit)
+    return fetch_rows(db, stmt)
+
+def get_expenses_by_ids(db: Session, user_id: int, expense_ids: list):
+    expense_ids = list(expense_ids)
+    return fetch_rows(db, lambda_stmt(lambda: select(*EXPENSE_COLUMNS).where(Expense.user_id == user_id, Expense.id.in_(expense_ids))))
 
 def get_expense_by_id(db: Session, expense_id: int, user_id: int):
-    return db.query(Expense).filter(
+    return db.scalars(lambda_stmt(lambda: select(Expense).where(
         Expense.id == expense_id,
         Expense.user_id == user_id
-    ).first()
+    ).limit(1))).first()
 
 def get_expenses_by_category(db: Session, category_id: int, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(Expense).filter(
+    return fetch_rows(db, lambda_stmt(lambda: select(*EXPENSE_COLUMNS).where(
         Expense.category_id == category_id,
         Expense.user_id == user_id
-    ).offset(skip).limit(limit).all()
+    ).order_by(Expense.id).offset(skip).limit(limit)))
 
 def get_expenses_by_month(db: Session, user_id: int, year: int, month: int):
-    return db.query(Expense).filter(
+    # Half-open date range so the (user_id, date) index can be used
+    start, end = month_bounds(year, month)
+    return fetch_rows(db, lambda_stmt(lambda: select(*EXPENSE_COLUMNS).where(
         Expense.user_id == user_id,
-        extract('year', Expense.date) == year,
-        extract('month', Expense.date) == month
-    ).all()
+        Expense.date >= start,
+        Expense.date < end
+    )))
+
+# Sort keys for query_expenses; each is the trailing column of an index
+# that starts with user_id (see migrations 0001 and 0004)
+EXPENSE_SORT_COLUMNS = {
+    "date": Expense.date,
+    "amount": Expense.amount,
+    "description": func.lower(Expense.description),
+}
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with prefix, or None
+    when there is none (the prefix is all U+10FFFF)"""
+    prefix = prefix.rstrip("\U0010ffff")
+    if not prefix:
+        return None
+    code = ord(prefix[-1]) + 1
+    # Surrogates can't be encoded, and no stored text contains them
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000
+    return prefix[:-1] + chr(code)
+
+def query_expenses(db: Session, user_id: int, skip: int = 0, limit: int = 100,
+                   min_amount: float = None, max_amount: float = None,
+                   start: datetime = None, end: datetime = None,
+                   category_ids: list = None, prefix: str = None,
+                   sort: str = "date", descending: bool = True):
+    """Expenses matching every given filter; amounts are inclusive, dates are start <= date < end
+    and prefix matches the start of the description, ignoring case.
+    
+    Built as a lambda statement: each optional filter is its own lambda, so
+    every combination of filters has one cache key and its compiled SQL is
+    reused across calls, with the values passed as bound parameters.
+    """
+    stmt = lambda_stmt(lambda: select(*EXPENSE_COLUMNS).where(Expense.user_id == user_id))
+    if min_amount is not None:
+        stmt += lambda s: s.where(Expense.amount >= min_amount)
+    if max_amount is not None:
+        stmt += lambda s: s.where(Expense.amount <= max_amount)
+    if start is not None:
+        stmt += lambda s: s.where(Expense.date >= start)
+    if end is not None:
+        stmt += lambda s: s.where(Expense.date < end)
+    if category_ids:
+        # Expanding IN: one cache entry whatever the number of ids
+        stmt += lambda s: s.where(Expense.category_id.in_(category_ids))
+    if prefix:
+        if db.get_bind().dialect.name == "postgresql":
+            prefix = prefix.lower()
+            # Served by the text_pattern_ops index; a range over lower() would
+            # follow the column collation rather than plain prefixes
+            pattern = prefix.replace("/", "//").replace("%", "/%").replace("_", "/_") + "%"
+            stmt += lambda s: s.where(func.lower(Expense.description).like(pattern, escape="/"))
+        else:
+            # SQLite's lower() only folds ASCII letters
+            prefix = "".join(char.lower() if char.isascii() else char for char in prefix)
+            upper = _prefix_upper_bound(prefix)
+            if upper is None:
+                stmt += lambda s: s.where(func.lower(Expense.description) >= prefix)
+            else:
+                stmt += lambda s: s.where(func.lower(Expense.description) >= prefix, func.lower(Expense.description) < upper)
+    
+    sort_column = EXPENSE_SORT_COLUMNS[sort]
+    if descending:
+        stmt += lambda s: s.order_by(sort_column.desc(), Expense.id.desc())
+    else:
+        stmt += lambda s: s.order_by(sort_column.asc(), Expense.id.asc())
+    stmt += lambda s: s.offset(skip).limit(limit)
+    return fetch_rows(db, stmt)
+
+def search_expenses(db: Session, user_id: int, q: str, skip: int = 0, limit: int = 50,
+                    category_id: int = None, start: datetime = None, end: datetime = None):
+    """Best matches for q first; rows are ExpenseResponse dicts plus `rank`"""
+    stmt, rank = ranked_search(db, EXPENSE_COLUMNS, search_terms(q))
+    stmt = stmt.where(Expense.user_id == user_id)
+    if category_id is not None:
+        stmt = stmt.where(Expense.category_id == category_id)
+    if start is not None:
+        stmt = stmt.where(Expense.date >= start)
+    if end is not None:
+        stmt = stmt.where(Expense.date < end)
+    return fetch_rows(db, stmt.order_by(rank.desc(), Expense.id.desc()).offset(skip).limit(limit))
+
+def expense_export_query(user_id: int, start: datetime = None, end: datetime = None):
+    """Core select of exported columns, oldest first; rows come back as tuples, not ORM objects"""
+    stmt = select(
+        Expense.id,
+        Expense.date,
+        Expense.description,
+        Expense.amount,
+        Expense.category_id,
+        Category.name.label("category")
+    ).join(Category, Category.id == Expense.category_id).where(Expense.user_id == user_id)
+    if start is not None:
+        stmt = stmt.where(Expense.date >= start)
+    if end is not None:
+        stmt = stmt.where(Expense.date < end)
+    return stmt.order_by(Expense.date, Expense.id)
 
 def get_total_spent_by_category_month(db: Session, category_id: int, user_id: int, month: str):
-    # month format: "YYYY-MM"
-    year, month_num = month.split("-")
+    # month format: "YYYY-MM", served from the monthly_category_totals rollup
+    return get_month_total(db, category_id, user_id, month)
+
+def expense_bucket_column(db: Session, granularity: str):
+    """Start date ("YYYY-MM-DD") of the day, ISO week or month of Expense.date"""
+    if db.get_bind().dialect.name == "sqlite":
+        if granularity == "week":
+            # Forward to Sunday (or stay), then back to that week's Monday
+            return func.date(Expense.date, "weekday 0", "-6 days")
+        if granularity == "month":
+            return func.strftime("%Y-%m-01", Expense.date)
+        return func.date(Expense.date)
+    # Inline literals keep the GROUP BY, ORDER BY and window expressions
+    # textually identical, which PostgreSQL requires; granularity is validated
+    return func.to_char(func.date_trunc(literal_column(f"'{granularity}'"), Expense.date), literal_column("'YYYY-MM-DD'"))
+
+def get_spend_timeseries(db: Session, user_id: int, granularity: str, start: datetime, end: datetime, category_id: int = None):
+    """Total, count and running total per bucket for start <= date < end.
     
-    total = db.query(func.sum(Expense.amount)).filter(
-        Expense.category_id == category_id,
+    One GROUP BY with a window SUM over the groups; only buckets that have
+    expenses come back, so callers fill the gaps.
+    """
+    bucket = expense_bucket_column(db, granularity)
+    total = func.sum(Expense.amount)
+    stmt = select(
+        bucket.label("bucket"),
+        total.label("total"),
+        func.count(Expense.id).label("count"),
+        func.sum(total).over(order_by=bucket).label("cumulative")
+    ).where(
         Expense.user_id == user_id,
-        extract('year', Expense.date) == int(year),
-        extract('month', Expense.date) == int(month_num)
-    ).scalar()
+        Expense.date >= start,
+        Expense.date < end
+    )
+    if category_id is not None:
+        stmt = stmt.where(Expense.category_id == category_id)
+    return db.execute(stmt.group_by(bucket).order_by(bucket)).all()
+
+def _is_month_start(value: datetime) -> bool:
+    return value.day == 1 and value.time() == datetime.min.time()
+
+def get_category_month_totals(db: Session, user_id: int, start: datetime, end: datetime):
+    """Spend per (category, month) for expenses with start <= date < end.
+    
+    Month-aligned ranges are answered from the rollup; anything else is
+    a single GROUP BY over the expenses table.
+    """
+    if _is_month_start(start) and _is_month_start(end):
+        return db.execute(select(
+            Category.id.label("category_id"),
+            Category.name.label("category"),
+            MonthlyCategoryTotal.month,
+            MonthlyCategoryTotal.total,
+            MonthlyCategoryTotal.count
+        ).join(
+            Category, Category.id == MonthlyCategoryTotal.category_id
+        ).where(
+            MonthlyCategoryTotal.user_id == user_id,
+            MonthlyCategoryTotal.month >= month_key(start),
+            MonthlyCategoryTotal.month < month_key(end),
+            MonthlyCategoryTotal.count > 0
+        ).order_by(MonthlyCategoryTotal.month, Category.name)).all()
     
-    return total or 0.0
+    month = expense_month_column(db)
+    return db.execute(select(
+        Category.id.label("category_id"),
+        Category.name.label("category"),
+        month.label("month"),
+        func.sum(Expense.amount).label("total"),
+        func.count(Expense.id).label("count")
+    ).join(
+        Category, Category.id == Expense.category_id
+    ).where(
+        Expense.user_id == user_id,
+        Expense.date >= start,
+        Expense.date < end
+    ).group_by(Category.id, Category.name, month).order_by(month, Category.name)).all()
 
 def create_expense(db: Session, expense: ExpenseCreate, user_id: int):
     db_expense = Expense(**expense.dict(), user_id=user_id)
+    if db_expense.date is None:
+        db_expense.date = datetime.utcnow()
     db.add(db_expense)
-    db.commit()
-    db.refresh(db_expense)
+    apply_expense_delta(db, user_id, db_expense.category_id, month_key(db_expense.date), db_expense.amount, 1)
+    db.flush()
+    index_expenses(db, [(db_expense.id, db_expense.description)])
+    record_changes(db, user_id, "expense", [db_expense.id])
+    invalidate_results(db, user_id, [month_key(db_expense.date)])
     return db_expense
 
+def create_expenses_bulk(db: Session, rows: list, user_id: int, batch_size: int = 500):
+    """Insert validated rows (description, amount, category_id, date) in one transaction.
+    
+    Rows go in as multi-row INSERT ... RETURNING batches and the rollup gets
+    one delta per (category, month) rather than one per row. Returns the new
+    ids in row order.
+    """
+    now = datetime.utcnow()
+    values = [{**row, "date": row.get("date") or now, "user_id": user_id} for row in rows]
+    
+    # SQLite can't keep batching with sort_by_parameter_order, but one INSERT
+    # assigns ascending rowids in VALUES order, so sorting RETURNING restores it
+    ordered = db.get_bind().dialect.name != "sqlite"
+    stmt = insert(Expense).returning(Expense.id, sort_by_parameter_order=ordered)
+    ids = []
+    for start in range(0, len(values), batch_size):
+        batch_ids = db.scalars(stmt, values[start:start + batch_size]).all()
+        ids.extend(batch_ids if ordered else sorted(batch_ids))
+    index_expenses(db, [(expense_id, row["description"]) for expense_id, row in zip(ids, values)])
+    
+    deltas = {}
+    for row in values:
+        key = (row["category_id"], month_key(row["date"]))
+        total, count = deltas.get(key, (0.0, 0))
+        deltas[key] = (total + row["amount"], count + 1)
+    for (category_id, month), (total, count) in deltas.items():
+        apply_expense_delta(db, user_id, category_id, month, total, count)
+    record_changes(db, user_id, "expense", ids)
+    invalidate_results(db, user_id, [month for _, month in deltas])
+    return ids
+
 def update_expense(db: Session, expense_id: int, user_id: int, expense_update: ExpenseUpdate):
     db_expense = get_expense_by_id(db, expense_id, user_id)
     if not db_expense:
         return None
     
+    old_category_id, old_month, old_amount = db_expense.category_id, month_key(db_expense.date), db_expense.amount
+    old_description = db_expense.description
+    
     update_data = expense_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_expense, field, value)
     
-    db.commit()
-    db.refresh(db_expense)
+    new_month = month_key(db_expense.date)
+    if (old_category_id, old_month, old_amount) != (db_expense.category_id, new_month, db_expense.amount):
+        apply_expense_delta(db, user_id, old_category_id, old_month, -old_amount, -1)
+        apply_expense_delta(db, user_id, db_expense.category_id, new_month, db_expense.amount, 1)
+        invalidate_results(db, user_id, [old_month, new_month])
+    if db_expense.description != old_description:
+        reindex_expense(db, db_expense.id, db_expense.description)
+    
+    record_changes(db, user_id, "expense", [db_expense.id])
+    db.flush()
     return db_expense
 
 def delete_expense(db: Session, expense_id: int, user_id: int):
     db_expense = get_expense_by_id(db, expense_id, user_id)
     if db_expense:
+        apply_expense_delta(db, user_id, db_expense.category_id, month_key(db_expense.date), -db_expense.amount, -1)
+        invalidate_results(db, user_id, [month_key(db_expense.date)])
+        unindex_expenses(db, [db_expense.id])
         db.delete(db_expense)
-        db.commit()
+        record_changes(db, user_id, "expense", [expense_id], deleted=True)
+        db.flush()
         return True
-    return False
\ No newline at end of file
+    return False
+
+def _month_groups(db: Session, conditions: list):
+    """(category_id, month, total, count) of the expenses matching conditions, for the rollup"""
+    month = expense_month_column(db)
+    return db.execute(select(
+        Expense.category_id,
+        month,
+        func.sum(Expense.amount),
+        func.count(Expense.id)
+    ).where(*conditions).group_by(Expense.category_id, month)).all()
+
+def delete_expenses(db: Session, user_id: int, expense_ids: list = None, start: datetime = None, end: datetime = None) -> int:
+    """Delete the user's expenses by id and/or start <= date < end with set-based
+    statements, whatever the row count; returns how many were deleted"""
+    conditions = [Expense.user_id == user_id]
+    if expense_ids is not None:
+        conditions.append(Expense.id.in_(expense_ids))
+    if start is not None:
+        conditions.append(Expense.date >= start)
+    if end is not None:
+        conditions.append(Expense.date < end)
+    
+    groups = _month_groups(db, conditions)
+    if not groups:
+        return 0
+    record_selected_changes(db, user_id, "expense", Expense.id, conditions, sum(count for *_, count in groups), deleted=True)
+    unindex_expenses(db, select(Expense.id).where(*conditions))
+    result = db.execute(delete(Expense).where(*conditions), execution_options={"synchronize_session": False})
+    for category_id, month, total, count in groups:
+        apply_expense_delta(db, user_id, category_id, month, -total, -count)
+    invalidate_results(db, user_id, [month for _, month, *_ in groups])
+    return result.rowcount
+
+def recategorize_expenses(db: Session, user_id: int, expense_ids: list, category_id: int) -> int:
+    """Move the user's expenses to category_id in one UPDATE; returns how many changed category"""
+    conditions = [Expense.user_id == user_id, Expense.id.in_(expense_ids), Expense.category_id != category_id]
+    
+    groups = _month_groups(db, conditions)
+    if not groups:
+        return 0
+    record_selected_changes(db, user_id, "expense", Expense.id, conditions, sum(count for *_, count in groups))
+    result = db.execute(
+        update(Expense).where(*conditions).values(category_id=category_id),
+        execution_options={"synchronize_session": False}
+    )
+    moved = {}
+    for old_category_id, month, total, count in groups:
+        apply_expense_delta(db, user_id, old_category_id, month, -total, -count)
+        moved_total, moved_count = moved.get(month, (0.0, 0))
+        moved[month] = (moved_total + total, moved_count + count)
+    for month, (total, count) in moved.items():
+        apply_expense_delta(db, user_id, category_id, month, total, count)
+    invalidate_results(db, user_id, moved)
+    return result.rowcount
\ No newline at end of file
@@ -0,0 +1,74 @@
+import re
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, column, delete, func, insert, literal_column, select, table
+from ..models.expense import Expense
+
+# SQLite keeps a standalone FTS5 table, expenses_fts (rowid = expense id),
+# which the expense writes below update in the same transaction. PostgreSQL
+# indexes the description itself (tsvector and trigram GIN indexes from
+# migration 0003), so there is nothing to maintain. Other dialects fall back
+# to an unranked ILIKE scan.
+expenses_fts = table("expenses_fts", column("rowid"), column("description"))
+
+def _uses_fts(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+def search_terms(q: str) -> list:
+    """Lower-cased word tokens of a user query; punctuation is never passed to the engines"""
+    return re.findall(r"\w+", q.lower())
+
+def index_expenses(db: Session, expenses: list):
+    """Index newly inserted (id, description) pairs inside the caller's transaction"""
+    if not _uses_fts(db) or not expenses:
+        return
+    db.execute(
+        insert(expenses_fts).values(rowid=bindparam("id"), description=bindparam("description")),
+        [{"id": expense_id, "description": description} for expense_id, description in expenses]
+    )
+
+def reindex_expense(db: Session, expense_id: int, description: str):
+    if not _uses_fts(db):
+        return
+    db.execute(delete(expenses_fts).where(expenses_fts.c.rowid == expense_id))
+    db.execute(insert(expenses_fts).values(rowid=expense_id, description=description))
+
+def unindex_expenses(db: Session, expense_ids):
+    """Drop index entries; expense_ids may be a list or a select of ids, which
+    is deleted set-based in one statement. Call before deleting the expenses."""
+    if not _uses_fts(db):
+        return
+    if not isinstance(expense_ids, list):
+        db.execute(delete(expenses_fts).where(expenses_fts.c.rowid.in_(expense_ids)))
+    elif expense_ids:
+        db.execute(delete(expenses_fts).where(expenses_fts.c.rowid == bindparam("id")), [{"id": expense_id} for expense_id in expense_ids])
+
+def ranked_search(db: Session, columns, terms: list):
+    """Select columns plus a `rank` (higher is better) for expenses matching
+    every term as a word prefix; returns (stmt, rank)"""
+    dialect = db.get_bind().dialect.name
+    
+    if dialect == "sqlite":
+        # FTS5 takes the table name on the left of MATCH and in bm25()
+        fts = literal_column("expenses_fts")
+        match = " ".join(f'"{term}"*' for term in terms)
+        # bm25() is lower for better matches
+        rank = (-func.bm25(fts)).label("rank")
+        stmt = select(*columns, rank).select_from(
+            expenses_fts.join(Expense.__table__, Expense.id == expenses_fts.c.rowid)
+        ).where(fts.op("MATCH")(match))
+    elif dialect == "postgresql":
+        document = func.to_tsvector(literal_column("'simple'"), Expense.description)
+        query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+        phrase = " ".join(terms)
+        # ILIKE (served by the trigram index) also finds matches inside words;
+        # similarity() lifts descriptions close to the whole query
+        rank = (func.ts_rank(document, query) + func.similarity(Expense.description, phrase)).label("rank")
+        stmt = select(*columns, rank).where(
+            document.op("@@")(query) | Expense.description.icontains(phrase, autoescape=True)
+        )
+    else:
+        rank = literal_column("0.0").label("rank")
+        stmt = select(*columns, rank)
+        for term in terms:
+            stmt = stmt.where(Expense.description.icontains(term, autoescape=True))
+    return stmt, rank
\ No newline at end of file
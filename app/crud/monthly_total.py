@@ -0,0 +1,131 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Integer, delete, func, insert, lambda_stmt, select
+from sqlalchemy.dialects import postgresql, sqlite
+from ..models.expense import Expense
+from ..models.monthly_category_total import MonthlyCategoryTotal
+from datetime import datetime
+
+def month_key(date: datetime) -> str:
+    return date.strftime("%Y-%m")
+
+def apply_expense_delta(db: Session, user_id: int, category_id: int, month: str, amount: float, count: int):
+    """Add amount/count to a rollup row without committing, creating the row if needed"""
+    dialect = db.get_bind().dialect.name
+    values = dict(user_id=user_id, category_id=category_id, month=month, total=amount, count=count)
+
+    if dialect in ("postgresql", "sqlite"):
+        insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert_fn(MonthlyCategoryTotal).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "category_id", "month"],
+            set_={
+                "total": MonthlyCategoryTotal.total + stmt.excluded.total,
+                "count": MonthlyCategoryTotal.count + stmt.excluded.count,
+            },
+        )
+        db.execute(stmt)
+        return
+
+    # Generic fallback for dialects without ON CONFLICT support
+    row = db.scalars(select(MonthlyCategoryTotal).where(
+        MonthlyCategoryTotal.user_id == user_id,
+        MonthlyCategoryTotal.category_id == category_id,
+        MonthlyCategoryTotal.month == month
+    ).with_for_update().limit(1)).first()
+    if row:
+        row.total += amount
+        row.count += count
+    else:
+        db.add(MonthlyCategoryTotal(**values))
+    db.flush()
+
+def get_month_total(db: Session, category_id: int, user_id: int, month: str) -> float:
+    total = db.scalar(lambda_stmt(lambda: select(MonthlyCategoryTotal.total).where(
+        MonthlyCategoryTotal.category_id == category_id,
+        MonthlyCategoryTotal.user_id == user_id,
+        MonthlyCategoryTotal.month == month
+    )))
+
+    return total or 0.0
+
+def expense_month_column(db: Session):
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m", Expense.date)
+    return func.to_char(Expense.date, "YYYY-MM")
+
+def expense_day_column(db: Session):
+    """Day of month of Expense.date as an integer"""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.cast(func.strftime("%d", Expense.date), Integer)
+    return func.cast(func.extract("day", Expense.date), Integer)
+
+def _totals_from_expenses(db: Session, user_id: int = None):
+    month = expense_month_column(db)
+    stmt = select(
+        Expense.user_id,
+        Expense.category_id,
+        month.label("month"),
+        func.sum(Expense.amount).label("total"),
+        func.count(Expense.id).label("count")
+    )
+    if user_id is not None:
+        stmt = stmt.where(Expense.user_id == user_id)
+    return stmt.group_by(Expense.user_id, Expense.category_id, month)
+
+def rebuild_monthly_totals(db: Session, user_id: int = None) -> int:
+    """Recompute the rollup from the expenses table, for one user or everyone"""
+    delete_stmt = delete(MonthlyCategoryTotal)
+    if user_id is not None:
+        delete_stmt = delete_stmt.where(MonthlyCategoryTotal.user_id == user_id)
+    db.execute(delete_stmt, execution_options={"synchronize_session": False})
+
+    source = _totals_from_expenses(db, user_id).subquery()
+    db.execute(
+        insert(MonthlyCategoryTotal).from_select(
+            ["user_id", "category_id", "month", "total", "count"],
+            select(source.c.user_id, source.c.category_id, source.c.month, source.c.total, source.c.count)
+        )
+    )
+    db.commit()
+
+    count_stmt = select(func.count(MonthlyCategoryTotal.id))
+    if user_id is not None:
+        count_stmt = count_stmt.where(MonthlyCategoryTotal.user_id == user_id)
+    return db.scalar(count_stmt)
+
+def verify_monthly_totals(db: Session, user_id: int = None, tolerance: float = 0.005):
+    """Compare the rollup with the expenses table and return the rows that disagree"""
+    expected = {
+        (row.user_id, row.category_id, row.month): (row.total, row.count)
+        for row in db.execute(_totals_from_expenses(db, user_id))
+    }
+
+    stored_stmt = select(
+        MonthlyCategoryTotal.user_id,
+        MonthlyCategoryTotal.category_id,
+        MonthlyCategoryTotal.month,
+        MonthlyCategoryTotal.total,
+        MonthlyCategoryTotal.count
+    )
+    if user_id is not None:
+        stored_stmt = stored_stmt.where(MonthlyCategoryTotal.user_id == user_id)
+    stored = {
+        (row.user_id, row.category_id, row.month): (row.total, row.count)
+        for row in db.execute(stored_stmt)
+    }
+
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        expected_total, expected_count = expected.get(key, (0.0, 0))
+        stored_total, stored_count = stored.get(key, (0.0, 0))
+        if expected_count != stored_count or abs(expected_total - stored_total) > tolerance:
+            mismatches.append({
+                "user_id": key[0],
+                "category_id": key[1],
+                "month": key[2],
+                "expected_total": expected_total,
+                "expected_count": expected_count,
+                "stored_total": stored_total,
+                "stored_count": stored_count,
+            })
+    return mismatches
@@ -0,0 +1,7 @@
+from sqlalchemy.orm import Session
+
+def fetch_rows(db: Session, stmt) -> list:
+    """Run a Core select and return plain dicts, without building ORM objects"""
+    result = db.execute(stmt)
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
@@ -1,27 +1,52 @@
+from functools import partial
 from sqlalchemy.orm import Session
+from sqlalchemy import delete, lambda_stmt, select
 from ..models.user import User
+from ..models.expense import Expense
 from ..schemas.user import UserCreate, UserUpdate
 from ..auth.password import get_password_hash
+from ..auth.principal_cache import principal_cache
+from .data_version import bump_data_version, invalidate_after_commit, invalidate_results
+from .expense_search import unindex_expenses
+
+def user_snapshot(user: User) -> dict:
+    """Column values of a user, safe to keep after its session is closed"""
+    return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+def _invalidate_principal(db: Session, user_id: int):
+    """Drop cached principals now and again once the transaction commits, so a
+    request that reads the old row in between can't leave it cached"""
+    principal_cache.invalidate_user(user_id)
+    invalidate_after_commit(db, partial(principal_cache.invalidate_user, user_id))
+
+# Point lookups are lambda statements: the select is built once and its
+# compiled form is reused, with only the bound value changing per call
 
 def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+    return db.scalars(lambda_stmt(lambda: select(User).where(User.email == email).limit(1))).first()
 
 def get_user_by_username(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+    return db.scalars(lambda_stmt(lambda: select(User).where(User.username == username).limit(1))).first()
 
 def get_user_by_id(db: Session, user_id: int):
-    return db.query(User).filter(User.id == user_id).first()
+    return db.scalars(lambda_stmt(lambda: select(User).where(User.id == user_id).limit(1))).first()
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+def email_exists(db: Session, email: str) -> bool:
+    return db.scalar(lambda_stmt(lambda: select(User.id).where(User.email == email).limit(1))) is not None
+
+def username_exists(db: Session, username: str) -> bool:
+    return db.scalar(lambda_stmt(lambda: select(User.id).where(User.username == username).limit(1))) is not None
+
+def create_user(db: Session, user: UserCreate, hashed_password: str = None):
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    db.flush()
     return db_user
 
 def update_user(db: Session, user_id: int, user_update: UserUpdate):
@@ -33,14 +58,29 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate):
     for field, value in update_data.items():
         setattr(db_user, field, value)
     
-    db.commit()
-    db.refresh(db_user)
+    bump_data_version(db, user_id)
+    db.flush()
+    _invalidate_principal(db, user_id)
+    # Reports include monthly_income
+    invalidate_results(db, user_id)
     return db_user
 
-def delete_user(db: Session, user_id: int):
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
     db_user = get_user_by_id(db, user_id)
-    if db_user:
-        db.delete(db_user)
-        db.commit()
-        return True
-    return False
\ No newline at end of file
+    if not db_user:
+        return None
+    
+    db_user.hashed_password = hashed_password
+    db.flush()
+    _invalidate_principal(db, user_id)
+    return db_user
+
+def delete_user(db: Session, user_id: int):
+    """Delete the user; everything they own goes with them via ON DELETE CASCADE"""
+    unindex_expenses(db, select(Expense.id).where(Expense.user_id == user_id))
+    result = db.execute(delete(User).where(User.id == user_id), execution_options={"synchronize_session": False})
+    if not result.rowcount:
+        return False
+    _invalidate_principal(db, user_id)
+    invalidate_results(db, user_id)
+    return True
\ No newline at end of file
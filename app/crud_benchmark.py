@@ -0,0 +1,194 @@
+"""Per-call overhead of the crud functions, run with `python -m app.cli bench-crud`.
+
+Every function runs against a scratch in-memory SQLite database seeded
+with one user's data, so the timings are dominated by statement
+construction, compilation and result loading rather than disk I/O.
+Run it before and after a change to the crud layer and compare.
+"""
+import gc
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from .database import Base, enable_sqlite_foreign_keys
+from . import models  # noqa: F401 - register tables before create_all
+from .crud import budget as crud_budget
+from .crud import budget_projection as crud_projection
+from .crud import category as crud_category
+from .crud import change_log as crud_change_log
+from .crud import dashboard as crud_dashboard
+from .crud import data_version as crud_data_version
+from .crud import expense as crud_expense
+from .crud import monthly_total as crud_monthly_total
+from .crud import user as crud_user
+from .migrations import run_migrations
+from .schemas.budget import BudgetCreate, BudgetUpdate
+from .schemas.category import CategoryCreate, CategoryUpdate
+from .schemas.expense import ExpenseCreate, ExpenseUpdate
+from .schemas.user import UserCreate, UserUpdate
+
+def seed(db, categories: int = 20, expenses: int = 2000):
+    """One user with categories, a budget per category this month and expenses over the last year"""
+    user = crud_user.create_user(db, UserCreate(email="bench@example.com", username="bench", password="x"), "x")
+    category_ids = [
+        crud_category.create_category(db, CategoryCreate(name=f"Category {i}"), user.id).id
+        for i in range(categories)
+    ]
+    now = datetime.utcnow()
+    month = now.strftime("%Y-%m")
+    # The last category is left without a budget for the create_budget case
+    budget_ids = [
+        crud_budget.create_budget(db, BudgetCreate(category_id=category_id, amount=500.0, month=month), user.id).id
+        for category_id in category_ids[:-1]
+    ]
+    rows = [
+        {
+            "description": f"Expense {i} at shop {i % 37}",
+            "amount": float(i % 97) + 0.5,
+            "category_id": category_ids[i % categories],
+            "date": now - timedelta(hours=i * 4)
+        }
+        for i in range(expenses)
+    ]
+    expense_ids = crud_expense.create_expenses_bulk(db, rows, user.id)
+    db.commit()
+    return {
+        "user_id": user.id,
+        "category_ids": category_ids,
+        "budget_ids": budget_ids,
+        "expense_ids": expense_ids,
+        "month": month,
+        "now": now,
+    }
+
+def committed(fn):
+    """Run a crud write and commit it, as UnitOfWorkRoute does at the end of a request"""
+    def call(db):
+        fn(db)
+        db.commit()
+    return call
+
+def cases(data: dict):
+    """(name, fn(db)) pairs; writes undo themselves so every call sees the same data"""
+    user_id = data["user_id"]
+    category_id = data["category_ids"][0]
+    free_category_id = data["category_ids"][-1]
+    budget_id = data["budget_ids"][0]
+    expense_id = data["expense_ids"][0]
+    month = data["month"]
+    now = data["now"]
+    start, end = now - timedelta(days=90), now + timedelta(days=1)
+    year, month_number = now.year, now.month
+
+    @committed
+    def create_and_delete_expense(db):
+        expense = crud_expense.create_expense(db, ExpenseCreate(description="Coffee", amount=3.5, category_id=category_id), user_id)
+        crud_expense.delete_expense(db, expense.id, user_id)
+
+    @committed
+    def create_and_delete_category(db):
+        category = crud_category.create_category(db, CategoryCreate(name="Scratch"), user_id)
+        crud_category.delete_category(db, category.id, user_id)
+
+    @committed
+    def create_and_delete_budget(db):
+        budget = crud_budget.create_budget(db, BudgetCreate(category_id=free_category_id, amount=10.0, month=month), user_id)
+        crud_budget.delete_budget(db, budget.id, user_id)
+
+    @committed
+    def apply_expense_delta(db):
+        crud_monthly_total.apply_expense_delta(db, user_id, category_id, month, 0.0, 0)
+
+    @committed
+    def bump_data_version(db):
+        crud_data_version.bump_data_version(db, user_id)
+
+    return [
+        ("get_user_by_email", lambda db: crud_user.get_user_by_email(db, "bench@example.com")),
+        ("get_user_by_username", lambda db: crud_user.get_user_by_username(db, "bench")),
+        ("get_user_by_id", lambda db: crud_user.get_user_by_id(db, user_id)),
+        ("email_exists", lambda db: crud_user.email_exists(db, "bench@example.com")),
+        ("username_exists", lambda db: crud_user.username_exists(db, "bench")),
+        ("update_user", committed(lambda db: crud_user.update_user(db, user_id, UserUpdate(username="bench")))),
+        ("get_categories", lambda db: crud_category.get_categories(db, user_id)),
+        ("get_categories_page", lambda db: crud_category.get_categories_page(db, user_id, 10, category_id)),
+        ("get_category_by_id", lambda db: crud_category.get_category_by_id(db, category_id, user_id)),
+        ("category_exists", lambda db: crud_category.category_exists(db, category_id, user_id)),
+        ("get_category_name", lambda db: crud_category.get_category_name(db, category_id, user_id)),
+        ("get_owned_category_ids", lambda db: crud_category.get_owned_category_ids(db, data["category_ids"], user_id)),
+        ("get_category_by_name", lambda db: crud_category.get_category_by_name(db, "Category 1", user_id)),
+        ("category_name_exists", lambda db: crud_category.category_name_exists(db, "Category 1", user_id)),
+        ("create_category + delete_category", create_and_delete_category),
+        ("update_category", committed(lambda db: crud_category.update_category(db, category_id, user_id, CategoryUpdate(name="Category 0")))),
+        ("get_budgets", lambda db: crud_budget.get_budgets(db, user_id)),
+        ("get_budgets_page", lambda db: crud_budget.get_budgets_page(db, user_id, 10, budget_id)),
+        ("get_budget_by_id", lambda db: crud_budget.get_budget_by_id(db, budget_id, user_id)),
+        ("get_budget_by_category", lambda db: crud_budget.get_budget_by_category(db, category_id, month, user_id)),
+        ("get_budget_amount", lambda db: crud_budget.get_budget_amount(db, category_id, month, user_id)),
+        ("budget_exists", lambda db: crud_budget.budget_exists(db, category_id, month, user_id)),
+        ("get_budget_summary", lambda db: crud_budget.get_budget_summary(db, user_id, month)),
+        ("create_budget + delete_budget", create_and_delete_budget),
+        ("update_budget", committed(lambda db: crud_budget.update_budget(db, budget_id, user_id, BudgetUpdate(amount=500.0)))),
+        ("get_expenses", lambda db: crud_expense.get_expenses(db, user_id, 0, 20)),
+        ("get_expenses_page", lambda db: crud_expense.get_expenses_page(db, user_id, 20)),
+        ("get_expense_by_id", lambda db: crud_expense.get_expense_by_id(db, expense_id, user_id)),
+        ("get_expenses_by_category", lambda db: crud_expense.get_expenses_by_category(db, category_id, user_id, 0, 20)),
+        ("get_expenses_by_month", lambda db: crud_expense.get_expenses_by_month(db, user_id, year, month_number)),
+        ("query_expenses", lambda db: crud_expense.query_expenses(db, user_id, 0, 20, 10.0, 50.0, start, end, data["category_ids"][:3])),
+        ("search_expenses", lambda db: crud_expense.search_expenses(db, user_id, "shop 3", 0, 20)),
+        ("get_total_spent_by_category_month", lambda db: crud_expense.get_total_spent_by_category_month(db, category_id, user_id, month)),
+        ("get_category_month_totals", lambda db: crud_expense.get_category_month_totals(db, user_id, start, end)),
+        ("get_spend_timeseries", lambda db: crud_expense.get_spend_timeseries(db, user_id, "week", start, end)),
+        ("create_expense + delete_expense", create_and_delete_expense),
+        ("update_expense", committed(lambda db: crud_expense.update_expense(db, expense_id, user_id, ExpenseUpdate(amount=0.5)))),
+        ("apply_expense_delta", apply_expense_delta),
+        ("get_month_total", lambda db: crud_monthly_total.get_month_total(db, category_id, user_id, month)),
+        ("bump_data_version", bump_data_version),
+        ("get_data_version", lambda db: crud_data_version.get_data_version(db, user_id)),
+        ("get_changes", lambda db: crud_change_log.get_changes(db, user_id, 0, 500)),
+        ("get_changes (up to date)", lambda db: crud_change_log.get_changes(db, user_id, 1 << 40, 500)),
+        ("get_category_overview", lambda db: crud_dashboard.get_category_overview(db, user_id, month)),
+        ("get_month_budgets", lambda db: crud_projection.get_month_budgets(db, month)),
+    ]
+
+def run(calls: int = 1000, warmup: int = 50, only: str = None):
+    """Median and p90 microseconds per call for each case, as (name, median, p90) rows"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    enable_sqlite_foreign_keys(engine)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    try:
+        data = seed(db)
+        results = []
+        for name, fn in cases(data):
+            if only and only not in name:
+                continue
+            for _ in range(warmup):
+                fn(db)
+                db.expunge_all()
+            timings = []
+            # As in timeit, keep collector pauses out of the timings
+            gc.collect()
+            gc.disable()
+            try:
+                for _ in range(calls):
+                    start = time.perf_counter()
+                    fn(db)
+                    timings.append(time.perf_counter() - start)
+                    # Each request starts with an empty identity map
+                    db.expunge_all()
+            finally:
+                gc.enable()
+            timings.sort()
+            results.append((name, statistics.median(timings) * 1e6, timings[int(len(timings) * 0.9)] * 1e6))
+        return results
+    finally:
+        db.close()
+        engine.dispose()
\ No newline at end of file
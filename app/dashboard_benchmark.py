@@ -0,0 +1,61 @@
+"""GET /dashboard against the three calls the dashboard page used to make,
+run with `python -m app.cli bench-dashboard`.
+
+Starts the API on a scratch database (see http_benchmark.ScratchServer)
+with one user's categories, budgets and expenses. A page load is either
+one GET /dashboard/ or GET /budgets/summary, /expenses/ and /categories/
+sent in parallel, as the page did before. A parallel load is as slow as
+its slowest call. Both patterns are measured at each concurrency level.
+Pass --no-principal-cache to also pay for authentication on every call,
+which was the case when /dashboard was added.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+
+from .http_benchmark import ScratchServer, load, register
+
+THREE_CALLS = ("/budgets/summary", "/expenses/", "/categories/")
+
+async def seed(client, categories: int, expenses: int) -> dict:
+    headers = await register(client, f"dashboard_{uuid.uuid4().hex[:12]}")
+    month = datetime.utcnow().strftime("%Y-%m")
+    category_ids = []
+    for i in range(categories):
+        response = await client.post("/categories/", json={"name": f"Category {i}"}, headers=headers)
+        category_ids.append(response.json()["id"])
+        await client.post("/budgets/", json={"category_id": category_ids[-1], "amount": 500.0, "month": month}, headers=headers)
+    for offset in range(0, expenses, 5000):
+        await client.post("/expenses/bulk", json=[
+            {"description": f"Expense {i}", "amount": 1.0 + i % 50, "category_id": category_ids[i % categories]}
+            for i in range(offset, min(offset + 5000, expenses))
+        ], headers=headers)
+    return headers
+
+async def measure(base_url: str, concurrency: list, duration: float, categories: int, expenses: int) -> list:
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(concurrency) * len(THREE_CALLS))
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        headers = await seed(client, categories, expenses)
+
+        async def dashboard(i):
+            return await client.get("/dashboard/", headers=headers)
+
+        async def three_calls(i):
+            responses = await asyncio.gather(*(client.get(path, headers=headers) for path in THREE_CALLS))
+            return next((response for response in responses if not response.is_success), responses[-1])
+
+        results = []
+        for clients in concurrency:
+            for pattern, send in (("three calls", three_calls), ("/dashboard", dashboard)):
+                result = await load(send, clients, duration)
+                results.append({"pattern": pattern, "concurrency": clients, **result})
+        return results
+
+def run(concurrency=(1, 16, 64), duration: float = 10.0, categories: int = 20, expenses: int = 5000,
+        principal_cache: bool = True) -> list:
+    """One result dict per (concurrency, pattern); rps and latencies are per page load"""
+    env = None if principal_cache else {"PRINCIPAL_CACHE_SIZE": "0"}
+    with ScratchServer(env) as server:
+        return asyncio.run(measure(server.base_url, list(concurrency), duration, categories, expenses))
@@ -1,17 +1,204 @@
-from sqlalchemy import create_engine
+import asyncio
+import weakref
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
 from .config import settings
+from . import query_tracker
+
+def enable_sqlite_foreign_keys(engine):
+    """SQLite ignores foreign keys, ON DELETE CASCADE included, unless every
+    connection turns them on"""
+    if engine.dialect.name != "sqlite":
+        return
+    
+    @event.listens_for(engine, "connect")
+    def set_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 
-engine = create_engine(settings.DATABASE_URL)
+def pool_options(url: str) -> dict:
+    """Pool sizing for create_engine; in-memory SQLite gets a pool without
+    overflow, so it is left alone"""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {"pool_size": settings.DATABASE_POOL_SIZE, "max_overflow": settings.DATABASE_MAX_OVERFLOW}
+
+engine = create_engine(settings.DATABASE_URL, **pool_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+enable_sqlite_foreign_keys(engine)
+query_tracker.install(engine)
 
 Base = declarative_base()
 
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching async driver"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgresql:") or url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+# The sync engine is always available for startup, the CLI and background
+# workers; request handlers use the async engine when DATABASE_ASYNC is set.
+async_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    enable_sqlite_foreign_keys(async_engine.sync_engine)
+    query_tracker.install(async_engine.sync_engine)
+
+class RequestDB(ABC):
+    """Per-request database handle passed to routes by get_db.
+
+    Routes call crud functions through `await db.run(crud_fn, *args)`, so
+    the same crud code serves both the sync and the async engine. Crud
+    writes only flush; UnitOfWorkRoute commits the request's work once.
+    """
+    def __init__(self, session):
+        self.session = session
+
+    @abstractmethod
+    async def run(self, fn, *args, **kwargs):
+        """Call a crud function as fn(session, *args, **kwargs)"""
+
+    @abstractmethod
+    async def commit(self):
+        ...
+
+    @abstractmethod
+    async def close(self):
+        ...
+    
+    @abstractmethod
+    def stream(self, stmt, batch_size: int) -> AsyncIterator[list]:
+        """Async-iterate a Core select in lists of up to batch_size rows from a
+        server-side cursor, so the full result is never held in memory"""
+
+_session_slots = weakref.WeakKeyDictionary()
+
+def session_slots() -> asyncio.Semaphore:
+    """The running event loop's semaphore with one slot per connection the
+    sync engine's pool can hand out"""
+    loop = asyncio.get_running_loop()
+    slots = _session_slots.get(loop)
+    if slots is None:
+        slots = _session_slots[loop] = asyncio.Semaphore(settings.DATABASE_POOL_SIZE + settings.DATABASE_MAX_OVERFLOW)
+    return slots
+
+class SyncDB(RequestDB):
+    """Sync Session; each crud call runs on the threadpool.
+
+    A pool checkout blocks the threadpool worker it runs on. With more
+    requests than connections, every worker could be left waiting on the
+    pool while the requests holding the connections wait for a worker.
+    So with `slots`, the handle takes a slot on the event loop before its
+    first call and gives it back on close(). Only requests that are sure to
+    get a connection then reach the threadpool.
+    """
+    def __init__(self, session, slots: Optional[asyncio.Semaphore] = None):
+        super().__init__(session)
+        self.slots = slots
+        self._holding_slot = False
+
+    async def _take_slot(self):
+        if self.slots is not None and not self._holding_slot:
+            await self.slots.acquire()
+            self._holding_slot = True
+
+    async def run(self, fn, *args, **kwargs):
+        await self._take_slot()
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def commit(self):
+        await run_in_threadpool(self.session.commit)
+
+    async def close(self):
+        try:
+            await run_in_threadpool(self.session.close)
+        finally:
+            if self._holding_slot:
+                self._holding_slot = False
+                self.slots.release()
+    
+    async def stream(self, stmt, batch_size: int):
+        await self._take_slot()
+        stmt = stmt.execution_options(stream_results=True, yield_per=batch_size)
+        result = await run_in_threadpool(self.session.execute, stmt)
+        partitions = result.partitions()
+        try:
+            while True:
+                rows = await run_in_threadpool(next, partitions, None)
+                if rows is None:
+                    break
+                yield rows
+        finally:
+            await run_in_threadpool(result.close)
+
+class AsyncDB(RequestDB):
+    """AsyncSession; run_sync executes the sync crud code on the async
+    connection without blocking the event loop"""
+
+    async def run(self, fn, *args, **kwargs):
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+    async def commit(self):
+        await self.session.commit()
+
+    async def close(self):
+        await self.session.close()
+    
+    async def stream(self, stmt, batch_size: int):
+        result = await self.session.stream(stmt.execution_options(yield_per=batch_size))
+        try:
+            async for rows in result.partitions():
+                yield rows
+        finally:
+            await result.close()
+
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
+async def get_db(request: Request):
+    if settings.DATABASE_ASYNC:
+        db = AsyncDB(AsyncSessionLocal())
+    else:
+        db = SyncDB(SessionLocal(), session_slots())
+    # Picked up by UnitOfWorkRoute; anything left uncommitted is rolled back by close()
+    request.state.db = db
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+class UnitOfWorkRoute(APIRoute):
+    """Commit the request's session once, after the handler has built its
+    response but before any of it is sent.
+    
+    get_db's cleanup only runs after the response has gone out, too late to
+    turn a failed commit into an error. Handlers that raise are never
+    committed, and safe methods don't write, so they are left to close().
+    """
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def unit_of_work_handler(request: Request) -> Response:
+            response = await handler(request)
+            db = getattr(request.state, "db", None)
+            if db is not None and request.method not in SAFE_METHODS:
+                await db.commit()
+            return response
+
+        return unit_of_work_handler
@@ -0,0 +1,112 @@
+"""Outbox delivery throughput, run with `python -m app.cli bench-email`.
+
+Queues messages in a scratch SQLite file and drains them with one or more
+OutboxWorkers. The workers deliver over real SMTP connections to a local
+aiosmtpd sink that accepts everything, so the number is the worker's own
+cost: the claim, building each message, one SMTP round trip and one
+commit per message. aiosmtpd is a development dependency
+(requirements-dev.txt).
+"""
+import os
+import shutil
+import smtplib
+import socket
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from .database import Base
+from . import models  # noqa: F401 - register tables before create_all
+from .crud.email_outbox import enqueue_email
+from .models.email_outbox import EmailOutbox
+from .utils.email_worker import CircuitBreaker, OutboxWorker, SMTPSender
+
+class SMTPSink:
+    """aiosmtpd server on a free local port that records every message it accepts.
+
+    Recipients listed in `reject` are refused with a 550.
+    """
+    def __init__(self, reject=()):
+        from aiosmtpd.controller import Controller
+
+        self.reject = set(reject)
+        self.messages = []
+        self._lock = threading.Lock()
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.controller = Controller(self, hostname="127.0.0.1", port=self.port)
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.reject:
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.messages.append(envelope.content)
+        return "250 OK"
+
+    def connect(self) -> smtplib.SMTP:
+        return smtplib.SMTP("127.0.0.1", self.port, timeout=10)
+
+    def __enter__(self):
+        self.controller.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.controller.stop()
+
+def run(messages: int = 2000, batch_size: int = 50, workers: int = 1) -> dict:
+    """Seconds and messages per second to deliver `messages` queued emails"""
+    directory = tempfile.mkdtemp(prefix="money-manager-bench-")
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", connect_args={"timeout": 30})
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    try:
+        Base.metadata.create_all(bind=engine)
+        with Session() as db:
+            for i in range(messages):
+                enqueue_email(db, f"user{i}@example.com", f"Message {i}", "<p>Budget alert</p>")
+            db.commit()
+
+        with SMTPSink() as sink:
+            outbox_workers = [
+                OutboxWorker(
+                    Session, sender=SMTPSender(sink.connect), breaker=CircuitBreaker(3, 60.0),
+                    batch_size=batch_size, poll_interval=0
+                )
+                for _ in range(workers)
+            ]
+
+            def drain(worker):
+                try:
+                    while worker.drain_once():
+                        pass
+                finally:
+                    worker.sender.close()
+
+            threads = [threading.Thread(target=drain, args=(worker,)) for worker in outbox_workers]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            delivered = len(sink.messages)
+
+        with Session() as db:
+            sent = db.scalar(select(func.count()).where(EmailOutbox.status == "sent"))
+        return {
+            "messages": messages,
+            "delivered": delivered,
+            "marked_sent": sent,
+            "seconds": elapsed,
+            "messages_per_second": delivered / elapsed if elapsed else 0.0,
+        }
+    finally:
+        engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,113 @@
+"""Peak memory and throughput of GET /expenses/export, run with
+`python -m app.cli bench-export`.
+
+Starts the API on a scratch database (see http_benchmark.ScratchServer)
+and grows one user's expenses through each of the given sizes. Rows are
+inserted straight into the database file, because import speed is not
+what is being measured. At each size both formats are downloaded in full.
+The server's resident set size is sampled meanwhile from /proc, so this
+runs on Linux only. The export streams, so peak RSS should stay about the
+same from the smallest size to the largest while rows/sec holds steady.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from .http_benchmark import ScratchServer, register
+
+INSERT_BATCH = 50000
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+class RSSSampler:
+    """Highest RSS of a process seen while the block runs, sampled every `interval` seconds"""
+    def __init__(self, pid: int, interval: float = 0.01):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while True:
+            self.peak = max(self.peak, rss_bytes(self.pid))
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        self.peak = rss_bytes(self.pid)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes(self.pid))
+
+def add_expenses(database_path: str, user_id: int, category_id: int, first: int, last: int):
+    """Insert expenses numbered first..last-1 for the user, one a minute going back from now"""
+    now = datetime.utcnow()
+    with sqlite3.connect(database_path, timeout=30) as conn:
+        for offset in range(first, last, INSERT_BATCH):
+            conn.executemany(
+                "INSERT INTO expenses (description, amount, date, category_id, user_id) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (f"Expense {i} at shop {i % 37}", float(i % 97) + 0.5, (now - timedelta(minutes=i)).isoformat(" "), category_id, user_id)
+                    for i in range(offset, min(offset + INSERT_BATCH, last))
+                ]
+            )
+
+def download(client, headers: dict, export_format: str) -> tuple:
+    """(rows, bytes, seconds) for one full export"""
+    lines = size = 0
+    start = time.perf_counter()
+    with client.stream("GET", "/expenses/export", params={"format": export_format}, headers=headers) as response:
+        response.raise_for_status()
+        for chunk in response.iter_bytes():
+            lines += chunk.count(b"\n")
+            size += len(chunk)
+    elapsed = time.perf_counter() - start
+    # The CSV starts with a header line
+    return lines - (export_format == "csv"), size, elapsed
+
+def run(sizes=(10_000, 100_000, 1_000_000), formats=("csv", "ndjson"), env: dict = None) -> list:
+    """One result dict per (size, format)"""
+    import httpx
+
+    with ScratchServer(env) as server:
+        async def setup():
+            async with httpx.AsyncClient(base_url=server.base_url, timeout=60.0) as client:
+                headers = await register(client, "export")
+                user_id = (await client.get("/users/me", headers=headers)).json()["id"]
+                category_id = (await client.post("/categories/", json={"name": "Groceries"}, headers=headers)).json()["id"]
+                return headers, user_id, category_id
+
+        headers, user_id, category_id = asyncio.run(setup())
+        results = []
+        inserted = 0
+        with httpx.Client(base_url=server.base_url, timeout=300.0) as client:
+            for size in sorted(sizes):
+                add_expenses(server.database_path, user_id, category_id, inserted, size)
+                inserted = size
+                for export_format in formats:
+                    idle = rss_bytes(server.process.pid)
+                    with RSSSampler(server.process.pid) as sampler:
+                        rows, size_bytes, elapsed = download(client, headers, export_format)
+                    results.append({
+                        "expenses": size,
+                        "format": export_format,
+                        "rows": rows,
+                        "megabytes": size_bytes / 1e6,
+                        "seconds": elapsed,
+                        "rows_per_second": rows / elapsed if elapsed else 0.0,
+                        "idle_rss_mb": idle / 1e6,
+                        "peak_rss_mb": sampler.peak / 1e6,
+                    })
+        return results
@@ -0,0 +1,139 @@
+"""Shared pieces of the HTTP benchmarks (`python -m app.cli bench-login`, ...).
+
+ScratchServer runs the API under uvicorn in a subprocess on its own scratch
+SQLite file, configured through the environment like a deployment, and
+`load` drives it with concurrent httpx clients. httpx is a development
+dependency (requirements-dev.txt).
+"""
+import asyncio
+import itertools
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Required settings that a benchmark never exercises
+SERVER_DEFAULTS = {
+    "SECRET_KEY": "bench",
+    "SMTP_HOST": "localhost",
+    "SMTP_PORT": "2525",
+    "SMTP_USER": "",
+    "SMTP_PASSWORD": "",
+    "EMAIL_FROM": "bench@example.com",
+}
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+class ScratchServer:
+    """uvicorn serving app.main:app on a free port and a throwaway database"""
+    def __init__(self, env: dict = None, workers: int = 1, startup_timeout: float = 60.0):
+        self.directory = tempfile.mkdtemp(prefix="money-manager-bench-")
+        self.database_path = os.path.join(self.directory, "bench.db")
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.env = {
+            **os.environ,
+            **SERVER_DEFAULTS,
+            "DATABASE_URL": f"sqlite:///{self.database_path}",
+            "EMAIL_WORKER_ENABLED": "false",
+            **(env or {}),
+        }
+        self.workers = workers
+        self.startup_timeout = startup_timeout
+        self.process = None
+
+    def __enter__(self):
+        import httpx
+
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(self.port),
+                "--workers", str(self.workers), "--log-level", "warning", "--no-access-log",
+            ],
+            cwd=PROJECT_ROOT, env=self.env
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            if self.process.poll() is not None:
+                self._cleanup()
+                raise RuntimeError(f"API server exited with status {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.base_url}/", timeout=1.0).status_code == 200:
+                    return self
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                self.__exit__()
+                raise RuntimeError("API server did not start")
+            time.sleep(0.1)
+
+    def __exit__(self, *exc_info):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._cleanup()
+
+    def _cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+async def register(client, name: str, password: str = "password") -> dict:
+    """Create a user and return its Authorization headers"""
+    response = await client.post("/auth/register", json={
+        "email": f"{name}@example.com", "username": name, "password": password
+    })
+    response.raise_for_status()
+    response = await client.post("/auth/login", data={"username": name, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def load(send, concurrency: int, duration: float = None, requests: int = None) -> dict:
+    """Call `await send(i)` from `concurrency` tasks until `duration` seconds
+    or `requests` calls have passed. send returns the response; anything but
+    a 2xx counts as an error and is left out of the latencies.
+    """
+    counter = itertools.count()
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+
+    async def run():
+        while True:
+            i = next(counter)
+            if requests is not None and i >= requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            sent = time.perf_counter()
+            response = await send(i)
+            elapsed = time.perf_counter() - sent
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.is_success:
+                latencies.append(elapsed)
+
+    await asyncio.gather(*(run() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": sum(statuses.values()),
+        "ok": len(latencies),
+        "statuses": statuses,
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+    }
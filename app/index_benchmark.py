@@ -0,0 +1,186 @@
+"""Query plans and latency of the expense queries with and without the
+query indexes, run with `python -m app.cli bench-indexes`.
+
+Seeds a scratch SQLite file with one million expenses (by default) spread
+over a thousand users. The month and category-month queries are timed on
+that data twice: first with only the primary-key and unique indexes, as
+databases were before migration 0001, then after the migration has run.
+Each query runs in two forms. The extract(year/month) predicates are what
+the crud layer used to build. The half-open date ranges are what it builds
+now. So the report shows what the rewrite and the indexes each buy.
+"""
+import gc
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, extract, func, select
+from sqlalchemy.orm import sessionmaker
+
+from .database import Base
+from . import models  # noqa: F401 - register tables before create_all
+from .crud.expense import EXPENSE_COLUMNS
+from .migrations import MIGRATIONS
+from .models.budget import Budget
+from .models.category import Category
+from .models.expense import Expense
+from .utils.dates import add_months, month_bounds
+
+CATEGORIES_PER_USER = 10
+MONTHS = 24
+INSERT_BATCH = 50000
+
+def drop_query_indexes(conn):
+    """Drop every (user_id, ...) index, leaving the schema as it was before migration 0001"""
+    for table in ("expenses", "categories", "budgets"):
+        for index in Base.metadata.tables[table].indexes:
+            if index.name.startswith(f"ix_{table}_user_id"):
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+
+def seed(engine, rows: int, users: int, first_month: datetime):
+    """users users with CATEGORIES_PER_USER categories and a budget each, and rows expenses over MONTHS months"""
+    rng = random.Random(0)
+    month = first_month.strftime("%Y-%m")
+    span = (datetime(*add_months(first_month.year, first_month.month, MONTHS), 1) - first_month).total_seconds()
+    created_at = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, email, username, hashed_password, monthly_income, created_at, data_version) "
+            "VALUES (?, ?, ?, 'x', 3000.0, ?, 0)",
+            [(user_id, f"bench{user_id}@example.com", f"bench{user_id}", created_at) for user_id in range(1, users + 1)]
+        )
+        categories = [
+            ((user_id - 1) * CATEGORIES_PER_USER + i + 1, f"Category {i}", user_id)
+            for user_id in range(1, users + 1)
+            for i in range(CATEGORIES_PER_USER)
+        ]
+        conn.exec_driver_sql("INSERT INTO categories (id, name, user_id) VALUES (?, ?, ?)", categories)
+        conn.exec_driver_sql(
+            "INSERT INTO budgets (category_id, user_id, amount, month) VALUES (?, ?, 500.0, ?)",
+            [(category_id, user_id, month) for category_id, _, user_id in categories]
+        )
+        for offset in range(0, rows, INSERT_BATCH):
+            batch = []
+            for i in range(offset, min(offset + INSERT_BATCH, rows)):
+                user_id = rng.randint(1, users)
+                category_id = (user_id - 1) * CATEGORIES_PER_USER + rng.randrange(CATEGORIES_PER_USER) + 1
+                date = first_month + timedelta(seconds=rng.random() * span)
+                batch.append((f"Expense {i}", round(rng.uniform(1, 200), 2), date.isoformat(" "), category_id, user_id))
+            conn.exec_driver_sql(
+                "INSERT INTO expenses (description, amount, date, category_id, user_id) VALUES (?, ?, ?, ?, ?)", batch
+            )
+        conn.exec_driver_sql("ANALYZE")
+
+def cases():
+    """(name, build(user_id, year, month)) pairs; each build returns a statement"""
+    def month_list_extract(user_id, year, month):
+        return select(*EXPENSE_COLUMNS).where(
+            Expense.user_id == user_id,
+            extract("year", Expense.date) == year,
+            extract("month", Expense.date) == month
+        )
+
+    def month_list_range(user_id, year, month):
+        start, end = month_bounds(year, month)
+        return select(*EXPENSE_COLUMNS).where(Expense.user_id == user_id, Expense.date >= start, Expense.date < end)
+
+    def category_sum_extract(user_id, year, month):
+        return select(func.sum(Expense.amount)).where(
+            Expense.category_id == (user_id - 1) * CATEGORIES_PER_USER + 1,
+            Expense.user_id == user_id,
+            extract("year", Expense.date) == year,
+            extract("month", Expense.date) == month
+        )
+
+    def category_sum_range(user_id, year, month):
+        start, end = month_bounds(year, month)
+        return select(func.sum(Expense.amount)).where(
+            Expense.category_id == (user_id - 1) * CATEGORIES_PER_USER + 1,
+            Expense.user_id == user_id,
+            Expense.date >= start,
+            Expense.date < end
+        )
+
+    def user_categories(user_id, year, month):
+        return select(Category.id, Category.name).where(Category.user_id == user_id)
+
+    def user_month_budgets(user_id, year, month):
+        return select(Budget.id, Budget.amount).where(Budget.user_id == user_id, Budget.month == f"{year}-{month:02d}")
+
+    return [
+        ("month list, extract()", month_list_extract),
+        ("month list, range", month_list_range),
+        ("category month sum, extract()", category_sum_extract),
+        ("category month sum, range", category_sum_range),
+        ("categories of a user", user_categories),
+        ("budgets of a user and month", user_month_budgets),
+    ]
+
+def query_plan(db, statement) -> str:
+    compiled = statement.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return "; ".join(row[-1] for row in rows)
+
+def time_case(db, build, targets: list) -> tuple:
+    """Median and p90 milliseconds over one call per (user_id, year, month) target"""
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for target in targets:
+            statement = build(*target)
+            start = time.perf_counter()
+            db.execute(statement).all()
+            timings.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    timings.sort()
+    return statistics.median(timings) * 1e3, timings[int(len(timings) * 0.9)] * 1e3
+
+def run(rows: int = 1_000_000, users: int = 1000, queries: int = 200, only: str = None, path: str = None):
+    """(case, indexes, median ms, p90 ms, plan) rows, without and then with the migration 0001 indexes"""
+    directory = None
+    if path is None:
+        directory = tempfile.mkdtemp(prefix="money-manager-bench-")
+        path = os.path.join(directory, "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    try:
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            drop_query_indexes(conn)
+        first_month = datetime(2023, 1, 1)
+        seed(engine, rows, users, first_month)
+
+        rng = random.Random(1)
+        targets = [
+            (rng.randint(1, users), *add_months(first_month.year, first_month.month, rng.randrange(MONTHS)))
+            for _ in range(queries)
+        ]
+        results = []
+        for indexes in ("none", "0001"):
+            if indexes == "0001":
+                with engine.begin() as conn:
+                    dict(MIGRATIONS)["0001_query_indexes"](conn)
+                    conn.exec_driver_sql("ANALYZE")
+            db = Session()
+            try:
+                for name, build in cases():
+                    if only and only not in name:
+                        continue
+                    plan = query_plan(db, build(*targets[0]))
+                    # One untimed pass so both runs start from a warm page cache
+                    time_case(db, build, targets[:10])
+                    median, p90 = time_case(db, build, targets)
+                    results.append((name, indexes, median, p90, plan))
+            finally:
+                db.close()
+        return results
+    finally:
+        engine.dispose()
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,109 @@
+"""Rows per second of each list endpoint, run with `python -m app.cli bench-lists`.
+
+Starts the API on a scratch database (see http_benchmark.ScratchServer)
+and inserts one user's categories, a budget for each and this month's
+expenses straight into the database file. Each endpoint is then fetched
+in full pages, one request at a time, so the timings cover the query,
+the projection and the encoding of a single large response. Both ways
+fast_json_response can serve rows are measured: trusted rows handed to
+orjson, and VALIDATE_LIST_RESPONSES, which validates them with a
+TypeAdapter first.
+"""
+import asyncio
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from .http_benchmark import ScratchServer, percentile, register
+
+# Largest page the paginated list routes accept
+PAGE = 500
+
+MODES = {"trusted": "false", "validated": "true"}
+
+# How SQLAlchemy stores DateTime on SQLite; the month bounds compare as strings
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+def endpoints(category_id: int, now: datetime) -> list:
+    """(name, path) of every list endpoint, each returning a full page or month"""
+    return [
+        ("/expenses/", f"/expenses/?limit={PAGE}"),
+        ("/expenses/ cursor", f"/expenses/?cursor=&limit={PAGE}"),
+        ("/expenses/category/{id}", f"/expenses/category/{category_id}?limit={PAGE}"),
+        ("/expenses/month/{y}/{m}", f"/expenses/month/{now.year}/{now.month}"),
+        ("/expenses/query", f"/expenses/query?category_id={category_id}&sort=amount&limit={PAGE}"),
+        ("/categories/", f"/categories/?limit={PAGE}"),
+        ("/budgets/", f"/budgets/?limit={PAGE}"),
+    ]
+
+def seed(database_path: str, user_id: int, categories: int, expenses: int, now: datetime) -> int:
+    """Insert the user's categories with budgets and this month's expenses; returns the first category's id"""
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    with sqlite3.connect(database_path, timeout=30) as conn:
+        first = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM categories").fetchone()[0]
+        category_ids = list(range(first, first + categories))
+        conn.executemany(
+            "INSERT INTO categories (id, name, user_id) VALUES (?, ?, ?)",
+            [(category_id, f"Category {i}", user_id) for i, category_id in enumerate(category_ids)]
+        )
+        conn.executemany(
+            "INSERT INTO budgets (category_id, user_id, amount, month) VALUES (?, ?, ?, ?)",
+            [(category_id, user_id, 500.0, now.strftime("%Y-%m")) for category_id in category_ids]
+        )
+        # Half of the expenses go to the first category, so its listings fill a page too
+        conn.executemany(
+            "INSERT INTO expenses (description, amount, date, category_id, user_id) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    f"Expense {i} at shop {i % 37}", float(i % 97) + 0.5, (month_start + timedelta(seconds=i)).strftime(DATE_FORMAT),
+                    category_ids[0] if i % 2 else category_ids[i % categories], user_id
+                )
+                for i in range(expenses)
+            ]
+        )
+    return category_ids[0]
+
+def count_rows(body) -> int:
+    return len(body["items"] if isinstance(body, dict) else body)
+
+def measure(client, headers: dict, path: str, requests: int) -> dict:
+    response = client.get(path, headers=headers)
+    response.raise_for_status()
+    rows = count_rows(response.json())
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "rows": rows,
+        "rows_per_second": rows * requests / total if total else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+    }
+
+def run(categories: int = 500, expenses: int = 5000, requests: int = 50, modes=("trusted", "validated"),
+        only: str = None) -> list:
+    """One result dict per (mode, endpoint)"""
+    import httpx
+
+    async def login(base_url: str) -> dict:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+            return await register(client, "lists")
+
+    now = datetime.utcnow()
+    results = []
+    for mode in modes:
+        with ScratchServer({"VALIDATE_LIST_RESPONSES": MODES[mode]}) as server:
+            headers = asyncio.run(login(server.base_url))
+            with httpx.Client(base_url=server.base_url, timeout=60.0) as client:
+                user_id = client.get("/users/me", headers=headers).json()["id"]
+                category_id = seed(server.database_path, user_id, categories, expenses, now)
+                for name, path in endpoints(category_id, now):
+                    if only and only not in name:
+                        continue
+                    results.append({"mode": mode, "endpoint": name, **measure(client, headers, path, requests)})
+    return results
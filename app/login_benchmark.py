@@ -0,0 +1,70 @@
+"""Login throughput against the latency of everything else, run with
+`python -m app.cli bench-login`.
+
+Starts the API on a scratch database (see http_benchmark.ScratchServer).
+Reader clients cycle through GET /categories/, /expenses/ and
+/budgets/summary for a fixed time. Login clients hit POST /auth/login at
+the same time. Each run uses a different number of login clients, and the
+first run has none. The reader p99 should stay close to that first run
+while bcrypt saturates its own pool. Logins beyond
+PASSWORD_HASH_QUEUE_LIMIT get a 503, which is reported instead of showing
+up as latency.
+"""
+import asyncio
+from datetime import datetime
+
+from .http_benchmark import ScratchServer, load, register
+
+READ_PATHS = ("/categories/", "/expenses/?limit=20", "/budgets/summary")
+
+async def seed(client) -> dict:
+    headers = await register(client, "reader")
+    month = datetime.utcnow().strftime("%Y-%m")
+    category_ids = []
+    for i in range(5):
+        response = await client.post("/categories/", json={"name": f"Category {i}"}, headers=headers)
+        category_ids.append(response.json()["id"])
+        await client.post("/budgets/", json={"category_id": category_ids[-1], "amount": 500.0, "month": month}, headers=headers)
+    await client.post("/expenses/bulk", json=[
+        {"description": f"Expense {i}", "amount": 1.0 + i % 50, "category_id": category_ids[i % 5]}
+        for i in range(500)
+    ], headers=headers)
+    await register(client, "login")
+    return headers
+
+async def measure(base_url: str, login_concurrency: list, readers: int, duration: float) -> list:
+    import httpx
+
+    limits = httpx.Limits(max_connections=readers + max(login_concurrency) + 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        headers = await seed(client)
+
+        async def read(i):
+            return await client.get(READ_PATHS[i % len(READ_PATHS)], headers=headers)
+
+        async def login(i):
+            return await client.post("/auth/login", data={"username": "login", "password": "password"})
+
+        results = []
+        for logins in login_concurrency:
+            tasks = [load(read, readers, duration)]
+            if logins:
+                tasks.append(load(login, logins, duration))
+            reads, *rest = await asyncio.gather(*tasks)
+            logged_in = rest[0] if rest else None
+            results.append({
+                "login_clients": logins,
+                "logins_per_second": logged_in["rps"] if logged_in else 0.0,
+                "login_p99_ms": logged_in["p99_ms"] if logged_in else 0.0,
+                "logins_rejected": logged_in["statuses"].get(503, 0) if logged_in else 0,
+                "read_rps": reads["rps"],
+                "read_p50_ms": reads["p50_ms"],
+                "read_p99_ms": reads["p99_ms"],
+                "read_errors": reads["requests"] - reads["ok"],
+            })
+        return results
+
+def run(login_concurrency=(0, 4, 16, 64), readers: int = 8, duration: float = 10.0, env: dict = None) -> list:
+    """One result dict per entry of login_concurrency"""
+    with ScratchServer(env) as server:
+        return asyncio.run(measure(server.base_url, list(login_concurrency), readers, duration))
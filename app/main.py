@@ -1,11 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import engine, Base
-from .api import auth_router, user_router, category_router, budget_router, expense_router
+from .config import settings
+from .database import engine, async_engine, Base, SessionLocal
+from .migrations import run_migrations
+from .api import auth_router, user_router, category_router, budget_router, expense_router, dashboard_router, sync_router
+from .auth.principal_cache import principal_cache
+from .result_cache import result_cache
+from .utils.email_worker import OutboxWorker
 
-# Create database tables
+# Create database tables and apply pending migrations
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(
     title="Money Manager API",
@@ -22,12 +28,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics (per-route latency, queries per request, pool usage)
+if settings.METRICS_ENABLED:
+    from . import metrics
+    
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(engine, name="sync")
+    if async_engine is not None:
+        metrics.instrument_engine(async_engine.sync_engine, name="async")
+    metrics.registry.register_gauge(
+        "principal_cache",
+        "Principal cache size and hit/miss/eviction/invalidation counts",
+        lambda: {(("stat", key),): value for key, value in principal_cache.stats().items()}
+    )
+    metrics.registry.register_gauge(
+        "result_cache",
+        "Result cache size and hit/miss/eviction/stale put/invalidation counts",
+        lambda: {(("stat", key),): value for key, value in result_cache.stats().items()}
+    )
+    
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+# N+1 / query budget warnings
+if settings.QUERY_TRACKING_ENABLED:
+    from .query_tracker import QueryTrackerMiddleware
+    
+    app.add_middleware(
+        QueryTrackerMiddleware,
+        budget=settings.QUERY_BUDGET,
+        n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD
+    )
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(user_router)
 app.include_router(category_router)
 app.include_router(budget_router)
 app.include_router(expense_router)
+app.include_router(dashboard_router)
+app.include_router(sync_router)
+
+email_worker = OutboxWorker(SessionLocal)
+
+@app.on_event("startup")
+def start_email_worker():
+    if settings.EMAIL_WORKER_ENABLED:
+        email_worker.start()
+
+@app.on_event("shutdown")
+def stop_email_worker():
+    email_worker.stop()
 
 @app.get("/")
 def root():
@@ -39,4 +91,4 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy", "principal_cache": principal_cache.stats(), "result_cache": result_cache.stats()}
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""In-process metrics served in Prometheus text format at /metrics.
+
+Nothing here is installed unless METRICS_ENABLED is set, so a deployment
+that doesn't scrape pays no per-request or per-query cost.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+class RequestStats:
+    """Per-request counters, filled in by the engine event hooks"""
+    __slots__ = ("queries", "sql_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.request_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.request_queries: Dict[Tuple[str, str], Histogram] = {}
+        self.request_sql_seconds: Dict[Tuple[str, str], Histogram] = {}
+        self.pool_checkouts = 0
+        self.pool_wait = Histogram(LATENCY_BUCKETS)
+        self.pools = []
+        self.gauges = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.request_latency.setdefault((method, route), Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.request_queries.setdefault((method, route), Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self.request_sql_seconds.setdefault((method, route), Histogram(LATENCY_BUCKETS)).observe(stats.sql_seconds)
+
+    def observe_pool_checkout(self, seconds: float):
+        with self._lock:
+            self.pool_checkouts += 1
+            self.pool_wait.observe(seconds)
+
+    def register_gauge(self, name: str, help_text: str, read):
+        """Expose read() -> {labels tuple: value} at scrape time"""
+        self.gauges[name] = (help_text, read)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines += _counter("http_requests_total", "HTTP requests by route and status",
+                              ("method", "route", "status"), self.requests)
+            lines += _histograms("http_request_duration_seconds", "Request latency by route",
+                                 ("method", "route"), self.request_latency)
+            lines += _histograms("db_queries_per_request", "SQL statements executed per request",
+                                 ("method", "route"), self.request_queries)
+            lines += _histograms("db_query_seconds_per_request", "Time spent in SQL per request",
+                                 ("method", "route"), self.request_sql_seconds)
+            lines += _counter("db_pool_checkouts_total", "Connections checked out of the pool", (), {(): self.pool_checkouts})
+            lines += _histograms("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+                                 (), {(): self.pool_wait})
+        for name, (help_text, read) in self.gauges.items():
+            values = read()
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in values.items():
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+def _counter(name, help_text, label_names, values):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for label_values, value in values.items():
+        lines.append(f"{name}{_labels(list(zip(label_names, label_values)))} {value}")
+    return lines
+
+def _histograms(name, help_text, label_names, histograms):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for label_values, histogram in histograms.items():
+        pairs = list(zip(label_names, label_values))
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(pairs + [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(pairs + [('le', '+Inf')])} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(pairs)} {histogram.total}")
+        lines.append(f"{name}_count{_labels(pairs)} {histogram.count}")
+    return lines
+
+registry = MetricsRegistry()
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each request and labelling it by route template"""
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_stats.reset(token)
+            route = scope.get("route")
+            self.registry.observe_request(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status_code,
+                time.perf_counter() - start,
+                stats,
+            )
+
+def instrument_engine(engine, registry: MetricsRegistry = registry, name: str = "default"):
+    """Attach query timing and pool hooks to a sync Engine (use async_engine.sync_engine)"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+
+    # The pool has no "before checkout" event, so time pool.connect() itself
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            registry.observe_pool_checkout(time.perf_counter() - start)
+
+    pool.connect = timed_connect
+    registry.pools.append((name, pool))
+
+def pool_gauges() -> dict:
+    values = {}
+    for name, pool in registry.pools:
+        for metric in ("size", "checkedout", "overflow"):
+            read = getattr(pool, metric, None)
+            if read is not None:
+                # QueuePool counts overflow from -size; report connections beyond size
+                value = max(read(), 0) if metric == "overflow" else read()
+                values[(("pool", name), ("state", metric))] = value
+    return values
+
+registry.register_gauge("db_pool_connections", "Pool size, checked-out connections and overflow", pool_gauges)
@@ -0,0 +1,196 @@
+"""Schema migrations for databases created before a change to the models.
+
+`Base.metadata.create_all` only creates missing tables, so anything that
+alters an existing table (new indexes, constraints, ...) is listed here.
+Each migration runs once and is recorded in the schema_migrations table.
+Run with `python -m app.cli migrate`; app startup also applies them.
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("id", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+def _add_query_indexes(conn: Connection):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_expenses_user_id_date ON expenses (user_id, date)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_expenses_user_id_category_id_date "
+        "ON expenses (user_id, category_id, date)"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_categories_user_id ON categories (user_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_budgets_user_id_month ON budgets (user_id, month)"))
+
+def _add_user_data_version(conn: Connection):
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    if "data_version" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0"))
+
+def _add_expense_search(conn: Connection):
+    if conn.dialect.name == "sqlite":
+        # Standalone table keyed by expense id; crud.expense_search keeps it in sync
+        conn.execute(text("CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(description, prefix='2 3')"))
+        conn.execute(text("DELETE FROM expenses_fts"))
+        conn.execute(text("INSERT INTO expenses_fts (rowid, description) SELECT id, description FROM expenses"))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_expenses_description_tsv "
+            "ON expenses USING gin (to_tsvector('simple', description))"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_expenses_description_trgm "
+            "ON expenses USING gin (description gin_trgm_ops)"
+        ))
+
+def _add_expense_query_indexes(conn: Connection):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_expenses_user_id_amount ON expenses (user_id, amount)"))
+    # Case-insensitive description prefixes; PostgreSQL needs the pattern
+    # opclass for LIKE 'abc%' to use the index under a non-C collation
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_expenses_user_id_description "
+            "ON expenses (user_id, lower(description) text_pattern_ops)"
+        ))
+    else:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_expenses_user_id_description "
+            "ON expenses (user_id, lower(description))"
+        ))
+
+# Every foreign key in these tables points at a row that owns it
+CASCADE_TABLES = ("categories", "budgets", "expenses", "monthly_category_totals", "budget_projections")
+
+def _rebuild_sqlite_table_with_cascades(conn: Connection, table: str):
+    # SQLite can't alter a constraint, so recreate the table from its own DDL
+    # with ON DELETE CASCADE added, copy the rows and restore the indexes
+    create_sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).scalar()
+    if create_sql is None:
+        return
+    cascading_sql = re.sub(
+        r"(REFERENCES\s+\S+\s*\([^)]*\))(?!\s+ON\s+DELETE)", r"\1 ON DELETE CASCADE", create_sql, flags=re.IGNORECASE
+    )
+    if cascading_sql == create_sql:
+        return
+    index_sqls = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    ).scalars().all()
+    
+    rebuilt = f"{table}_cascade"
+    conn.exec_driver_sql(re.sub(r"^CREATE TABLE\s+\S+", f"CREATE TABLE {rebuilt}", cascading_sql, count=1))
+    conn.exec_driver_sql(f"INSERT INTO {rebuilt} SELECT * FROM {table}")
+    conn.exec_driver_sql(f"DROP TABLE {table}")
+    conn.exec_driver_sql(f"ALTER TABLE {rebuilt} RENAME TO {table}")
+    for index_sql in index_sqls:
+        conn.exec_driver_sql(index_sql)
+
+def _cascade_foreign_keys(conn: Connection):
+    if conn.dialect.name == "sqlite":
+        for table in CASCADE_TABLES:
+            _rebuild_sqlite_table_with_cascades(conn, table)
+        # Foreign keys were never enforced on SQLite before, so drop rows whose
+        # owner is already gone; nothing could reach them anyway
+        while True:
+            orphans = conn.exec_driver_sql("PRAGMA foreign_key_check").all()
+            if not orphans:
+                break
+            for table, rowid, _, _ in orphans:
+                conn.exec_driver_sql(f"DELETE FROM {table} WHERE rowid = ?", (rowid,))
+        conn.exec_driver_sql("DELETE FROM expenses_fts WHERE rowid NOT IN (SELECT id FROM expenses)")
+        return
+    
+    inspector = inspect(conn)
+    for table in CASCADE_TABLES:
+        for foreign_key in inspector.get_foreign_keys(table):
+            if (foreign_key["options"].get("ondelete") or "").upper() == "CASCADE":
+                continue
+            conn.execute(text(
+                f"ALTER TABLE {table} DROP CONSTRAINT {foreign_key['name']}, "
+                f"ADD CONSTRAINT {foreign_key['name']} FOREIGN KEY ({', '.join(foreign_key['constrained_columns'])}) "
+                f"REFERENCES {foreign_key['referred_table']} ({', '.join(foreign_key['referred_columns'])}) ON DELETE CASCADE"
+            ))
+
+def _backfill_change_log(conn: Connection):
+    # Log every existing entity once, parents first, so a client syncing from
+    # the start gets the whole state; the seqs continue each user's
+    # data_version, which then jumps past them
+    conn.execute(text(
+        "INSERT INTO change_log (user_id, change_seq, entity, entity_id, deleted) "
+        "SELECT entities.user_id, "
+        "users.data_version + row_number() OVER (PARTITION BY entities.user_id ORDER BY entities.rank, entities.id), "
+        "entities.entity, entities.id, false "
+        "FROM ("
+        "SELECT user_id, 1 AS rank, 'category' AS entity, id FROM categories "
+        "UNION ALL SELECT user_id, 2, 'budget', id FROM budgets "
+        "UNION ALL SELECT user_id, 3, 'expense', id FROM expenses"
+        ") AS entities JOIN users ON users.id = entities.user_id"
+    ))
+    conn.execute(text(
+        "UPDATE users SET data_version = data_version + "
+        "(SELECT count(*) FROM change_log WHERE change_log.user_id = users.id)"
+    ))
+
+def _backfill_monthly_totals(conn: Connection):
+    # create_all adds monthly_category_totals to an existing database empty,
+    # and every summary, report and budget check reads spend from it
+    month = "strftime('%Y-%m', date)" if conn.dialect.name == "sqlite" else "to_char(date, 'YYYY-MM')"
+    conn.execute(text("DELETE FROM monthly_category_totals"))
+    conn.execute(text(
+        "INSERT INTO monthly_category_totals (user_id, category_id, month, total, count) "
+        f"SELECT user_id, category_id, {month}, sum(amount), count(id) FROM expenses "
+        f"GROUP BY user_id, category_id, {month}"
+    ))
+
+def _add_email_outbox_claims(conn: Connection):
+    columns = {column["name"] for column in inspect(conn).get_columns("email_outbox")}
+    if "claimed_at" not in columns:
+        conn.execute(text("ALTER TABLE email_outbox ADD COLUMN claimed_at TIMESTAMP"))
+
+# Ordered; never edit or reorder an entry once it has shipped
+MIGRATIONS = [
+    ("0001_query_indexes", _add_query_indexes),
+    ("0002_user_data_version", _add_user_data_version),
+    ("0003_expense_search", _add_expense_search),
+    ("0004_expense_query_indexes", _add_expense_query_indexes),
+    ("0005_cascade_foreign_keys", _cascade_foreign_keys),
+    ("0006_change_log_backfill", _backfill_change_log),
+    ("0007_monthly_totals_backfill", _backfill_monthly_totals),
+    ("0008_email_outbox_claims", _add_email_outbox_claims),
+]
+
+def run_migrations(engine: Engine):
+    """Apply pending migrations and return the ids that ran"""
+    migration_metadata.create_all(bind=engine)
+    applied = []
+    with engine.connect() as conn:
+        # Table rebuilds must not fire foreign key actions on SQLite, and the
+        # pragma is ignored inside a transaction, so it wraps the whole run
+        foreign_keys = None
+        if conn.dialect.name == "sqlite":
+            foreign_keys = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.commit()
+        try:
+            with conn.begin():
+                done = set(conn.execute(select(schema_migrations.c.id)).scalars())
+                for migration_id, migrate in MIGRATIONS:
+                    if migration_id in done:
+                        continue
+                    migrate(conn)
+                    conn.execute(schema_migrations.insert().values(id=migration_id, applied_at=datetime.utcnow()))
+                    applied.append(migration_id)
+        finally:
+            if foreign_keys is not None:
+                conn.exec_driver_sql(f"PRAGMA foreign_keys={int(foreign_keys)}")
+                conn.commit()
+    return applied
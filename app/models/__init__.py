@@ -1,4 +1,9 @@
 from .user import User
 from .category import Category
 from .budget import Budget
-from .expense import Expense
\ No newline at end of file
+from .expense import Expense
+from .monthly_category_total import MonthlyCategoryTotal
+from .email_outbox import EmailOutbox
+
+from .budget_projection import BudgetProjection
+from .change_log import ChangeLog
\ No newline at end of file
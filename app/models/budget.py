@@ -1,16 +1,20 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, String
+from sqlalchemy import Column, Integer, Float, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 
 class Budget(Base):
     __tablename__ = "budgets"
+    __table_args__ = (
+        Index("ix_budgets_user_id_month", "user_id", "month"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    category_id = Column(Integer, ForeignKey("categories.id"), unique=True, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     amount = Column(Float, nullable=False)
     month = Column(String, nullable=False)  # Format: "YYYY-MM"
     
     # Relationships
     category = relationship("Category", back_populates="budget")
-    user = relationship("User", back_populates="budgets")
\ No newline at end of file
+    user = relationship("User", back_populates="budgets")
+    projection = relationship("BudgetProjection", back_populates="budget", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
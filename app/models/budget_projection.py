@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from ..database import Base
+
+class BudgetProjection(Base):
+    """Month-end projection for a budget, written by the `projections` batch"""
+    __tablename__ = "budget_projections"
+    
+    budget_id = Column(Integer, ForeignKey("budgets.id", ondelete="CASCADE"), primary_key=True)
+    as_of = Column(Date, nullable=False)
+    spent = Column(Float, nullable=False)
+    daily_rate = Column(Float, nullable=False)
+    projected_spend = Column(Float, nullable=False)
+    projected_overrun_date = Column(Date, nullable=True)  # None: not expected to overrun this month
+    computed_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    budget = relationship("Budget", back_populates="projection")
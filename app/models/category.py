@@ -1,15 +1,19 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (
+        Index("ix_categories_user_id", "user_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="categories")
-    expenses = relationship("Expense", back_populates="category", cascade="all, delete-orphan")
-    budget = relationship("Budget", back_populates="category", uselist=False, cascade="all, delete-orphan")
\ No newline at end of file
+    expenses = relationship("Expense", back_populates="category", cascade="all, delete-orphan", passive_deletes=True)
+    monthly_totals = relationship("MonthlyCategoryTotal", back_populates="category", cascade="all, delete-orphan", passive_deletes=True)
+    budget = relationship("Budget", back_populates="category", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
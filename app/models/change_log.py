@@ -0,0 +1,20 @@
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String
+from ..database import Base
+
+class ChangeLog(Base):
+    """Append-only feed of entity writes per user, read by GET /sync.
+    
+    change_seq values come from the user's data_version, which every write
+    bumps under the user's row lock, so a user's changes commit in seq order.
+    """
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_user_id_change_seq", "user_id", "change_seq", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    entity = Column(String, nullable=False)  # expense, category, budget
+    entity_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
\ No newline at end of file
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, String, UniqueConstraint
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+class MonthlyCategoryTotal(Base):
+    """Running spend per (user, category, month), maintained by the expense crud functions"""
+    __tablename__ = "monthly_category_totals"
+    __table_args__ = (
+        UniqueConstraint("user_id", "category_id", "month", name="uq_monthly_category_totals"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
+    month = Column(String, nullable=False)  # Format: "YYYY-MM"
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+    
+    # Relationships
+    category = relationship("Category", back_populates="monthly_totals")
+    user = relationship("User", back_populates="monthly_totals")
@@ -12,8 +12,12 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     monthly_income = Column(Float, default=0.0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped by every write to the user's data; the source of list ETags
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     
-    # Relationships
-    categories = relationship("Category", back_populates="user", cascade="all, delete-orphan")
-    expenses = relationship("Expense", back_populates="user", cascade="all, delete-orphan")
-    budgets = relationship("Budget", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+    # Relationships; the database cascades deletes (ON DELETE CASCADE), and
+    # passive_deletes keeps the ORM from loading children just to delete them
+    categories = relationship("Category", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    expenses = relationship("Expense", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    budgets = relationship("Budget", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    monthly_totals = relationship("MonthlyCategoryTotal", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
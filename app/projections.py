@@ -0,0 +1,99 @@
+"""Month-end burn-rate projections for every budget of the current month.
+
+This is a periodic batch (e.g. hourly from cron via
+`python -m app.cli projections`), not per-request work: budgets are taken
+in id chunks, each chunk's per-day spend is pulled for all its users in
+one GROUP BY, and the projection runs as NumPy array operations over every
+budget in the chunk at once. /budgets/summary reads the stored results.
+"""
+import calendar
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .crud import budget_projection as crud_projection
+
+def project_month_end(daily: np.ndarray, amounts: np.ndarray, days_elapsed: int, days_in_month: int) -> dict:
+    """Linear run-rate projection for many budgets at once.
+    
+    `daily` is (budgets, days_elapsed) spend per day of the month so far and
+    `amounts` the budget amounts. Returns arrays of spend to date, daily
+    rate, projected month-end spend and the day of month the budget is (or
+    is projected to be) exceeded, 0 when that isn't expected this month.
+    """
+    cumulative = np.cumsum(daily, axis=1)
+    spent = cumulative[:, -1]
+    rate = spent / days_elapsed
+    projected = spent + rate * (days_in_month - days_elapsed)
+    
+    over = cumulative > amounts[:, None]
+    already_over = over.any(axis=1)
+    first_over_day = over.argmax(axis=1) + 1
+    
+    # First future day whose running total passes the budget: k > (amount - spent) / rate
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_to_overrun = np.floor((amounts - spent) / rate) + 1
+    future_day = np.where(rate > 0, days_elapsed + days_to_overrun, np.inf)
+    
+    overrun_day = np.where(already_over, first_over_day, future_day)
+    overrun_day = np.where(overrun_day <= days_in_month, overrun_day, 0).astype(np.int64)
+    
+    return {
+        "spent": spent,
+        "daily_rate": rate,
+        "projected_spend": projected,
+        "overrun_day": overrun_day,
+    }
+
+def daily_spend_matrix(budget_ids: np.ndarray, rows: list, days: int) -> np.ndarray:
+    """Scatter (budget_id, day, total) rows into a (budgets, days) array"""
+    daily = np.zeros((len(budget_ids), days))
+    if rows:
+        ids, day, total = (np.asarray(column) for column in zip(*rows))
+        np.add.at(daily, (np.searchsorted(budget_ids, ids), day.astype(np.int64) - 1), total)
+    return daily
+
+def run_projections(db: Session, as_of: date = None, chunk_size: int = 50000) -> int:
+    """Recompute projections for every budget of as_of's month (default today, UTC)"""
+    as_of = as_of or datetime.utcnow().date()
+    month = as_of.strftime("%Y-%m")
+    days_in_month = calendar.monthrange(as_of.year, as_of.month)[1]
+    start = datetime(as_of.year, as_of.month, 1)
+    end = datetime(as_of.year, as_of.month, as_of.day) + timedelta(days=1)
+    computed_at = datetime.utcnow()
+    
+    projected = 0
+    after_id = 0
+    while True:
+        budgets = crud_projection.get_month_budgets(db, month, after_id, chunk_size)
+        if not budgets:
+            break
+        budget_ids = np.array([budget.id for budget in budgets], dtype=np.int64)
+        amounts = np.array([budget.amount for budget in budgets], dtype=np.float64)
+        first_id, last_id = int(budget_ids[0]), int(budget_ids[-1])
+        
+        rows = crud_projection.get_daily_budget_spend(db, month, start, end, first_id, last_id)
+        result = project_month_end(daily_spend_matrix(budget_ids, rows, as_of.day), amounts, as_of.day, days_in_month)
+        
+        crud_projection.replace_budget_projections(db, month, first_id, last_id, [
+            {
+                "budget_id": budget_id,
+                "as_of": as_of,
+                "spent": spent,
+                "daily_rate": rate,
+                "projected_spend": projected_spend,
+                "projected_overrun_date": date(as_of.year, as_of.month, overrun_day) if overrun_day else None,
+                "computed_at": computed_at,
+            }
+            for budget_id, spent, rate, projected_spend, overrun_day in zip(
+                budget_ids.tolist(),
+                result["spent"].tolist(),
+                result["daily_rate"].tolist(),
+                result["projected_spend"].tolist(),
+                result["overrun_day"].tolist(),
+            )
+        ])
+        projected += len(budgets)
+        after_id = last_id
+    return projected
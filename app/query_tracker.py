@@ -0,0 +1,85 @@
+"""Per-request SQL statement counting and N+1 detection.
+
+database.py installs the engine hook. QueryTrackerMiddleware (enabled by
+QUERY_TRACKING_ENABLED) logs requests that exceed QUERY_BUDGET statements
+or repeat one statement N_PLUS_ONE_THRESHOLD times with different
+parameters. Tests can pin query counts with assert_max_queries:
+
+    with assert_max_queries(3):
+        client.get("/budgets/summary", headers=headers)
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger("app.queries")
+
+class QueryTracker:
+    def __init__(self):
+        self.statements = Counter()
+
+    @property
+    def count(self) -> int:
+        return sum(self.statements.values())
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements executed at least `threshold` times, i.e. likely N+1 loops"""
+        return [(statement, n) for statement, n in self.statements.most_common() if n >= threshold]
+
+def _one_line(statement: str) -> str:
+    return " ".join(statement.split())
+
+current_tracker: ContextVar[Optional[QueryTracker]] = ContextVar("current_query_tracker", default=None)
+
+def install(engine):
+    """Count statements on `engine` into the active tracker, if any"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        tracker = current_tracker.get()
+        if tracker is not None:
+            # Bound parameters aren't part of the text, so an N+1 loop shows
+            # up as one statement with a high count
+            tracker.statements[statement] += 1
+
+@contextmanager
+def track_queries():
+    tracker = QueryTracker()
+    token = current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        current_tracker.reset(token)
+
+@contextmanager
+def assert_max_queries(n: int):
+    """Fail if the block runs more than n SQL statements"""
+    with track_queries() as tracker:
+        yield tracker
+    if tracker.count > n:
+        details = "\n".join(f"  {count}x {_one_line(statement)}" for statement, count in tracker.statements.most_common())
+        raise AssertionError(f"Expected at most {n} queries, got {tracker.count}:\n{details}")
+
+class QueryTrackerMiddleware:
+    def __init__(self, app, budget: int, n_plus_one_threshold: int):
+        self.app = app
+        self.budget = budget
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as tracker:
+            await self.app(scope, receive, send)
+
+        route = scope.get("route")
+        name = f"{scope['method']} {route.path if route is not None else scope['path']}"
+        if tracker.count > self.budget:
+            logger.warning("%s ran %d queries (budget %d)", name, tracker.count, self.budget)
+        for statement, count in tracker.repeated(self.n_plus_one_threshold):
+            logger.warning("%s: possible N+1, %dx %s", name, count, _one_line(statement))
@@ -0,0 +1,270 @@
+"""Cached results of the per-month read endpoints, keyed by (user, endpoint, month).
+
+GET /budgets/summary and GET /expenses/report/{year}/{month} depend only on
+one user's data for one month. Crud writes drop exactly the (user, month)
+keys they touch through crud.data_version.invalidate_results. Budget
+summaries are also tied to the user's data_version, which the projections
+batch bumps from its own process.
+
+Those invalidations only reach the process that makes them. The backend is
+an in-process LRU by default, so entries also expire: the current and
+future months after RESULT_CACHE_TTL, months that are over after
+RESULT_CACHE_CLOSED_TTL. That bounds how long other workers serve results
+from before a write. Set RESULT_CACHE_URL to a redis:// URL to share one
+cache, and its invalidations, between workers instead.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+import orjson
+
+from .config import settings
+
+BUDGET_SUMMARY = "budget_summary"
+EXPENSE_REPORT = "expense_report"
+ENDPOINTS = (BUDGET_SUMMARY, EXPENSE_REPORT)
+
+class LRUBackend:
+    """Bounded in-process LRU of (user_id, endpoint, month) -> value"""
+    def __init__(self, maxsize: int, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self.clock():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: tuple, value, ttl: Optional[float]):
+        if self.maxsize <= 0:
+            return
+        expires_at = self.clock() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, value)
+            self._keys_by_user.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, keys: list):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+
+    def delete_user(self, user_id: int):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def delete_month(self, month: str, endpoints):
+        with self._lock:
+            for key in [key for key in self._entries if key[2] == month and key[1] in endpoints]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "evictions": self.evictions}
+
+    def _remove(self, key: tuple):
+        del self._entries[key]
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+class RedisBackend:
+    """Cache shared between processes through a redis-py style client.
+
+    Anything with get, set(ex=), delete and scan_iter works, so tests can
+    pass a local stand-in such as fakeredis. Values are stored as JSON,
+    which is how they are sent anyway.
+    """
+    def __init__(self, client, prefix: str = "result:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: tuple) -> str:
+        user_id, endpoint, month = key
+        return f"{self.prefix}{user_id}:{endpoint}:{month}"
+
+    def get(self, key: tuple):
+        raw = self.client.get(self._key(key))
+        return orjson.loads(raw) if raw is not None else None
+
+    def set(self, key: tuple, value, ttl: Optional[float]):
+        self.client.set(self._key(key), orjson.dumps(value), ex=math.ceil(ttl) if ttl is not None else None)
+
+    def delete(self, keys: list):
+        if keys:
+            self.client.delete(*(self._key(key) for key in keys))
+
+    def delete_user(self, user_id: int):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}{user_id}:*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def delete_month(self, month: str, endpoints):
+        for endpoint in endpoints:
+            keys = list(self.client.scan_iter(match=f"{self.prefix}*:{endpoint}:{month}"))
+            if keys:
+                self.client.delete(*keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> dict:
+        return {}
+
+class ResultCache:
+    """Per-(user, endpoint, month) results on top of a backend.
+
+    Take a ticket() before reading the database and hand it to put(): a
+    put whose read may have started before an invalidation of the same
+    key is dropped, so a request racing a write can't cache what the write
+    just replaced. Invalidations are remembered for the last
+    `max_invalidations` keys; tickets older than that are always dropped.
+
+    Invalidations only reach this process's backend. Passing the user's
+    data_version to put() and get() catches writes made elsewhere, such as
+    the projections batch, since every write bumps it.
+    """
+    def __init__(self, backend, ttl: float, closed_ttl: Optional[float] = 3600.0,
+                 clock=time.time, max_invalidations: int = 10000):
+        self.backend = backend
+        self.ttl = ttl
+        self.closed_ttl = closed_ttl
+        self.clock = clock
+        self.max_invalidations = max_invalidations
+        self._seq = 0
+        self._floor = 0
+        self._invalidated = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_puts = 0
+        self.invalidations = 0
+
+    def current_month(self) -> str:
+        return datetime.fromtimestamp(self.clock()).strftime("%Y-%m")
+
+    def get(self, user_id: int, endpoint: str, month: str, version: Optional[int] = None):
+        """Cached value, or None; with `version`, entries put for another
+        data_version of the user count as missing"""
+        entry = self.backend.get((user_id, endpoint, month))
+        value = None
+        if entry is not None:
+            cached_version, value = entry
+            if version is not None and cached_version != version:
+                value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def ticket(self) -> int:
+        with self._lock:
+            return self._seq
+
+    def put(self, user_id: int, endpoint: str, month: str, value, ticket: int, version: Optional[int] = None):
+        with self._lock:
+            invalidated = max(
+                self._floor,
+                self._invalidated.get((user_id, month), 0),
+                self._invalidated.get((user_id, None), 0),
+                self._invalidated.get((None, month), 0)
+            )
+            if invalidated > ticket:
+                self.stale_puts += 1
+                return
+        # Months that are over only change through writes, which invalidate them
+        # here; closed_ttl covers the writes handled by other processes
+        ttl = self.closed_ttl if month < self.current_month() else self.ttl
+        self.backend.set((user_id, endpoint, month), (version, value), ttl)
+
+    async def get_or_compute(self, user_id: int, endpoint: str, month: str, compute, version: Optional[int] = None):
+        """Cached value, or await compute() and cache what it returns"""
+        value = self.get(user_id, endpoint, month, version)
+        if value is not None:
+            return value
+        ticket = self.ticket()
+        value = await compute()
+        self.put(user_id, endpoint, month, value, ticket, version)
+        return value
+
+    def invalidate(self, user_id: int, months, endpoints=ENDPOINTS):
+        months = set(months)
+        self._record_invalidation([(user_id, month) for month in months])
+        self.backend.delete([(user_id, endpoint, month) for month in months for endpoint in endpoints])
+
+    def invalidate_user(self, user_id: int):
+        self._record_invalidation([(user_id, None)])
+        self.backend.delete_user(user_id)
+
+    def invalidate_month(self, month: str, endpoints=ENDPOINTS):
+        """Drop month for every user, for batch writes such as the projections"""
+        self._record_invalidation([(None, month)])
+        self.backend.delete_month(month, endpoints)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.backend.stats(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_puts": self.stale_puts,
+                "invalidations": self.invalidations,
+            }
+
+    def _record_invalidation(self, keys: list):
+        with self._lock:
+            self._seq += 1
+            for key in keys:
+                self._invalidated[key] = self._seq
+                self._invalidated.move_to_end(key)
+                self.invalidations += 1
+            while len(self._invalidated) > self.max_invalidations:
+                _, seq = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, seq)
+
+def create_result_cache() -> ResultCache:
+    if settings.RESULT_CACHE_URL:
+        # Optional dependency, only needed for the shared backend
+        import redis
+
+        backend = RedisBackend(redis.Redis.from_url(settings.RESULT_CACHE_URL))
+    else:
+        backend = LRUBackend(settings.RESULT_CACHE_SIZE)
+    return ResultCache(backend, settings.RESULT_CACHE_TTL, settings.RESULT_CACHE_CLOSED_TTL)
+
+result_cache = create_result_cache()
\ No newline at end of file
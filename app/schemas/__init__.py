@@ -1,4 +1,5 @@
 from .user import UserCreate, UserUpdate, UserResponse, Token, TokenData
-from .category import CategoryCreate, CategoryUpdate, CategoryResponse
-from .budget import BudgetCreate, BudgetUpdate, BudgetResponse
-from .expense import ExpenseCreate, ExpenseUpdate, ExpenseResponse
\ No newline at end of file
+from .category import CategoryCreate, CategoryUpdate, CategoryResponse, CategoryPage
+from .budget import BudgetCreate, BudgetUpdate, BudgetResponse, BudgetPage
+from .expense import ExpenseCreate, ExpenseUpdate, ExpenseResponse, ExpensePage, ExpenseSearchResult, ExpenseImportRow, ExpenseImportResult, ExpenseImportReport, ExpenseBulkDelete, ExpenseBulkDeleteResult, ExpenseRecategorize, ExpenseRecategorizeResult
+from .sync import SyncTombstones, SyncResponse
\ No newline at end of file
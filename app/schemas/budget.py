@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class BudgetBase(BaseModel):
     category_id: int
@@ -18,4 +18,8 @@ class BudgetResponse(BudgetBase):
     user_id: int
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class BudgetPage(BaseModel):
+    items: List[BudgetResponse]
+    next_cursor: Optional[str] = None
\ No newline at end of file
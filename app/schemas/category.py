@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class CategoryBase(BaseModel):
     name: str
@@ -15,4 +15,8 @@ class CategoryResponse(CategoryBase):
     user_id: int
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CategoryPage(BaseModel):
+    items: List[CategoryResponse]
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Optional
+
+from .category import CategoryResponse
+from .expense import ExpenseResponse
+
+class CategoryMonthTotal(BaseModel):
+    category_id: int
+    category: str
+    total: float
+    count: int
+
+class BudgetSummaryItem(BaseModel):
+    budget_id: int
+    category_id: int
+    category: str
+    month: str
+    budget: float
+    spent: float
+    remaining: float
+    percentage: float
+    status: str
+    projected_spend: Optional[float] = None
+    projected_overrun_date: Optional[date] = None
+    projected_as_of: Optional[date] = None
+
+class DashboardTotals(BaseModel):
+    total_budget: float
+    total_spent: float
+    remaining: float
+    budget_count: int
+
+class DashboardResponse(BaseModel):
+    month: str
+    categories: List[CategoryResponse]
+    recent_expenses: List[ExpenseResponse]
+    month_totals: List[CategoryMonthTotal]
+    budget_summary: List[BudgetSummaryItem]
+    totals: DashboardTotals
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from datetime import date, datetime
+from typing import List, Optional
 
 class ExpenseBase(BaseModel):
     description: str
@@ -21,4 +21,49 @@ class ExpenseResponse(ExpenseBase):
     user_id: int
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ExpenseSearchResult(ExpenseResponse):
+    rank: float
+
+class ExpensePage(BaseModel):
+    items: List[ExpenseResponse]
+    next_cursor: Optional[str] = None
+
+class ExpenseImportRow(ExpenseBase):
+    date: Optional[datetime] = None
+    
+    @field_validator("date", mode="before")
+    @classmethod
+    def date_only_means_midnight(cls, value):
+        # Bank statements usually carry just the day
+        if isinstance(value, str) and len(value.strip()) == 10:
+            return value.strip() + "T00:00:00"
+        return value
+
+class ExpenseImportResult(BaseModel):
+    row: int
+    status: str  # "created" or "error"
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class ExpenseImportReport(BaseModel):
+    created: int
+    failed: int
+    results: List[ExpenseImportResult]
+
+class ExpenseBulkDelete(BaseModel):
+    """Expenses to delete: by id, or by an inclusive range of days"""
+    ids: Optional[List[int]] = None
+    date_from: Optional[date] = Field(None, alias="from")
+    date_to: Optional[date] = Field(None, alias="to")
+
+class ExpenseBulkDeleteResult(BaseModel):
+    deleted: int
+
+class ExpenseRecategorize(BaseModel):
+    ids: List[int]
+    category_id: int
+
+class ExpenseRecategorizeResult(BaseModel):
+    updated: int
\ No newline at end of file
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List
+from .expense import ExpenseResponse
+from .category import CategoryResponse
+from .budget import BudgetResponse
+
+class SyncTombstones(BaseModel):
+    """Ids deleted since the cursor; a deleted category takes its expenses and budget with it"""
+    expenses: List[int] = []
+    categories: List[int] = []
+    budgets: List[int] = []
+
+class SyncResponse(BaseModel):
+    cursor: str
+    has_more: bool
+    expenses: List[ExpenseResponse]
+    categories: List[CategoryResponse]
+    budgets: List[BudgetResponse]
+    deleted: SyncTombstones
\ No newline at end of file
@@ -1 +1,5 @@
 from .email import send_budget_exceeded_email, send_budget_warning_email, send_welcome_email
+from .dates import parse_month, add_months, month_bounds, months_between, bucket_start, buckets_between
+
+from .csv_stream import iter_csv_records
+from .fast_json import fast_json_response
\ No newline at end of file
@@ -0,0 +1,46 @@
+import codecs
+import csv
+from typing import AsyncIterator, Dict, List
+
+def _parse_record(record: str) -> List[str]:
+    return next(csv.reader([record]), [])
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, str]]:
+    """Parse a streamed CSV body into dicts keyed by the lower-cased header row.
+
+    Records are parsed as soon as they are complete, so memory is bounded by
+    the longest record rather than the upload. A newline ends a record only
+    outside quotes, i.e. once the record holds an even number of quote chars.
+    Blank lines are skipped and empty cells are left out of the dict.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    header = None
+    pending = ""
+    record = ""
+    quotes = 0
+    
+    def to_dict(values):
+        return {key: value for key, value in zip(header, values) if key and value != ""}
+    
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            record += line + "\n"
+            quotes += line.count('"')
+            if quotes % 2:
+                continue
+            values = _parse_record(record)
+            record, quotes = "", 0
+            if not any(value.strip() for value in values):
+                continue
+            if header is None:
+                header = [value.strip().lower() for value in values]
+                continue
+            yield to_dict(values)
+    
+    record += pending + decoder.decode(b"", final=True)
+    if record.strip():
+        values = _parse_record(record)
+        if header is not None and any(value.strip() for value in values):
+            yield to_dict(values)
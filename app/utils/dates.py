@@ -0,0 +1,61 @@
+from datetime import date, datetime, timedelta
+from typing import List, Tuple
+
+def parse_month(value: str) -> Tuple[int, int]:
+    """Parse a "YYYY-MM" string into (year, month), raising ValueError if malformed"""
+    parsed = datetime.strptime(value, "%Y-%m")
+    return parsed.year, parsed.month
+
+def add_months(year: int, month: int, count: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + count
+    return index // 12, index % 12 + 1
+
+def month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    """Half-open [start, end) datetimes covering a calendar month"""
+    end_year, end_month = add_months(year, month, 1)
+    return datetime(year, month, 1), datetime(end_year, end_month, 1)
+
+def month_span(month_from: str, month_to: str) -> int:
+    """Number of months from month_from to month_to inclusive, < 1 when reversed"""
+    from_year, from_month = parse_month(month_from)
+    to_year, to_month = parse_month(month_to)
+    return (to_year - from_year) * 12 + to_month - from_month + 1
+
+def months_between(month_from: str, month_to: str) -> List[str]:
+    """Every "YYYY-MM" from month_from to month_to inclusive"""
+    year, month = parse_month(month_from)
+    end = parse_month(month_to)
+    months = []
+    while (year, month) <= end:
+        months.append(f"{year}-{month:02d}")
+        year, month = add_months(year, month, 1)
+    return months
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """First day of the day / ISO week (Monday) / month containing `day`"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+def bucket_count(start: date, end: date, granularity: str) -> int:
+    """len(buckets_between(start, end, granularity)), without building the list"""
+    if granularity == "month":
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    days = (bucket_start(end, granularity) - bucket_start(start, granularity)).days
+    return days // 7 + 1 if granularity == "week" else days + 1
+
+def buckets_between(start: date, end: date, granularity: str) -> List[date]:
+    """Start dates of every bucket overlapping start..end inclusive"""
+    current = bucket_start(start, granularity)
+    buckets = []
+    while current <= end:
+        buckets.append(current)
+        if granularity == "month":
+            year, month = add_months(current.year, current.month, 1)
+            current = date(year, month, 1)
+        else:
+            current += timedelta(days=7 if granularity == "week" else 1)
+    return buckets
\ No newline at end of file
@@ -1,9 +1,38 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from sqlalchemy.orm import Session
 from ..config import settings
+from ..crud.email_outbox import enqueue_email
 
-def send_budget_exceeded_email(to_email: str, category_name: str, budget_amount: float, spent_amount: float):
+def build_message(to_email: str, subject: str, body: str) -> MIMEMultipart:
+    message = MIMEMultipart()
+    message["From"] = settings.EMAIL_FROM
+    message["To"] = to_email
+    message["Subject"] = subject
+    
+    message.attach(MIMEText(body, "html"))
+    return message
+
+def queue_email(db: Session, to_email: str, subject: str, body: str):
+    """Store the message in the outbox; the outbox worker does the SMTP delivery.
+
+    The row goes in under a savepoint, so if the insert fails only the
+    message is rolled back and the caller's own writes can still commit.
+    """
+    with db.begin_nested():
+        enqueue_email(db, to_email, subject, body)
+    return True
+
+def open_smtp_connection() -> smtplib.SMTP:
+    server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+    if settings.SMTP_STARTTLS:
+        server.starttls()
+    if settings.SMTP_USER:
+        server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+    return server
+
+def send_budget_exceeded_email(db: Session, to_email: str, category_name: str, budget_amount: float, spent_amount: float):
     subject = f"🚨 Budget Alert: {category_name} Budget Exceeded"
     
     exceeded_by = spent_amount - budget_amount
@@ -216,25 +245,9 @@ def send_budget_exceeded_email(to_email: str, category_name: str, budget_amount:
     </html>
     """
     
-    message = MIMEMultipart()
-    message["From"] = settings.EMAIL_FROM
-    message["To"] = to_email
-    message["Subject"] = subject
-    
-    message.attach(MIMEText(body, "html"))
-    
-    try:
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(message)
-        print(f"✅ Budget exceeded email sent successfully to {to_email}")
-        return True
-    except Exception as e:
-        print(f"❌ Failed to send email: {str(e)}")
-        return False
+    return queue_email(db, to_email, subject, body)
 
-def send_budget_warning_email(to_email: str, category_name: str, budget_amount: float, spent_amount: float):
+def send_budget_warning_email(db: Session, to_email: str, category_name: str, budget_amount: float, spent_amount: float):
     """Send warning when spending reaches 80% of budget"""
     percentage = (spent_amount / budget_amount) * 100 if budget_amount > 0 else 0
     remaining = budget_amount - spent_amount
@@ -484,25 +497,9 @@ def send_budget_warning_email(to_email: str, category_name: str, budget_amount:
     </html>
     """
     
-    message = MIMEMultipart()
-    message["From"] = settings.EMAIL_FROM
-    message["To"] = to_email
-    message["Subject"] = subject
-    
-    message.attach(MIMEText(body, "html"))
-    
-    try:
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(message)
-        print(f"✅ Budget warning email sent successfully to {to_email}")
-        return True
-    except Exception as e:
-        print(f"❌ Failed to send warning email: {str(e)}")
-        return False
+    return queue_email(db, to_email, subject, body)
 
-def send_welcome_email(to_email: str, username: str):
+def send_welcome_email(db: Session, to_email: str, username: str):
     """Send welcome email when user registers"""
     subject = "🎉 Welcome to Money Manager!"
     
@@ -658,20 +655,4 @@ def send_welcome_email(to_email: str, username: str):
     </html>
     """
     
-    message = MIMEMultipart()
-    message["From"] = settings.EMAIL_FROM
-    message["To"] = to_email
-    message["Subject"] = subject
-    
-    message.attach(MIMEText(body, "html"))
-    
-    try:
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(message)
-        print(f"✅ Welcome email sent successfully to {to_email}")
-        return True
-    except Exception as e:
-        print(f"❌ Failed to send welcome email: {str(e)}")
-        return False
+    return queue_email(db, to_email, subject, body)
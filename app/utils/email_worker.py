@@ -0,0 +1,147 @@
+"""Background delivery of the email outbox over one reused SMTP connection"""
+import smtplib
+import threading
+import time
+from typing import Callable, Optional
+
+from ..config import settings
+from ..crud.email_outbox import claim_pending_emails, release_emails, mark_email_sent, mark_email_failed
+from .email import build_message, open_smtp_connection
+
+class CircuitBreaker:
+    """Stops delivery attempts after repeated connection failures.
+
+    closed -> open after `failure_threshold` consecutive failures; after
+    `reset_seconds` one trial attempt is allowed (half-open), which either
+    closes the circuit again or re-opens it.
+    """
+    def __init__(self, failure_threshold: int, reset_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+
+class SMTPSender:
+    """Keeps one authenticated SMTP connection open across messages and batches"""
+    def __init__(self, connect: Callable[[], smtplib.SMTP] = open_smtp_connection):
+        self.connect = connect
+        self.server: Optional[smtplib.SMTP] = None
+
+    def send(self, message):
+        if self.server is None:
+            self.server = self.connect()
+        try:
+            self.server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped an idle connection; reconnect once and retry
+            self.server = self.connect()
+            self.server.send_message(message)
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self.server = None
+
+class OutboxWorker:
+    def __init__(self, session_factory, sender: SMTPSender = None, breaker: CircuitBreaker = None,
+                 batch_size: int = None, poll_interval: float = None, max_attempts: int = None,
+                 claim_timeout: float = None):
+        self.session_factory = session_factory
+        self.sender = sender or SMTPSender()
+        self.breaker = breaker or CircuitBreaker(
+            settings.EMAIL_CIRCUIT_FAILURE_THRESHOLD, settings.EMAIL_CIRCUIT_RESET_SECONDS
+        )
+        self.batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+        self.poll_interval = poll_interval if poll_interval is not None else settings.EMAIL_POLL_INTERVAL
+        self.max_attempts = max_attempts or settings.EMAIL_MAX_ATTEMPTS
+        self.claim_timeout = claim_timeout if claim_timeout is not None else settings.EMAIL_CLAIM_TIMEOUT
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def drain_once(self) -> int:
+        """Deliver one batch; returns the number of messages sent.
+
+        The claim is committed before anything is sent and each message's
+        outcome is committed as soon as it is known, so a crash mid-batch
+        re-sends at most the message in flight once its claim times out.
+        """
+        if not self.breaker.allow():
+            return 0
+
+        # The claimed rows stay usable across the per-message commits
+        db = self.session_factory(expire_on_commit=False)
+        sent = 0
+        try:
+            claimed = claim_pending_emails(db, self.batch_size, self.claim_timeout)
+            db.commit()
+            for index, db_email in enumerate(claimed):
+                if not self.breaker.allow():
+                    release_emails(db, [unsent.id for unsent in claimed[index:]])
+                    db.commit()
+                    break
+                try:
+                    self.sender.send(build_message(db_email.to_email, db_email.subject, db_email.body))
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                    # The server is up but rejected this message
+                    mark_email_failed(db_email, str(e), self.max_attempts)
+                except (smtplib.SMTPException, OSError) as e:
+                    self.sender.close()
+                    self.breaker.record_failure()
+                    mark_email_failed(db_email, str(e), self.max_attempts)
+                    print(f"❌ Failed to send email to {db_email.to_email}: {str(e)} (circuit {self.breaker.state})")
+                else:
+                    self.breaker.record_success()
+                    mark_email_sent(db_email)
+                    sent += 1
+                db.commit()
+        finally:
+            db.close()
+        return sent
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.drain_once()
+            except Exception as e:
+                print(f"❌ Email outbox worker error: {str(e)}")
+                sent = 0
+            # Keep draining while full batches come back, otherwise poll
+            if sent < self.batch_size:
+                if self._stop.wait(self.poll_interval):
+                    break
+        self.sender.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="email-outbox-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,26 @@
+from functools import lru_cache
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+from ..config import settings
+
+@lru_cache(maxsize=None)
+def _adapter(model) -> TypeAdapter:
+    return TypeAdapter(model)
+
+def fast_json_response(content, model, response: Response = None) -> Response:
+    """Encode plain-dict rows without per-row response_model validation.
+    
+    Rows projected from our own typed columns already have the response
+    shape, so they go straight to orjson. With VALIDATE_LIST_RESPONSES they
+    are validated and dumped in one TypeAdapter pass for `model` instead.
+    Headers set on the route's injected `response` (e.g. the ETag) are kept,
+    since FastAPI doesn't merge them into a returned Response.
+    """
+    headers = dict(response.headers) if response is not None else None
+    if settings.VALIDATE_LIST_RESPONSES:
+        adapter = _adapter(model)
+        return Response(adapter.dump_json(adapter.validate_python(content)), media_type="application/json", headers=headers)
+    return ORJSONResponse(content, headers=headers)
@@ -0,0 +1,42 @@
+import base64
+import json
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple
+
+def encode_cursor(*values) -> str:
+    """Opaque, URL-safe cursor for a keyset position"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> list:
+    """Inverse of encode_cursor, raising ValueError on malformed input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+def decode_date_id_cursor(cursor: str) -> Tuple[datetime, int]:
+    values = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(values[0]), int(values[1])
+    except (IndexError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+def decode_id_cursor(cursor: str) -> int:
+    values = decode_cursor(cursor)
+    try:
+        return int(values[0])
+    except (IndexError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+def page(rows: Sequence, limit: int, key: Callable) -> Tuple[List, Optional[str]]:
+    """Split limit + 1 fetched rows into the page and the cursor for the next one"""
+    items = list(rows[:limit])
+    # An empty page has no position to continue from
+    if len(rows) > limit and items:
+        return items, encode_cursor(*key(items[-1]))
+    return items, None
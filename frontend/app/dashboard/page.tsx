@@ -61,15 +61,11 @@ export default function DashboardPage() {
 
   const fetchDashboardData = async () => {
     try {
-      const [budgetRes, expensesRes, categoriesRes] = await Promise.all([
-        api.get('/budgets/summary'),
-        api.get('/expenses/'),
-        api.get('/categories/'),
-      ]);
-
-      const budgetData = budgetRes.data;
-      const expensesData = expensesRes.data;
-      const categoriesData = categoriesRes.data;
+      const { data } = await api.get('/dashboard/');
+
+      const budgetData = data.budget_summary;
+      const expensesData = data.recent_expenses;
+      const categoriesData = data.categories;
 
       setExpenses(expensesData);
       setCategories(categoriesData);
@@ -0,0 +1,130 @@
+import itertools
+import os
+import tempfile
+
+# Settings are read when app.config is first imported, so the test
+# environment has to be in place before any app module is
+_database_dir = tempfile.mkdtemp(prefix="money-manager-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_database_dir}/test.db",
+    "DATABASE_ASYNC": "false",
+    "SECRET_KEY": "test-secret",
+    "SMTP_HOST": "localhost",
+    "SMTP_PORT": "2525",
+    "SMTP_USER": "user",
+    "SMTP_PASSWORD": "password",
+    "EMAIL_FROM": "noreply@example.com",
+    "EMAIL_WORKER_ENABLED": "false",
+    "BCRYPT_ROUNDS": "4",
+    "METRICS_ENABLED": "true",
+})
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import metrics, query_tracker
+from app.auth.principal_cache import principal_cache
+from app.config import settings
+from app.database import AsyncDB, SessionLocal, SyncDB, async_database_url, enable_sqlite_foreign_keys, get_db, session_slots
+from app.main import app
+from app.result_cache import result_cache
+
+# Each TestClient request may run on a fresh event loop, so async
+# connections are never pooled across requests
+async_engine = create_async_engine(async_database_url(settings.DATABASE_URL), poolclass=NullPool)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+enable_sqlite_foreign_keys(async_engine.sync_engine)
+query_tracker.install(async_engine.sync_engine)
+metrics.instrument_engine(async_engine.sync_engine, name="async")
+
+async def get_sync_db(request: Request):
+    db = SyncDB(SessionLocal(), session_slots())
+    request.state.db = db
+    try:
+        yield db
+    finally:
+        await db.close()
+
+async def get_async_db(request: Request):
+    db = AsyncDB(AsyncSessionLocal())
+    request.state.db = db
+    try:
+        yield db
+    finally:
+        await db.close()
+
+@pytest.fixture(params=["sync", "async"])
+def client(request):
+    """TestClient on the sync Session or the aiosqlite AsyncSession, like DATABASE_ASYNC"""
+    app.dependency_overrides[get_db] = get_sync_db if request.param == "sync" else get_async_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    principal_cache.clear()
+    result_cache.clear()
+    yield
+
+_user_ids = itertools.count(1)
+
+@pytest.fixture
+def register(client):
+    """register() creates a fresh user and returns its Authorization headers"""
+    def register(monthly_income: float = 1000.0) -> dict:
+        name = f"user{next(_user_ids)}_{os.getpid()}"
+        response = client.post("/auth/register", json={
+            "email": f"{name}@example.com",
+            "username": name,
+            "password": "password",
+        })
+        assert response.status_code == 201, response.text
+        response = client.post("/auth/login", data={"username": name, "password": "password"})
+        assert response.status_code == 200, response.text
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = client.put("/users/me", json={"monthly_income": monthly_income}, headers=headers)
+        assert response.status_code == 200, response.text
+        return headers
+    return register
+
+@pytest.fixture
+def headers(register):
+    return register()
+
+# The tables as the first release created them: no ON DELETE CASCADE, no
+# data_version, and no search, rollup or change log tables
+BASELINE_SCHEMA = [
+    "CREATE TABLE users (id INTEGER NOT NULL, email VARCHAR NOT NULL, username VARCHAR NOT NULL, "
+    "hashed_password VARCHAR NOT NULL, monthly_income FLOAT, created_at DATETIME, PRIMARY KEY (id))",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE UNIQUE INDEX ix_users_username ON users (username)",
+    "CREATE TABLE categories (id INTEGER NOT NULL, name VARCHAR NOT NULL, user_id INTEGER NOT NULL, "
+    "PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id))",
+    "CREATE INDEX ix_categories_id ON categories (id)",
+    "CREATE TABLE budgets (id INTEGER NOT NULL, category_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+    "amount FLOAT NOT NULL, month VARCHAR NOT NULL, PRIMARY KEY (id), UNIQUE (category_id), "
+    "FOREIGN KEY(category_id) REFERENCES categories (id), FOREIGN KEY(user_id) REFERENCES users (id))",
+    "CREATE INDEX ix_budgets_id ON budgets (id)",
+    "CREATE TABLE expenses (id INTEGER NOT NULL, description VARCHAR NOT NULL, amount FLOAT NOT NULL, "
+    "date DATETIME, category_id INTEGER NOT NULL, user_id INTEGER NOT NULL, PRIMARY KEY (id), "
+    "FOREIGN KEY(category_id) REFERENCES categories (id), FOREIGN KEY(user_id) REFERENCES users (id))",
+    "CREATE INDEX ix_expenses_id ON expenses (id)",
+]
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    """Engine on a database file with the baseline schema; insert rows, then
+    upgrade it as startup does with create_all and run_migrations"""
+    engine = create_engine(f"sqlite:///{tmp_path}/baseline.db")
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.exec_driver_sql(statement)
+    yield engine
+    engine.dispose()
@@ -0,0 +1,52 @@
+import pathlib
+import re
+
+from app.auth.principal_cache import principal_cache
+from app.crud import user as crud_user
+from app.database import SessionLocal
+from app.models.user import User
+from app.schemas.user import UserUpdate
+
+def test_profile_served_from_principal_cache(client, headers):
+    first = client.get("/users/me", headers=headers).json()
+    hits = principal_cache.stats()["hits"]
+    assert client.get("/users/me", headers=headers).json() == first
+    assert principal_cache.stats()["hits"] == hits + 1
+
+def test_profile_update_is_seen_by_the_next_request(client, headers):
+    client.get("/users/me", headers=headers)
+    response = client.put("/users/me", json={"monthly_income": 4321.0}, headers=headers)
+    assert response.status_code == 200
+    assert client.get("/users/me", headers=headers).json()["monthly_income"] == 4321.0
+
+def test_deleted_user_token_is_rejected(client, headers):
+    client.get("/users/me", headers=headers)
+    assert client.delete("/users/me", headers=headers).status_code == 204
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+def test_routes_never_load_relationships_from_current_user():
+    # get_current_user returns a transient User built from the cached
+    # columns, on which relationships are always empty
+    relationships = "|".join(User.__mapper__.relationships.keys())
+    pattern = re.compile(rf"\bcurrent_user\.({relationships})\b")
+    api = pathlib.Path(__file__).parent.parent / "app" / "api"
+    offenders = [
+        f"{path.name}:{number}"
+        for path in sorted(api.glob("*.py"))
+        for number, line in enumerate(path.read_text().splitlines(), 1)
+        if pattern.search(line)
+    ]
+    assert offenders == []
+
+def test_user_writes_register_a_single_commit_listener(client, headers):
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    with SessionLocal() as db:
+        for income in (1.0, 2.0, 3.0):
+            crud_user.update_user(db, user_id, UserUpdate(monthly_income=income))
+        assert len(db.dispatch.after_commit) == 1
+
+        # Cached while the writes are uncommitted, dropped by the commit
+        principal_cache.put("token", {"sub": "someone"}, {"id": user_id})
+        db.commit()
+        assert principal_cache.get("token") is None
+        assert db.info["pending_invalidations"] == []
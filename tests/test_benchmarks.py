@@ -0,0 +1,56 @@
+"""Small runs of the `python -m app.cli bench-*` benchmarks, so they keep working"""
+import os
+
+import pytest
+
+from app import async_benchmark, dashboard_benchmark, email_benchmark, export_benchmark, index_benchmark, list_benchmark, login_benchmark
+
+def test_index_benchmark_plans():
+    results = index_benchmark.run(rows=2000, users=10, queries=5)
+    plans = {(name, indexes): plan for name, indexes, _, _, plan in results}
+    assert plans[("month list, range", "none")] == "SCAN expenses"
+    assert "ix_expenses_user_id_date (user_id=? AND date>? AND date<?)" in plans[("month list, range", "0001")]
+    assert "ix_expenses_user_id_category_id_date" in plans[("category month sum, range", "0001")]
+    assert all("SCAN" not in plan for (_, indexes), plan in plans.items() if indexes == "0001")
+
+def test_email_benchmark_delivers_everything():
+    result = email_benchmark.run(messages=100, batch_size=20, workers=2)
+    assert result["delivered"] == result["marked_sent"] == 100
+    assert result["messages_per_second"] > 0
+
+def test_list_benchmark_reads_every_endpoint():
+    results = list_benchmark.run(categories=5, expenses=40, requests=2)
+    rows = {(row["mode"], row["endpoint"]): row["rows"] for row in results}
+    # The first category gets the odd expenses plus every fifth even one
+    assert rows == {
+        (mode, endpoint): count
+        for mode in ("trusted", "validated")
+        for endpoint, count in [
+            ("/expenses/", 40), ("/expenses/ cursor", 40), ("/expenses/category/{id}", 24),
+            ("/expenses/month/{y}/{m}", 40), ("/expenses/query", 24), ("/categories/", 5), ("/budgets/", 5),
+        ]
+    }
+    assert all(row["rows_per_second"] > 0 for row in results)
+
+def test_login_benchmark_runs_logins_alongside_reads():
+    results = login_benchmark.run(login_concurrency=(0, 2), readers=2, duration=0.5, env={"BCRYPT_ROUNDS": "4"})
+    assert [row["login_clients"] for row in results] == [0, 2]
+    assert results[1]["logins_per_second"] > 0
+    assert all(row["read_rps"] > 0 and row["read_errors"] == 0 for row in results)
+
+def test_async_benchmark_runs_both_modes():
+    results = async_benchmark.run(concurrency=(4,), duration=0.5)
+    assert set(results) == {"sync", "async"}
+    for rows in results.values():
+        assert rows[0]["ok"] == rows[0]["requests"] > 0
+
+def test_dashboard_benchmark_runs_both_patterns():
+    results = dashboard_benchmark.run(concurrency=(2,), duration=0.5, categories=3, expenses=50, principal_cache=False)
+    assert [row["pattern"] for row in results] == ["three calls", "/dashboard"]
+    assert all(row["ok"] == row["requests"] > 0 for row in results)
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="samples RSS from /proc")
+def test_export_benchmark_downloads_every_row():
+    results = export_benchmark.run(sizes=(100, 300))
+    assert [(row["expenses"], row["format"]) for row in results] == [(100, "csv"), (100, "ndjson"), (300, "csv"), (300, "ndjson")]
+    assert all(row["rows"] == row["expenses"] and row["peak_rss_mb"] > 0 for row in results)
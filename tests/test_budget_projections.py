@@ -0,0 +1,48 @@
+from sqlalchemy import select
+
+from app.crud import budget_projection as crud_projection
+from app.database import SessionLocal
+from app.models.user import User
+from app.projections import run_projections
+from app.result_cache import LRUBackend, ResultCache
+
+def data_versions(user_ids: list) -> dict:
+    with SessionLocal() as db:
+        return dict(db.execute(select(User.id, User.data_version).where(User.id.in_(user_ids))).all())
+
+def add_budget(client, headers: dict) -> int:
+    category_id = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    month = client.get("/dashboard/", headers=headers).json()["month"]
+    client.post("/budgets/", json={"category_id": category_id, "amount": 100.0, "month": month}, headers=headers)
+    client.post("/expenses/", json={"description": "Lunch", "amount": 40.0, "category_id": category_id}, headers=headers)
+    return client.get("/users/me", headers=headers).json()["id"]
+
+def test_projections_bump_data_version_of_budget_owners_only(client, register):
+    owner = add_budget(client, register())
+    bystander = client.get("/users/me", headers=register()).json()["id"]
+    before = data_versions([owner, bystander])
+
+    with SessionLocal() as db:
+        run_projections(db)
+
+    after = data_versions([owner, bystander])
+    assert after[owner] == before[owner] + 1
+    assert after[bystander] == before[bystander]
+
+def test_projections_reach_etags_and_other_processes_caches(client, headers, monkeypatch):
+    add_budget(client, headers)
+    summary = client.get("/budgets/summary", headers=headers)
+    dashboard = client.get("/dashboard/", headers=headers)
+    assert summary.json()[0]["projected_spend"] is None
+
+    # The batch runs in its own process, with a cache of its own
+    monkeypatch.setattr(crud_projection, "result_cache", ResultCache(LRUBackend(100), ttl=300.0))
+    with SessionLocal() as db:
+        run_projections(db)
+
+    response = client.get("/budgets/summary", headers={**headers, "If-None-Match": summary.headers["ETag"]})
+    assert response.status_code == 200
+    assert response.json()[0]["projected_spend"] is not None
+    response = client.get("/dashboard/", headers={**headers, "If-None-Match": dashboard.headers["ETag"]})
+    assert response.status_code == 200
+    assert response.json()["budget_summary"][0]["projected_spend"] is not None
@@ -0,0 +1,72 @@
+import pytest
+
+from app.config import settings
+from app.result_cache import result_cache
+
+@pytest.fixture
+def budgeted(client, headers):
+    """Rent budgeted in 2024-01, Food in 2024-03, with spend in both months"""
+    rent = client.post("/categories/", json={"name": "Rent"}, headers=headers).json()["id"]
+    food = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    client.post("/budgets/", json={"category_id": rent, "amount": 800.0, "month": "2024-01"}, headers=headers)
+    client.post("/budgets/", json={"category_id": food, "amount": 100.0, "month": "2024-03"}, headers=headers)
+    response = client.post("/expenses/bulk", json=[
+        {"description": "January rent", "amount": 800.0, "category_id": rent, "date": "2024-01-01T09:00:00"},
+        {"description": "Groceries", "amount": 40.0, "category_id": food, "date": "2024-03-05T18:00:00"},
+        {"description": "Dinner", "amount": 75.0, "category_id": food, "date": "2024-03-20T20:00:00"},
+    ], headers=headers)
+    assert response.json()["created"] == 3, response.text
+    return {"headers": headers, "rent": rent, "food": food}
+
+def test_range_matrix_shape(client, budgeted):
+    response = client.get("/budgets/summary", params={"from": "2023-12", "to": "2024-04"}, headers=budgeted["headers"])
+    assert response.status_code == 200, response.text
+    matrix = response.json()
+
+    assert matrix["from"] == "2023-12"
+    assert matrix["to"] == "2024-04"
+    assert matrix["months"] == ["2023-12", "2024-01", "2024-02", "2024-03", "2024-04"]
+    # Sorted by category name, each with only the months it has a budget for
+    assert [(row["category_id"], row["category"], list(row["months"])) for row in matrix["categories"]] == [
+        (budgeted["food"], "Food", ["2024-03"]),
+        (budgeted["rent"], "Rent", ["2024-01"]),
+    ]
+    food = matrix["categories"][0]["months"]["2024-03"]
+    assert food["budget"] == 100.0
+    assert food["spent"] == 115.0
+    assert food["remaining"] == -15.0
+    assert food["percentage"] == pytest.approx(115.0)
+    assert food["status"] == "exceeded"
+    assert set(food) == {"budget", "spent", "remaining", "percentage", "status", "projected_spend", "projected_overrun_date"}
+    assert matrix["categories"][1]["months"]["2024-01"]["status"] == "within"
+
+def test_single_month_is_served_from_the_same_rows(client, budgeted):
+    rows = client.get("/budgets/summary", params={"month": "2024-03"}, headers=budgeted["headers"]).json()
+    assert [(row["category"], row["month"], row["spent"]) for row in rows] == [("Food", "2024-03", 115.0)]
+
+def test_range_is_capped(client, headers):
+    limit = settings.SUMMARY_MAX_MONTHS
+    # 120 months, the default limit
+    assert client.get("/budgets/summary", params={"from": "2015-01", "to": "2024-12"}, headers=headers).status_code == 200
+    response = client.get("/budgets/summary", params={"from": "2014-12", "to": "2024-12"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Range spans more than {limit} months"
+    assert client.get("/budgets/summary", params={"from": "0001-01", "to": "9999-12"}, headers=headers).status_code == 400
+
+@pytest.mark.parametrize("params", [
+    {"from": "2024-05", "to": "2024-04"},
+    {"from": "2024-13", "to": "2024-12"},
+    {"from": "2024-01", "to": "soon"},
+])
+def test_invalid_ranges_are_rejected(client, headers, params):
+    assert client.get("/budgets/summary", params=params, headers=headers).status_code == 400
+
+def test_empty_months_around_the_data_are_not_cached(client, budgeted):
+    before = result_cache.stats()["size"]
+    response = client.get("/budgets/summary", params={"from": "2015-01", "to": "2024-12"}, headers=budgeted["headers"])
+    assert response.status_code == 200
+    # 2024-01 to 2024-03 only, though the range spans 120 months
+    assert result_cache.stats()["size"] - before == 3
+
+    again = client.get("/budgets/summary", params={"from": "2015-01", "to": "2024-12"}, headers=budgeted["headers"])
+    assert again.json() == response.json()
@@ -0,0 +1,201 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.crud.monthly_total import verify_monthly_totals
+from app.database import Base, SessionLocal
+from app.migrations import run_migrations
+from app.models.change_log import ChangeLog
+from app.models.user import User
+
+def import_expenses(client, headers, category_id, rows) -> list:
+    response = client.post("/expenses/bulk", json=[
+        {"description": description, "amount": amount, "category_id": category_id, "date": date}
+        for description, amount, date in rows
+    ], headers=headers)
+    assert response.json()["created"] == len(rows), response.text
+    return [result["id"] for result in response.json()["results"]]
+
+@pytest.fixture
+def owners(client, register):
+    """Two users with expenses in March and April 2024"""
+    mine, theirs = register(), register()
+    food = client.post("/categories/", json={"name": "Food"}, headers=mine).json()["id"]
+    rent = client.post("/categories/", json={"name": "Rent"}, headers=mine).json()["id"]
+    other = client.post("/categories/", json={"name": "Food"}, headers=theirs).json()["id"]
+    return {
+        "mine": mine, "theirs": theirs, "food": food, "rent": rent, "other": other,
+        "user_id": client.get("/users/me", headers=mine).json()["id"],
+        "other_user_id": client.get("/users/me", headers=theirs).json()["id"],
+        "ids": import_expenses(client, mine, food, [
+            ("Market stall", 10.0, "2024-03-01T00:00:00"),
+            ("Market bakery", 20.0, "2024-03-31T23:59:59"),
+            ("Market fish", 40.0, "2024-04-01T00:00:00"),
+        ]),
+        "other_ids": import_expenses(client, theirs, other, [("Market stall", 80.0, "2024-03-15T12:00:00")]),
+    }
+
+def data_version(user_id: int) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(User.data_version).where(User.id == user_id))
+
+def changes_after(user_id: int, seq: int) -> list:
+    with SessionLocal() as db:
+        return [tuple(row) for row in db.execute(
+            select(ChangeLog.change_seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.deleted)
+            .where(ChangeLog.user_id == user_id, ChangeLog.change_seq > seq)
+            .order_by(ChangeLog.change_seq)
+        )]
+
+def indexed(expense_ids: list) -> set:
+    with SessionLocal() as db:
+        return set(db.scalars(text("SELECT rowid FROM expenses_fts")).all()) & set(expense_ids)
+
+def rollup_is_consistent(*user_ids) -> bool:
+    with SessionLocal() as db:
+        return all(verify_monthly_totals(db, user_id) == [] for user_id in user_ids)
+
+def report_total(client, headers, month: int) -> float:
+    return client.get(f"/expenses/report/2024/{month}", headers=headers).json()["total_spent"]
+
+def expense_ids(client, headers) -> set:
+    return {expense["id"] for expense in client.get("/expenses/", params={"limit": 100}, headers=headers).json()}
+
+def test_delete_by_ids_ignores_other_users_ids(client, owners):
+    first, second, third = owners["ids"]
+    user_id, other_user_id = owners["user_id"], owners["other_user_id"]
+    version, other_version = data_version(user_id), data_version(other_user_id)
+    assert report_total(client, owners["mine"], 3) == 30.0
+
+    response = client.post("/expenses/bulk/delete", json={"ids": [first, third, *owners["other_ids"], 2**31 - 1]}, headers=owners["mine"])
+    assert response.status_code == 200, response.text
+    assert response.json() == {"deleted": 2}
+
+    assert expense_ids(client, owners["mine"]) == {second}
+    assert expense_ids(client, owners["theirs"]) == set(owners["other_ids"])
+    # Rollup, search index and change log follow, for this user only
+    assert rollup_is_consistent(user_id, other_user_id)
+    assert report_total(client, owners["mine"], 3) == 20.0
+    assert report_total(client, owners["mine"], 4) == 0
+    assert report_total(client, owners["theirs"], 3) == 80.0
+    assert indexed(owners["ids"] + owners["other_ids"]) == {second, *owners["other_ids"]}
+    assert sorted(changes_after(user_id, version)) == [
+        (version + 1, "expense", first, True), (version + 2, "expense", third, True)
+    ]
+    assert data_version(user_id) == version + 2
+    assert data_version(other_user_id) == other_version
+    assert changes_after(other_user_id, other_version) == []
+
+def test_delete_by_inclusive_range(client, owners):
+    response = client.post("/expenses/bulk/delete", json={"from": "2024-03-31", "to": "2024-04-01"}, headers=owners["mine"])
+    assert response.json() == {"deleted": 2}
+    assert expense_ids(client, owners["mine"]) == {owners["ids"][0]}
+    assert expense_ids(client, owners["theirs"]) == set(owners["other_ids"])
+    assert rollup_is_consistent(owners["user_id"])
+
+    # Open-ended on either side
+    assert client.post("/expenses/bulk/delete", json={"to": "2024-03-01"}, headers=owners["mine"]).json() == {"deleted": 1}
+    assert client.post("/expenses/bulk/delete", json={"from": "2000-01-01"}, headers=owners["theirs"]).json() == {"deleted": 1}
+
+def test_deleting_nothing_writes_nothing(client, owners):
+    version = data_version(owners["user_id"])
+    for selection in ({"ids": []}, {"ids": owners["other_ids"]}, {"from": "2030-01-01"}):
+        assert client.post("/expenses/bulk/delete", json=selection, headers=owners["mine"]).json() == {"deleted": 0}
+    assert data_version(owners["user_id"]) == version
+
+@pytest.mark.parametrize("selection, status", [
+    ({}, 400),
+    ({"ids": [1], "from": "2024-03-01"}, 400),
+    ({"from": "2024-03-02", "to": "2024-03-01"}, 400),
+    ({"ids": list(range(1, settings.BULK_EDIT_MAX_IDS + 2))}, 413),
+])
+def test_bad_delete_requests(client, headers, selection, status):
+    assert client.post("/expenses/bulk/delete", json=selection, headers=headers).status_code == status
+
+def test_recategorize_ignores_other_users_ids(client, owners):
+    first, second, third = owners["ids"]
+    user_id, other_user_id = owners["user_id"], owners["other_user_id"]
+    version, other_version = data_version(user_id), data_version(other_user_id)
+
+    response = client.post("/expenses/bulk/recategorize", json={"ids": [first, third, *owners["other_ids"]], "category_id": owners["rent"]}, headers=owners["mine"])
+    assert response.status_code == 200, response.text
+    assert response.json() == {"updated": 2}
+
+    categories = {e["id"]: e["category_id"] for e in client.get("/expenses/", headers=owners["mine"]).json()}
+    assert categories == {first: owners["rent"], second: owners["food"], third: owners["rent"]}
+    assert {e["category_id"] for e in client.get("/expenses/", headers=owners["theirs"]).json()} == {owners["other"]}
+
+    assert rollup_is_consistent(user_id, other_user_id)
+    report = client.get("/expenses/report/2024/3", headers=owners["mine"]).json()
+    assert report["by_category"] == {"Food": 20.0, "Rent": 10.0}
+    # Still searchable, under the new category
+    found = client.get("/expenses/search", params={"q": "market", "category_id": owners["rent"]}, headers=owners["mine"]).json()
+    assert {row["id"] for row in found} == {first, third}
+    assert sorted(changes_after(user_id, version)) == [
+        (version + 1, "expense", first, False), (version + 2, "expense", third, False)
+    ]
+    assert data_version(other_user_id) == other_version
+
+    # Already there: nothing changes, nothing is logged
+    version = data_version(user_id)
+    assert client.post("/expenses/bulk/recategorize", json={"ids": [first], "category_id": owners["rent"]}, headers=owners["mine"]).json() == {"updated": 0}
+    assert data_version(user_id) == version
+
+def test_recategorize_into_someone_elses_category(client, owners):
+    response = client.post("/expenses/bulk/recategorize", json={"ids": owners["ids"], "category_id": owners["other"]}, headers=owners["mine"])
+    assert response.status_code == 404
+    assert {e["category_id"] for e in client.get("/expenses/", headers=owners["mine"]).json()} == {owners["food"]}
+
+def test_recategorize_id_cap(client, owners):
+    response = client.post("/expenses/bulk/recategorize", json={
+        "ids": list(range(1, settings.BULK_EDIT_MAX_IDS + 2)), "category_id": owners["rent"]
+    }, headers=owners["mine"])
+    assert response.status_code == 413
+
+def test_cascade_migration_drops_orphans_of_a_baseline_database(baseline_engine):
+    with baseline_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, email, username, hashed_password, monthly_income) VALUES "
+            "(1, 'a@example.com', 'a', 'x', 0), (2, 'b@example.com', 'b', 'x', 0)"
+        ))
+        # Category 3 belonged to a user deleted without its rows; category 4's
+        # budget and expense outlived it
+        conn.execute(text("INSERT INTO categories (id, name, user_id) VALUES (1, 'Food', 1), (2, 'Rent', 2), (3, 'Gone', 99)"))
+        conn.execute(text(
+            "INSERT INTO budgets (id, category_id, user_id, amount, month) VALUES "
+            "(1, 1, 1, 100, '2024-03'), (2, 3, 99, 50, '2024-03'), (3, 4, 1, 10, '2024-03')"
+        ))
+        conn.execute(text(
+            "INSERT INTO expenses (id, description, amount, date, category_id, user_id) VALUES "
+            "(1, 'Lunch', 10, :date, 1, 1), (2, 'Rent', 700, :date, 2, 2), "
+            "(3, 'Ghost', 5, :date, 3, 99), (4, 'Stray', 7, :date, 4, 1), (5, 'Mixed up', 9, :date, 1, 99)"
+        ), {"date": datetime(2024, 3, 10)})
+
+    Base.metadata.create_all(bind=baseline_engine)
+    assert "0005_cascade_foreign_keys" in run_migrations(baseline_engine)
+
+    with Session(baseline_engine) as db:
+        def ids(table):
+            return sorted(db.scalars(text(f"SELECT id FROM {table}")))
+        assert ids("categories") == [1, 2]
+        assert ids("budgets") == [1]
+        assert ids("expenses") == [1, 2]
+        assert db.execute(text("PRAGMA foreign_key_check")).all() == []
+        assert sorted(db.scalars(text("SELECT rowid FROM expenses_fts"))) == [1, 2]
+        # The later backfills only saw the surviving rows
+        assert verify_monthly_totals(db) == []
+        assert sorted(tuple(row) for row in db.execute(text("SELECT user_id, entity, entity_id FROM change_log"))) == [
+            (1, "budget", 1), (1, "category", 1), (1, "expense", 1), (2, "category", 2), (2, "expense", 2)
+        ]
+        for table in ("categories", "budgets", "expenses"):
+            assert {row.on_delete for row in db.execute(text(f"PRAGMA foreign_key_list({table})"))} == {"CASCADE"}
+
+    # Deleting a user now takes everything of theirs along
+    with baseline_engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        conn.execute(text("DELETE FROM users WHERE id = 1"))
+        assert conn.execute(text("SELECT count(*) FROM expenses WHERE user_id = 1")).scalar() == 0
+        assert conn.execute(text("SELECT count(*) FROM budgets")).scalar() == 0
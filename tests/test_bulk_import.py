@@ -0,0 +1,84 @@
+import asyncio
+
+from app.utils.csv_stream import iter_csv_records
+
+def csv_records(*chunks: bytes) -> list:
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [record async for record in iter_csv_records(stream())]
+    return asyncio.run(collect())
+
+def test_records_split_across_chunks():
+    body = 'Description,Amount,Category_ID,Date\r\n"Dinner, with ""friends""\nand family",42.5,3,2024-03-01\n\nTaxi,9,3,\n'.encode()
+    expected = [
+        {"description": 'Dinner, with "friends"\nand family', "amount": "42.5", "category_id": "3", "date": "2024-03-01"},
+        {"description": "Taxi", "amount": "9", "category_id": "3"},
+    ]
+    # Every split point, including inside quotes and inside a multi-byte BOM
+    body = "﻿".encode() + body
+    for size in (1, 2, 7, len(body)):
+        assert csv_records(*(body[i:i + size] for i in range(0, len(body), size))) == expected
+
+def test_last_record_without_a_newline():
+    assert csv_records(b"description,amount\nLunch,12") == [{"description": "Lunch", "amount": "12"}]
+    assert csv_records(b"description,amount\n") == []
+    assert csv_records(b"") == []
+
+def stream(text: str, size: int = 16):
+    """The body in small chunks, so the upload really arrives in pieces"""
+    body = text.encode()
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+def test_csv_upload_reports_bad_rows_and_inserts_the_rest(client, headers, register):
+    own = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    foreign = client.post("/categories/", json={"name": "Theirs"}, headers=register()).json()["id"]
+    body = "\n".join([
+        "description,amount,category_id,date",
+        f"Groceries,40.5,{own},2024-03-05T18:00:00",
+        f"Free lunch,,{own},",
+        f"Not mine,10,{foreign},",
+        "Unknown,10,999999999,",
+        "Typo,10,abc,",
+        f"Time travel,10,{own},2024-02-30",
+        f'"Dinner, late",75,{own},2024-03-20',
+        "",
+    ])
+    response = client.post("/expenses/bulk", content=stream(body), headers={**headers, "Content-Type": "text/csv"})
+    assert response.status_code == 200, response.text
+    report = response.json()
+
+    assert report["created"] == 2
+    assert report["failed"] == 5
+    results = report["results"]
+    # Rows are numbered from 1, after the header
+    assert [result["row"] for result in results] == list(range(1, 8))
+    assert [result["status"] for result in results] == ["created", "error", "error", "error", "error", "error", "created"]
+    assert results[1]["error"] == "amount: Field required"
+    assert results[2]["error"] == results[3]["error"] == "Category not found"
+    assert results[4]["error"].startswith("category_id:")
+    assert results[5]["error"].startswith("date:")
+    assert all(result["id"] is None for result in results if result["status"] == "error")
+
+    created = {result["id"] for result in results if result["status"] == "created"}
+    expenses = client.get("/expenses/", params={"limit": 100}, headers=headers).json()
+    assert {(e["id"], e["description"], e["amount"], e["date"][:10]) for e in expenses} == {
+        (results[0]["id"], "Groceries", 40.5, "2024-03-05"),
+        (results[6]["id"], "Dinner, late", 75.0, "2024-03-20"),
+    }
+    assert {e["id"] for e in expenses} == created
+
+def test_csv_upload_with_only_bad_rows_creates_nothing(client, headers):
+    body = "description,amount,category_id\nBroken,lots,1\n"
+    response = client.post("/expenses/bulk", content=stream(body), headers={**headers, "Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert response.json()["created"] == 0
+    assert response.json()["results"][0]["error"].startswith("amount:")
+    assert client.get("/expenses/", headers=headers).json() == []
+
+def test_unsupported_content_type_is_rejected(client, headers):
+    response = client.post("/expenses/bulk", content=b"<expenses/>", headers={**headers, "Content-Type": "application/xml"})
+    assert response.status_code == 415
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.crud import category as crud_category
+from app.database import AsyncDB, Base, RequestDB, SyncDB, async_database_url, pool_options
+from app.models.category import Category
+from app.models.user import User
+from app.schemas.category import CategoryCreate
+
+def test_request_db_is_abstract():
+    with pytest.raises(TypeError):
+        RequestDB(None)
+
+    class NoStream(RequestDB):
+        async def run(self, fn, *args, **kwargs): ...
+        async def commit(self): ...
+        async def close(self): ...
+
+    with pytest.raises(TypeError):
+        NoStream(None)
+
+@pytest.fixture(params=["sync", "async"])
+def open_db(request, tmp_path):
+    """open_db() returns a fresh SyncDB or AsyncDB (aiosqlite) on one scratch database"""
+    url = f"sqlite:///{tmp_path}/db.sqlite"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert().values(id=1, email="a@example.com", username="a", hashed_password="x"))
+    async_engine = create_async_engine(async_database_url(url), poolclass=NullPool)
+    if request.param == "sync":
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        yield lambda: SyncDB(Session())
+    else:
+        Session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        yield lambda: AsyncDB(Session())
+    engine.dispose()
+    asyncio.run(async_engine.dispose())
+
+def test_commit_keeps_writes_and_close_discards_them(open_db):
+    async def scenario():
+        db = open_db()
+        await db.run(crud_category.create_category, CategoryCreate(name="Kept"), 1)
+        await db.commit()
+        await db.run(crud_category.create_category, CategoryCreate(name="Dropped"), 1)
+        await db.close()
+
+        db = open_db()
+        try:
+            return [row["name"] for row in await db.run(crud_category.get_categories, 1)]
+        finally:
+            await db.close()
+
+    assert asyncio.run(scenario()) == ["Kept"]
+
+def test_stream_yields_every_row_in_batches(open_db):
+    async def scenario():
+        db = open_db()
+        try:
+            for i in range(25):
+                await db.run(crud_category.create_category, CategoryCreate(name=f"Category {i}"), 1)
+            await db.commit()
+            return [
+                [row.name for row in rows]
+                async for rows in db.stream(select(Category.name).order_by(Category.id), 10)
+            ]
+        finally:
+            await db.close()
+
+    batches = asyncio.run(scenario())
+    assert [len(rows) for rows in batches] == [10, 10, 5]
+    assert [name for rows in batches for name in rows] == [f"Category {i}" for i in range(25)]
+
+def test_sync_sessions_beyond_the_pool_wait_for_a_slot(tmp_path):
+    # More requests than threadpool workers (40) on a one-connection pool:
+    # without slots every worker blocks on checkout while the request that
+    # holds the connection waits for a worker, until the pool times out
+    engine = create_engine(f"sqlite:///{tmp_path}/db.sqlite", pool_size=1, max_overflow=0, pool_timeout=5)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    async def request(slots):
+        db = SyncDB(Session(), slots)
+        try:
+            await db.run(crud_category.get_categories, 1)
+            await asyncio.sleep(0)
+            return await db.run(crud_category.get_categories, 1)
+        finally:
+            await db.close()
+
+    async def scenario():
+        slots = asyncio.Semaphore(1)
+        return await asyncio.gather(*(request(slots) for _ in range(60)))
+
+    try:
+        assert asyncio.run(scenario()) == [[]] * 60
+    finally:
+        engine.dispose()
+
+def test_pool_options_leave_in_memory_sqlite_alone():
+    assert pool_options("sqlite://") == {}
+    assert pool_options("sqlite:///:memory:") == {}
+    assert set(pool_options("sqlite:///app.db")) == {"pool_size", "max_overflow"}
@@ -0,0 +1,40 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.crud.email_outbox import enqueue_email
+from app.database import SessionLocal
+from app.models.email_outbox import EmailOutbox
+from app.utils import email
+
+def outbox_recipients() -> list:
+    with SessionLocal() as db:
+        return list(db.scalars(select(EmailOutbox.to_email)))
+
+@pytest.fixture
+def failing_outbox(monkeypatch):
+    """The outbox insert violates NOT NULL, as a broken row would"""
+    def enqueue_invalid(db, to_email, subject, body):
+        return enqueue_email(db, None, subject, body)
+    monkeypatch.setattr(email, "enqueue_email", enqueue_invalid)
+
+def test_expense_is_kept_when_the_alert_cannot_be_queued(client, headers, failing_outbox):
+    category_id = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    month = datetime.now().strftime("%Y-%m")
+    client.post("/budgets/", json={"category_id": category_id, "amount": 10.0, "month": month}, headers=headers)
+    before = outbox_recipients()
+
+    response = client.post("/expenses/", json={"description": "Feast", "amount": 50.0, "category_id": category_id}, headers=headers)
+    assert response.status_code == 201, response.text
+    assert client.get(f"/expenses/{response.json()['id']}", headers=headers).status_code == 200
+    assert outbox_recipients() == before
+
+def test_user_is_kept_when_the_welcome_email_cannot_be_queued(client, failing_outbox):
+    name = f"unwelcome_{uuid.uuid4().hex}"
+    before = outbox_recipients()
+    response = client.post("/auth/register", json={"email": f"{name}@example.com", "username": name, "password": "password"})
+    assert response.status_code == 201, response.text
+    assert client.post("/auth/login", data={"username": name, "password": "password"}).status_code == 200
+    assert outbox_recipients() == before
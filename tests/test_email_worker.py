@@ -0,0 +1,116 @@
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.email_outbox import claim_pending_emails, enqueue_email
+from app.database import Base
+from app.email_benchmark import SMTPSink
+from app.models.email_outbox import EmailOutbox
+from app.utils.email_worker import CircuitBreaker, OutboxWorker, SMTPSender
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/outbox.db", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def sink():
+    with SMTPSink(reject={"bounce@example.com"}) as sink:
+        yield sink
+
+def make_worker(Session, connect, **kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(3, 60.0))
+    return OutboxWorker(Session, sender=SMTPSender(connect), batch_size=50, poll_interval=0, max_attempts=3, **kwargs)
+
+def queue(Session, *recipients):
+    with Session() as db:
+        for i, recipient in enumerate(recipients):
+            enqueue_email(db, recipient, f"Message {i}", "<p>hi</p>")
+        db.commit()
+
+def outbox(Session):
+    with Session() as db:
+        return {row.to_email: row for row in db.scalars(select(EmailOutbox))}
+
+def test_drain_delivers_and_marks_each_message(Session, sink):
+    queue(Session, *(f"user{i}@example.com" for i in range(5)))
+    worker = make_worker(Session, sink.connect)
+
+    assert worker.drain_once() == 5
+    assert worker.drain_once() == 0
+    worker.sender.close()
+
+    assert len(sink.messages) == 5
+    assert all(row.status == "sent" and row.attempts == 1 and row.claimed_at is None for row in outbox(Session).values())
+
+def test_rejected_message_is_retried_later(Session, sink):
+    queue(Session, "bounce@example.com", "ok@example.com")
+    worker = make_worker(Session, sink.connect)
+
+    assert worker.drain_once() == 1
+    worker.sender.close()
+
+    rows = outbox(Session)
+    assert rows["ok@example.com"].status == "sent"
+    bounced = rows["bounce@example.com"]
+    assert bounced.status == "pending"
+    assert bounced.attempts == 1
+    assert bounced.next_attempt_at > datetime.utcnow()
+    assert "mailbox unavailable" in bounced.last_error
+    assert worker.breaker.state == "closed"
+
+def test_concurrent_workers_deliver_each_message_once(Session, sink):
+    queue(Session, *(f"user{i}@example.com" for i in range(300)))
+    workers = [make_worker(Session, sink.connect) for _ in range(4)]
+
+    def drain(worker):
+        while worker.drain_once():
+            pass
+        worker.sender.close()
+
+    threads = [threading.Thread(target=drain, args=(worker,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sink.messages) == 300
+    assert all(row.status == "sent" and row.attempts == 1 for row in outbox(Session).values())
+
+def test_claim_is_atomic_and_expires(Session, sink):
+    queue(Session, "a@example.com", "b@example.com")
+    # A worker that claimed the batch and died before sending
+    with Session() as db:
+        assert len(claim_pending_emails(db, 50)) == 2
+        db.commit()
+    with Session() as db:
+        assert claim_pending_emails(db, 50) == []
+
+    assert make_worker(Session, sink.connect).drain_once() == 0
+    worker = make_worker(Session, sink.connect, claim_timeout=0)
+    assert worker.drain_once() == 2
+    worker.sender.close()
+    assert len(sink.messages) == 2
+
+def test_open_circuit_hands_back_unsent_claims(Session):
+    queue(Session, "a@example.com", "b@example.com", "c@example.com")
+
+    def refuse():
+        raise ConnectionRefusedError("smtp down")
+
+    worker = make_worker(Session, refuse, breaker=CircuitBreaker(1, 60.0))
+    assert worker.drain_once() == 0
+    assert worker.breaker.state == "open"
+
+    rows = outbox(Session)
+    assert rows["a@example.com"].attempts == 1
+    assert rows["a@example.com"].last_error == "smtp down"
+    for recipient in ("b@example.com", "c@example.com"):
+        assert rows[recipient].status == "pending"
+        assert rows[recipient].attempts == 0
+        assert rows[recipient].claimed_at is None
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+
+from app.api import etag
+
+ROUTES = ["/expenses/", "/categories/"]
+
+def conditional_get(client, path: str, headers: dict, tag: str):
+    return client.get(path, headers={**headers, "If-None-Match": tag})
+
+@pytest.mark.parametrize("path", ROUTES)
+def test_matching_tag_is_not_modified(client, headers, path):
+    first = client.get(path, headers=headers)
+    assert first.status_code == 200
+    tag = first.headers["ETag"]
+    assert tag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    response = conditional_get(client, path, headers, tag)
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == tag
+    # Weak comparison, lists and the wildcard
+    assert conditional_get(client, path, headers, tag.removeprefix("W/")).status_code == 304
+    assert conditional_get(client, path, headers, f'"other", {tag}').status_code == 304
+    assert conditional_get(client, path, headers, "*").status_code == 304
+    assert conditional_get(client, path, headers, '"other"').status_code == 200
+
+@pytest.mark.parametrize("path", ROUTES)
+def test_writes_change_the_tag(client, headers, path):
+    tag = client.get(path, headers=headers).headers["ETag"]
+
+    category = client.post("/categories/", json={"name": "Food"}, headers=headers).json()
+    response = conditional_get(client, path, headers, tag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != tag
+    tag = response.headers["ETag"]
+
+    client.post("/expenses/", json={"description": "Lunch", "amount": 9.5, "category_id": category["id"]}, headers=headers)
+    response = conditional_get(client, path, headers, tag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != tag
+    assert conditional_get(client, path, headers, response.headers["ETag"]).status_code == 304
+
+@pytest.mark.parametrize("path", ROUTES)
+def test_tag_changes_at_the_month_rollover(client, headers, path, monkeypatch):
+    class Clock(datetime):
+        current = datetime(2024, 1, 31, 23, 59, 59)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.current
+    monkeypatch.setattr(etag, "datetime", Clock)
+
+    tag = client.get(path, headers=headers).headers["ETag"]
+    assert conditional_get(client, path, headers, tag).status_code == 304
+
+    Clock.current = datetime(2024, 2, 1, 0, 0, 0)
+    response = conditional_get(client, path, headers, tag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != tag
+
+@pytest.mark.parametrize("path", ROUTES)
+def test_tags_are_never_shared_between_users(client, register, path):
+    first, second = register(), register()
+    # Both users are fresh, so their data_version is the same
+    tag = client.get(path, headers=first).headers["ETag"]
+    response = conditional_get(client, path, second, tag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != tag
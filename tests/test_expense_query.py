@@ -0,0 +1,36 @@
+import pytest
+
+from app.crud.expense import _prefix_upper_bound
+
+MAX = "\U0010ffff"
+# The last code point before the surrogates, which can't be stored
+BEFORE_SURROGATES = "퟿"
+
+@pytest.mark.parametrize("prefix, upper", [
+    ("cof", "cog"),
+    ("a" + MAX, "b"),
+    ("ab" + MAX + MAX, "ac"),
+    ("a" + BEFORE_SURROGATES, "a"),
+    (MAX, None),
+    (MAX * 3, None),
+])
+def test_prefix_upper_bound(prefix, upper):
+    assert _prefix_upper_bound(prefix) == upper
+
+def test_prefix_at_the_end_of_unicode(client, headers):
+    category_id = client.post("/categories/", json={"name": "Misc"}, headers=headers).json()["id"]
+    for description in ("Coffee", "Cog", "x" + MAX, "x" + MAX + "y", "y", MAX, MAX + MAX, BEFORE_SURROGATES * 2, ""):
+        response = client.post("/expenses/", json={"description": description, "amount": 1.0, "category_id": category_id}, headers=headers)
+        assert response.status_code == 201, response.text
+
+    def matches(prefix):
+        response = client.get("/expenses/query", params={"prefix": prefix, "sort": "description", "order": "asc"}, headers=headers)
+        assert response.status_code == 200, response.text
+        return [row["description"] for row in response.json()]
+
+    assert matches("cof") == ["Coffee"]
+    assert matches("CO") == ["Coffee", "Cog"]
+    assert matches("x" + MAX) == ["x" + MAX, "x" + MAX + "y"]
+    assert matches(MAX) == [MAX, MAX + MAX]
+    assert matches(MAX + MAX) == [MAX + MAX]
+    assert matches(BEFORE_SURROGATES) == [BEFORE_SURROGATES * 2]
@@ -0,0 +1,127 @@
+"""Query plans of crud.expense.query_expenses, the builder behind GET /expenses/query"""
+import itertools
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.crud.expense import EXPENSE_SORT_COLUMNS, query_expenses
+from app.database import Base
+from app.migrations import run_migrations
+
+FILTERS = {
+    "min_amount": 40.0,
+    "max_amount": 45.0,
+    "start": datetime(2024, 1, 1),
+    "end": datetime(2024, 2, 1),
+    "category_ids": [1, 2],
+    "prefix": "cof",
+}
+
+COMBINATIONS = [names for size in range(len(FILTERS) + 1) for names in itertools.combinations(FILTERS, size)]
+
+# A lone lower or upper bound keeps about half of the rows, so walking the
+# sort column's index under the LIMIT is the better plan for those
+SELECTIVE = [
+    names for names in COMBINATIONS
+    if {"category_ids", "prefix"} & set(names)
+    or {"min_amount", "max_amount"} <= set(names)
+    or {"start", "end"} <= set(names)
+]
+
+SEARCH = re.compile(r"^SEARCH expenses USING (?:COVERING )?INDEX (ix_expenses_user_id\w*) \((user_id=\?.*)\)$")
+
+WORDS = ("Coffee", "Groceries", "Rent", "Fuel", "Cinema", "Books", "Taxi", "Lunch", "Dinner", "Gym")
+
+def open_database(path) -> Session:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    return Session(engine)
+
+@pytest.fixture(scope="module")
+def fresh_db(tmp_path_factory):
+    """Empty and never analyzed, as a new deployment starts out"""
+    db = open_database(tmp_path_factory.mktemp("plans") / "fresh.db")
+    yield db
+    db.close()
+    db.get_bind().dispose()
+
+@pytest.fixture(scope="module")
+def analyzed_db(tmp_path_factory):
+    """20 users with 20 categories and 500 expenses over a year each, with ANALYZE statistics"""
+    db = open_database(tmp_path_factory.mktemp("plans") / "analyzed.db")
+    users, categories, expenses = 20, 20, 500
+    first_day = datetime(2023, 7, 1)
+    with db.get_bind().begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, email, username, hashed_password, monthly_income, data_version) VALUES (?, ?, ?, 'x', 0, 0)",
+            [(user, f"user{user}@example.com", f"user{user}") for user in range(1, users + 1)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO categories (id, name, user_id) VALUES (?, ?, ?)",
+            [((user - 1) * categories + i + 1, f"Category {i}", user) for user in range(1, users + 1) for i in range(categories)]
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO expenses (description, amount, date, category_id, user_id) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    f"{WORDS[i * 7 % len(WORDS)]} {i}", (i * 13) % 100 + 0.5,
+                    (first_day + timedelta(days=i * 365 / expenses)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+                    (user - 1) * categories + i % categories + 1, user
+                )
+                for user in range(1, users + 1) for i in range(expenses)
+            ]
+        )
+        conn.exec_driver_sql("ANALYZE")
+    yield db
+    db.close()
+    db.get_bind().dispose()
+
+def query_plan(db, **kwargs) -> list:
+    """EXPLAIN QUERY PLAN lines of the statement query_expenses sends, with its own parameters"""
+    sent = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        sent.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        query_expenses(db, 1, **kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    statement, parameters = sent[-1]
+    return [row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+def expenses_access(plan: list) -> re.Match:
+    accesses = [line for line in plan if line.startswith(("SEARCH", "SCAN"))]
+    assert len(accesses) == 1, plan
+    match = SEARCH.match(accesses[0])
+    assert match, plan
+    return match
+
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("sort", list(EXPENSE_SORT_COLUMNS))
+@pytest.mark.parametrize("names", COMBINATIONS, ids=lambda names: "+".join(names) or "none")
+def test_every_filter_combination_searches_a_user_index(fresh_db, analyzed_db, names, sort, descending):
+    filters = {name: FILTERS[name] for name in names}
+    for db in (fresh_db, analyzed_db):
+        expenses_access(query_plan(db, sort=sort, descending=descending, **filters))
+
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("sort", list(EXPENSE_SORT_COLUMNS))
+@pytest.mark.parametrize("names", SELECTIVE, ids=lambda names: "+".join(names))
+def test_selective_filters_narrow_the_index_range(analyzed_db, names, sort, descending):
+    plan = query_plan(analyzed_db, sort=sort, descending=descending, **{name: FILTERS[name] for name in names})
+
+    assert expenses_access(plan).group(2) != "user_id=?", plan
+
+@pytest.mark.parametrize("descending", [True, False])
+@pytest.mark.parametrize("sort", list(EXPENSE_SORT_COLUMNS))
+def test_unfiltered_query_reads_rows_in_sort_order(fresh_db, analyzed_db, sort, descending):
+    index = {"date": "ix_expenses_user_id_date", "amount": "ix_expenses_user_id_amount", "description": "ix_expenses_user_id_description"}[sort]
+    for db in (fresh_db, analyzed_db):
+        assert query_plan(db, sort=sort, descending=descending) == [f"SEARCH expenses USING INDEX {index} (user_id=?)"]
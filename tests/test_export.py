@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+
+import pytest
+
+@pytest.fixture
+def exported(client, headers, register):
+    """Three expenses around March 2024, one with a description that needs quoting"""
+    food = client.post("/categories/", json={"name": "Food, \"fresh\""}, headers=headers).json()["id"]
+    response = client.post("/expenses/bulk", json=[
+        {"description": "Late dinner", "amount": 75.0, "category_id": food, "date": "2024-03-31T23:59:59"},
+        {"description": 'Market, "organic"\nveg', "amount": 12.5, "category_id": food, "date": "2024-03-01T00:00:00"},
+        {"description": "Last of February", "amount": 3.0, "category_id": food, "date": "2024-02-29T23:00:00"},
+        {"description": "April fool", "amount": 1.0, "category_id": food, "date": "2024-04-01T00:00:00"},
+    ], headers=headers)
+    assert response.json()["created"] == 4, response.text
+    # Someone else's expense on the same day is never exported
+    other = register()
+    theirs = client.post("/categories/", json={"name": "Theirs"}, headers=other).json()["id"]
+    client.post("/expenses/bulk", json=[
+        {"description": "Not mine", "amount": 9.0, "category_id": theirs, "date": "2024-03-15T12:00:00"}
+    ], headers=other)
+    return {"headers": headers, "food": food}
+
+def test_csv_header_and_escaping(client, exported):
+    response = client.get("/expenses/export", headers=exported["headers"])
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="expenses.csv"'
+
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "date", "description", "amount", "category_id", "category"]
+    # Oldest first; commas, quotes and newlines survive the round trip
+    assert [(row[1], row[2], row[3], row[5]) for row in rows[1:]] == [
+        ("2024-02-29T23:00:00", "Last of February", "3.0", 'Food, "fresh"'),
+        ("2024-03-01T00:00:00", 'Market, "organic"\nveg', "12.5", 'Food, "fresh"'),
+        ("2024-03-31T23:59:59", "Late dinner", "75.0", 'Food, "fresh"'),
+        ("2024-04-01T00:00:00", "April fool", "1.0", 'Food, "fresh"'),
+    ]
+    assert {row[4] for row in rows[1:]} == {str(exported["food"])}
+    assert '"Market, ""organic""\nveg"' in response.text
+
+def test_ndjson_lines_parse(client, exported):
+    response = client.get("/expenses/export", params={"format": "ndjson"}, headers=exported["headers"])
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = response.text.splitlines()
+    assert len(lines) == 4
+    records = [json.loads(line) for line in lines]
+    assert list(records[1]) == ["id", "date", "description", "amount", "category_id", "category"]
+    assert records[1]["description"] == 'Market, "organic"\nveg'
+    assert records[1]["amount"] == 12.5
+    assert records[1]["category_id"] == exported["food"]
+    assert [record["date"] for record in records] == sorted(record["date"] for record in records)
+
+@pytest.mark.parametrize("params, descriptions", [
+    ({"from": "2024-03-01", "to": "2024-03-31"}, ['Market, "organic"\nveg', "Late dinner"]),
+    ({"from": "2024-03-31", "to": "2024-03-31"}, ["Late dinner"]),
+    ({"from": "2024-04-01"}, ["April fool"]),
+    ({"to": "2024-02-29"}, ["Last of February"]),
+])
+def test_date_range_is_inclusive(client, exported, params, descriptions):
+    response = client.get("/expenses/export", params={"format": "ndjson", **params}, headers=exported["headers"])
+    assert response.status_code == 200
+    assert [json.loads(line)["description"] for line in response.text.splitlines()] == descriptions
+
+def test_empty_export_is_just_the_header(client, headers):
+    response = client.get("/expenses/export", headers=headers)
+    assert response.text.splitlines() == ["id,date,description,amount,category_id,category"]
+    assert client.get("/expenses/export", params={"format": "ndjson"}, headers=headers).text == ""
+
+@pytest.mark.parametrize("params", [
+    {"format": "xlsx"},
+    {"format": "CSV"},
+    {"from": "2024-03-02", "to": "2024-03-01"},
+])
+def test_bad_requests_are_rejected(client, headers, params):
+    assert client.get("/expenses/export", params=params, headers=headers).status_code == 400
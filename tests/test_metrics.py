@@ -0,0 +1,74 @@
+import re
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+def scrape(client) -> dict:
+    """{(name, labels): value} of every sample on /metrics"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    samples = {}
+    for line in response.text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        samples[(name, frozenset(re.findall(r'(\w+)="([^"]*)"', labels or "")))] = float(value)
+    return samples
+
+def sample(samples: dict, name: str, **labels) -> float:
+    return samples.get((name, frozenset(labels.items())), 0.0)
+
+def test_requests_are_counted_by_route_template_and_status(client, headers):
+    category_id = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    before = scrape(client)
+
+    client.get("/categories/", headers=headers)
+    client.get("/categories/", headers=headers)
+    client.get(f"/categories/{category_id}", headers=headers)
+    client.get("/expenses/999999999", headers=headers)
+    client.get("/no-such-route")
+
+    after = scrape(client)
+    def delta(name, **labels):
+        return sample(after, name, **labels) - sample(before, name, **labels)
+
+    assert delta("http_requests_total", method="GET", route="/categories/", status="200") == 2
+    assert delta("http_requests_total", method="GET", route="/categories/{category_id}", status="200") == 1
+    assert delta("http_requests_total", method="GET", route="/expenses/{expense_id}", status="404") == 1
+    assert delta("http_requests_total", method="GET", route="unmatched", status="404") == 1
+
+def test_latency_and_statements_are_observed_per_request(client, headers):
+    before = scrape(client)
+
+    client.get("/categories/", headers=headers)
+    client.post("/categories/", json={"name": "Rent"}, headers=headers)
+    client.get("/no-such-route")
+
+    after = scrape(client)
+    def delta(name, **labels):
+        return sample(after, name, **labels) - sample(before, name, **labels)
+
+    for method in ("GET", "POST"):
+        route = {"method": method, "route": "/categories/"}
+        assert delta("http_request_duration_seconds_count", **route) == 1
+        assert delta("http_request_duration_seconds_bucket", le="+Inf", **route) == 1
+        assert delta("http_request_duration_seconds_sum", **route) > 0
+        assert delta("db_queries_per_request_count", **route) == 1
+        assert delta("db_queries_per_request_sum", **route) >= 1
+        assert delta("db_query_seconds_per_request_sum", **route) > 0
+    # The write runs the insert and the data_version bump, at least
+    assert delta("db_queries_per_request_sum", method="POST", route="/categories/") >= 2
+
+    # No database work for a request that matched no route
+    unmatched = {"method": "GET", "route": "unmatched"}
+    assert delta("db_queries_per_request_count", **unmatched) == 1
+    assert delta("db_queries_per_request_sum", **unmatched) == 0
+    assert delta("db_queries_per_request_bucket", le="0", **unmatched) == 1
+
+def test_pool_checkouts_are_counted(client, headers):
+    before = scrape(client)
+    client.get("/categories/", headers=headers)
+    after = scrape(client)
+
+    assert sample(after, "db_pool_checkouts_total") > sample(before, "db_pool_checkouts_total")
+    assert sample(after, "db_pool_checkout_wait_seconds_count") == sample(after, "db_pool_checkouts_total")
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.crud.monthly_total import verify_monthly_totals
+from app.database import Base, SessionLocal
+from app.migrations import run_migrations
+
+def test_migration_backfills_rollup_from_existing_expenses(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/existing.db")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    # Expenses written before the rollup existed, and the backfill not yet run
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, username, hashed_password, monthly_income) VALUES (1, 'a@example.com', 'a', 'x', 0)"))
+        conn.execute(text("INSERT INTO categories (id, name, user_id) VALUES (1, 'Food', 1), (2, 'Rent', 1)"))
+        conn.execute(text(
+            "INSERT INTO expenses (description, amount, date, category_id, user_id) VALUES "
+            "('a', 10, :march, 1, 1), ('b', 5.5, :march, 1, 1), ('c', 700, :march, 2, 1), ('d', 3, :april, 1, 1)"
+        ), {"march": datetime(2024, 3, 31, 23, 59), "april": datetime(2024, 4, 1)})
+        conn.execute(text("DELETE FROM schema_migrations WHERE id = '0007_monthly_totals_backfill'"))
+
+    assert run_migrations(engine) == ["0007_monthly_totals_backfill"]
+
+    with Session(engine) as db:
+        assert verify_monthly_totals(db) == []
+        rows = db.execute(text("SELECT category_id, month, total, count FROM monthly_category_totals ORDER BY month, category_id")).all()
+    assert [tuple(row) for row in rows] == [(1, "2024-03", 15.5, 2), (2, "2024-03", 700.0, 1), (1, "2024-04", 3.0, 1)]
+    engine.dispose()
+
+def test_expense_writes_keep_rollup_in_step(client, headers):
+    food = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    rent = client.post("/categories/", json={"name": "Rent"}, headers=headers).json()["id"]
+    first = client.post("/expenses/", json={"description": "a", "amount": 10, "category_id": food}, headers=headers).json()
+    second = client.post("/expenses/", json={"description": "b", "amount": 20, "category_id": food}, headers=headers).json()
+    client.put(f"/expenses/{first['id']}", json={"category_id": rent, "amount": 12.5}, headers=headers)
+    client.delete(f"/expenses/{second['id']}", headers=headers)
+
+    with SessionLocal() as db:
+        assert verify_monthly_totals(db, first["user_id"]) == []
+    now = datetime.utcnow()
+    report = client.get(f"/expenses/report/{now.year}/{now.month}", headers=headers).json()
+    assert report["by_category"] == {"Rent": 12.5}
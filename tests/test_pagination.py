@@ -0,0 +1,37 @@
+import pytest
+
+from app.utils.pagination import decode_id_cursor, page
+
+def test_page_splits_off_the_extra_row():
+    rows = [{"id": 1}, {"id": 2}, {"id": 3}]
+    items, cursor = page(rows, 2, lambda row: (row["id"],))
+    assert items == rows[:2]
+    assert decode_id_cursor(cursor) == 2
+    assert page(rows, 3, lambda row: (row["id"],)) == (rows, None)
+
+def test_page_of_nothing_has_no_cursor():
+    assert page([], 0, lambda row: (row["id"],)) == ([], None)
+    assert page([{"id": 1}], 0, lambda row: (row["id"],)) == ([], None)
+
+@pytest.mark.parametrize("url", ["/expenses/", "/categories/", "/budgets/", "/expenses/category/{category_id}"])
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": 0, "cursor": ""}, {"limit": 501}, {"skip": -1}])
+def test_list_limits_are_validated(client, headers, url, params):
+    category_id = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    response = client.get(url.format(category_id=category_id), params=params, headers=headers)
+    assert response.status_code == 422
+
+def test_keyset_pages_cover_every_expense(client, headers):
+    category_id = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    created = client.post("/expenses/bulk", json=[
+        {"description": f"e{i}", "amount": i + 1, "category_id": category_id, "date": f"2023-01-{i % 28 + 1:02d}T12:00:00"}
+        for i in range(7)
+    ], headers=headers)
+    assert created.status_code == 200, created.text
+
+    seen, cursor = [], ""
+    while cursor is not None:
+        body = client.get("/expenses/", params={"limit": 3, "cursor": cursor}, headers=headers).json()
+        assert len(body["items"]) <= 3
+        seen.extend(item["id"] for item in body["items"])
+        cursor = body["next_cursor"]
+    assert len(seen) == len(set(seen)) == 7
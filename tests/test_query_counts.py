@@ -0,0 +1,95 @@
+"""Statement budgets for the main endpoints.
+
+Each request runs against a user with several categories, budgets and
+expenses, so a per-row query would blow the budget. The principal is
+cached by a first request, as it would be for any client after its first
+call; the counts are the endpoint's own work.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.query_tracker import assert_max_queries
+
+@pytest.fixture
+def data(client, headers):
+    now = datetime.utcnow()
+    month = now.strftime("%Y-%m")
+    category_ids = [client.post("/categories/", json={"name": f"Category {i}"}, headers=headers).json()["id"] for i in range(5)]
+    budget_ids = [
+        client.post("/budgets/", json={"category_id": category_id, "amount": 100.0, "month": month}, headers=headers).json()["id"]
+        for category_id in category_ids
+    ]
+    client.post("/expenses/bulk", json=[
+        {"description": f"Expense {i}", "amount": 1 + i, "category_id": category_ids[i % 5], "date": now.replace(day=1).isoformat()}
+        for i in range(40)
+    ], headers=headers)
+    expense_id = client.get("/expenses/", params={"limit": 1}, headers=headers).json()[0]["id"]
+    client.get("/users/me", headers=headers)
+    return {
+        "headers": headers, "now": now, "month": month,
+        "category_ids": category_ids, "budget_ids": budget_ids, "expense_id": expense_id,
+    }
+
+READS = [
+    ("/categories/", 2),
+    ("/categories/?cursor=", 2),
+    ("/categories/{category_id}", 1),
+    ("/budgets/", 2),
+    ("/budgets/?cursor=", 2),
+    ("/budgets/summary", 2),
+    ("/budgets/summary?from=2020-01&to={month}", 2),
+    ("/budgets/{budget_id}", 1),
+    ("/expenses/", 2),
+    ("/expenses/?cursor=", 2),
+    ("/expenses/{expense_id}", 1),
+    ("/expenses/category/{category_id}", 3),
+    ("/expenses/month/{year}/{month_number}", 2),
+    ("/expenses/query?min_amount=2&category_id={category_id}&prefix=exp", 2),
+    ("/expenses/search?q=expense", 2),
+    ("/expenses/report/{year}/{month_number}", 1),
+    ("/expenses/report/{year}", 1),
+    ("/expenses/timeseries?granularity=week", 1),
+    ("/expenses/export", 1),
+    ("/dashboard/", 3),
+    ("/sync", 4),
+    ("/users/me", 0),
+]
+
+@pytest.mark.parametrize("url,budget", READS, ids=[url for url, _ in READS])
+def test_read_query_budget(client, data, url, budget):
+    url = url.format(
+        category_id=data["category_ids"][0], budget_id=data["budget_ids"][0], expense_id=data["expense_id"],
+        month=data["month"], year=data["now"].year, month_number=data["now"].month
+    )
+    with assert_max_queries(budget):
+        response = client.get(url, headers=data["headers"])
+    assert response.status_code == 200, response.text
+
+def test_expense_write_query_budgets(client, data):
+    headers, category_ids = data["headers"], data["category_ids"]
+    # Includes the SAVEPOINT and RELEASE around the budget alert
+    with assert_max_queries(11):
+        created = client.post("/expenses/", json={"description": "Coffee", "amount": 1, "category_id": category_ids[0]}, headers=headers)
+    assert created.status_code == 201
+    expense_id = created.json()["id"]
+    with assert_max_queries(7):
+        assert client.put(f"/expenses/{expense_id}", json={"amount": 2, "category_id": category_ids[1]}, headers=headers).status_code == 200
+    with assert_max_queries(6):
+        assert client.delete(f"/expenses/{expense_id}", headers=headers).status_code == 204
+
+@pytest.mark.parametrize("rows", [10, 500])
+def test_bulk_import_query_count_does_not_grow_with_rows(client, data, rows):
+    category_ids = data["category_ids"]
+    with assert_max_queries(11):
+        response = client.post("/expenses/bulk", json=[
+            {"description": f"Imported {i}", "amount": 1, "category_id": category_ids[i % 5]} for i in range(rows)
+        ], headers=data["headers"])
+    assert response.status_code == 200, response.text
+
+def test_category_write_query_budgets(client, data):
+    headers = data["headers"]
+    with assert_max_queries(4):
+        assert client.post("/categories/", json={"name": "New"}, headers=headers).status_code == 201
+    with assert_max_queries(4):
+        assert client.delete(f"/categories/{data['category_ids'][-1]}", headers=headers).status_code == 204
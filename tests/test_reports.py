@@ -0,0 +1,54 @@
+import pytest
+
+@pytest.fixture
+def seeded(client, headers):
+    food = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    rent = client.post("/categories/", json={"name": "Rent"}, headers=headers).json()["id"]
+    response = client.post("/expenses/bulk", json=[
+        {"description": "lunch", "amount": 12.5, "category_id": food, "date": "2023-01-31T23:59:59"},
+        {"description": "dinner", "amount": 30, "category_id": food, "date": "2023-02-01T00:00:00"},
+        {"description": "february", "amount": 800, "category_id": rent, "date": "2023-02-03T09:00:00"},
+        {"description": "april", "amount": 800, "category_id": rent, "date": "2023-04-03T09:00:00"},
+        {"description": "next year", "amount": 5, "category_id": food, "date": "2024-01-01T00:00:00"},
+    ], headers=headers)
+    assert response.status_code == 200, response.text
+    return headers
+
+def test_monthly_report(client, seeded):
+    report = client.get("/expenses/report/2023/2", headers=seeded).json()
+    assert report["month"] == "2023-02"
+    assert report["total_expenses"] == 2
+    assert report["by_category"] == {"Food": 30.0, "Rent": 800.0}
+    assert report["by_month"] == {"2023-02": 830.0}
+    assert report["savings"] == 1000.0 - 830.0
+
+def test_quarterly_yearly_and_range_reports(client, seeded):
+    quarter = client.get("/expenses/report/2023/quarter/1", headers=seeded).json()
+    assert quarter["quarter"] == "2023-Q1"
+    assert quarter["by_month"] == {"2023-01": 12.5, "2023-02": 830.0, "2023-03": 0}
+    assert quarter["income"] == 3000.0
+
+    year = client.get("/expenses/report/2023", headers=seeded).json()
+    assert year["total_spent"] == 1642.5
+    assert len(year["by_month"]) == 12
+
+    span = client.get("/expenses/report", params={"from": "2023-01-31", "to": "2023-02-01"}, headers=seeded).json()
+    assert span["by_category"] == {"Food": 42.5}
+    assert span["to"] == "2023-02-01"
+
+@pytest.mark.parametrize("url", [
+    "/expenses/report/99999",
+    "/expenses/report/0",
+    "/expenses/report/9999/quarter/4",
+    "/expenses/report/0/1",
+    "/expenses/report/9999/12",
+    "/expenses/month/9999/12",
+])
+def test_out_of_range_years_are_rejected(client, headers, url):
+    assert client.get(url, headers=headers).status_code == 422
+
+def test_invalid_periods_are_rejected(client, headers):
+    assert client.get("/expenses/report/2023/13", headers=headers).status_code == 400
+    assert client.get("/expenses/report/2023/quarter/5", headers=headers).status_code == 400
+    assert client.get("/expenses/report", params={"from": "2023-02-01", "to": "2023-01-01"}, headers=headers).status_code == 400
+    assert client.get("/expenses/report", params={"from": "9999-01-01", "to": "9999-12-31"}, headers=headers).status_code == 400
@@ -0,0 +1,178 @@
+import fnmatch
+from datetime import datetime
+
+from app.config import settings
+from app.result_cache import BUDGET_SUMMARY, EXPENSE_REPORT, LRUBackend, RedisBackend, ResultCache
+
+class Clock:
+    def __init__(self, when: datetime):
+        self.now = when.timestamp()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+def lru_cache(clock, ttl: float = 300.0, closed_ttl: float = 3600.0, **kwargs) -> ResultCache:
+    return ResultCache(LRUBackend(100, clock), ttl, closed_ttl, clock, **kwargs)
+
+class DictRedis:
+    """The part of redis-py RedisBackend uses, on a dict"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.values = {}
+
+    def get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.clock():
+            del self.values[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.values[key] = (value, self.clock() + ex if ex is not None else None)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key for key in list(self.values) if fnmatch.fnmatchcase(key, match)]
+
+def test_closed_months_expire_by_default():
+    assert settings.RESULT_CACHE_CLOSED_TTL is not None
+    clock = Clock(datetime(2024, 3, 15))
+    cache = lru_cache(clock, closed_ttl=settings.RESULT_CACHE_CLOSED_TTL)
+
+    cache.put(1, EXPENSE_REPORT, "2024-02", {"total": 1}, cache.ticket())
+    clock.advance(settings.RESULT_CACHE_CLOSED_TTL - 1)
+    assert cache.get(1, EXPENSE_REPORT, "2024-02") == {"total": 1}
+    clock.advance(1)
+    assert cache.get(1, EXPENSE_REPORT, "2024-02") is None
+
+def test_put_racing_an_invalidation_is_dropped():
+    cache = lru_cache(Clock(datetime(2024, 3, 15)))
+
+    # A request reads the database, then a write to the same month commits
+    ticket = cache.ticket()
+    cache.invalidate(1, ["2024-03"])
+    cache.put(1, BUDGET_SUMMARY, "2024-03", ["before the write"], ticket)
+    assert cache.get(1, BUDGET_SUMMARY, "2024-03") is None
+    assert cache.stats()["stale_puts"] == 1
+
+    # Other users and months are unaffected, and a fresh read is cached
+    cache.put(2, BUDGET_SUMMARY, "2024-03", ["other user"], ticket)
+    cache.put(1, BUDGET_SUMMARY, "2024-02", ["other month"], ticket)
+    cache.put(1, BUDGET_SUMMARY, "2024-03", ["after the write"], cache.ticket())
+    assert cache.get(2, BUDGET_SUMMARY, "2024-03") == ["other user"]
+    assert cache.get(1, BUDGET_SUMMARY, "2024-02") == ["other month"]
+    assert cache.get(1, BUDGET_SUMMARY, "2024-03") == ["after the write"]
+
+def test_put_racing_user_and_month_invalidations_is_dropped():
+    cache = lru_cache(Clock(datetime(2024, 3, 15)))
+
+    ticket = cache.ticket()
+    cache.invalidate_user(1)
+    cache.put(1, EXPENSE_REPORT, "2023-12", {"total": 1}, ticket)
+    ticket = cache.ticket()
+    cache.invalidate_month("2024-03", [BUDGET_SUMMARY])
+    cache.put(7, BUDGET_SUMMARY, "2024-03", ["stale"], ticket)
+
+    assert cache.get(1, EXPENSE_REPORT, "2023-12") is None
+    assert cache.get(7, BUDGET_SUMMARY, "2024-03") is None
+    assert cache.stats()["stale_puts"] == 2
+
+def test_tickets_older_than_remembered_invalidations_are_dropped():
+    cache = lru_cache(Clock(datetime(2024, 3, 15)), max_invalidations=2)
+
+    ticket = cache.ticket()
+    for user_id in (1, 2, 3):
+        cache.invalidate(user_id, ["2024-03"])
+    # User 4 was never invalidated, but the ticket predates what is remembered
+    cache.put(4, BUDGET_SUMMARY, "2024-03", ["maybe stale"], ticket)
+    assert cache.get(4, BUDGET_SUMMARY, "2024-03") is None
+
+def test_version_mismatch_is_a_miss():
+    cache = lru_cache(Clock(datetime(2024, 3, 15)))
+
+    cache.put(1, BUDGET_SUMMARY, "2024-03", ["v3"], cache.ticket(), version=3)
+    assert cache.get(1, BUDGET_SUMMARY, "2024-03", version=3) == ["v3"]
+    assert cache.get(1, BUDGET_SUMMARY, "2024-03", version=4) is None
+
+def test_month_rollover():
+    clock = Clock(datetime(2024, 1, 31, 23, 58))
+    cache = lru_cache(clock, ttl=300.0, closed_ttl=3600.0)
+
+    # Cached while January was current: keeps the short TTL past midnight
+    cache.put(1, EXPENSE_REPORT, "2024-01", {"total": 1}, cache.ticket())
+    clock.advance(240)
+    assert cache.current_month() == "2024-02"
+    assert cache.get(1, EXPENSE_REPORT, "2024-01") == {"total": 1}
+    clock.advance(60)
+    assert cache.get(1, EXPENSE_REPORT, "2024-01") is None
+
+    # Cached once January is over: the closed TTL
+    cache.put(1, EXPENSE_REPORT, "2024-01", {"total": 2}, cache.ticket())
+    clock.advance(3599)
+    assert cache.get(1, EXPENSE_REPORT, "2024-01") == {"total": 2}
+    clock.advance(1)
+    assert cache.get(1, EXPENSE_REPORT, "2024-01") is None
+
+def test_redis_backend_shares_entries_and_invalidations():
+    clock = Clock(datetime(2024, 3, 15))
+    client = DictRedis(clock)
+    # Two workers on one redis
+    first, second = (ResultCache(RedisBackend(client), 300.0, 3600.0, clock) for _ in range(2))
+
+    first.put(1, BUDGET_SUMMARY, "2024-03", [{"spent": 1.5}], first.ticket(), version=2)
+    first.put(1, EXPENSE_REPORT, "2024-02", {"total": 9}, first.ticket())
+    first.put(2, EXPENSE_REPORT, "2024-02", {"total": 4}, first.ticket())
+    assert second.get(1, BUDGET_SUMMARY, "2024-03", version=2) == [{"spent": 1.5}]
+    assert second.get(1, BUDGET_SUMMARY, "2024-03", version=3) is None
+
+    second.invalidate(1, ["2024-02"])
+    assert first.get(1, EXPENSE_REPORT, "2024-02") is None
+    assert first.get(2, EXPENSE_REPORT, "2024-02") == {"total": 4}
+
+    second.invalidate_month("2024-02", [EXPENSE_REPORT])
+    second.invalidate_user(1)
+    assert client.values == {}
+
+    first.put(1, BUDGET_SUMMARY, "2024-03", [], first.ticket())
+    clock.advance(300)
+    assert second.get(1, BUDGET_SUMMARY, "2024-03") is None
+
+def monthly_report(client, headers, when: datetime) -> dict:
+    response = client.get(f"/expenses/report/{when.year}/{when.month}", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_reads_after_a_write_are_fresh(client, headers):
+    category_id = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    now = datetime.utcnow()
+    month = now.strftime("%Y-%m")
+    client.post("/budgets/", json={"category_id": category_id, "amount": 100.0, "month": month}, headers=headers)
+    expense = client.post("/expenses/", json={"description": "Lunch", "amount": 10.0, "category_id": category_id}, headers=headers).json()
+
+    assert monthly_report(client, headers, now)["total_spent"] == 10.0
+    assert client.get("/budgets/summary", headers=headers).json()[0]["spent"] == 10.0
+
+    client.put(f"/expenses/{expense['id']}", json={"amount": 25.0}, headers=headers)
+    assert monthly_report(client, headers, now)["total_spent"] == 25.0
+    assert client.get("/budgets/summary", headers=headers).json()[0]["spent"] == 25.0
+
+    client.delete(f"/expenses/{expense['id']}", headers=headers)
+    assert monthly_report(client, headers, now)["total_spent"] == 0
+    assert client.get("/budgets/summary", headers=headers).json()[0]["spent"] == 0
+
+def test_closed_month_report_is_fresh_after_an_import(client, headers):
+    category_id = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    past = datetime(2023, 5, 10)
+
+    assert monthly_report(client, headers, past)["total_spent"] == 0
+    response = client.post("/expenses/bulk", json=[
+        {"description": "Old", "amount": 12.0, "category_id": category_id, "date": past.isoformat()}
+    ], headers=headers)
+    assert response.json()["created"] == 1, response.text
+    assert monthly_report(client, headers, past)["total_spent"] == 12.0
@@ -0,0 +1,123 @@
+import pytest
+
+from app.crud.expense_search import search_terms
+
+@pytest.fixture
+def food(client, headers):
+    return client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+
+def add(client, headers, category_id, description, **fields) -> int:
+    response = client.post("/expenses/", json={"description": description, "amount": 5.0, "category_id": category_id, **fields}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def search(client, headers, q, **params) -> list:
+    response = client.get("/expenses/search", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def descriptions(client, headers, q, **params) -> list:
+    return [row["description"] for row in search(client, headers, q, **params)]
+
+def test_every_word_must_match_a_word_start(client, headers, food):
+    for description in ("Uber Eats", "Uber trip to the airport", "Cucumbers", "Eats & treats"):
+        add(client, headers, food, description)
+
+    assert sorted(descriptions(client, headers, "uber")) == ["Uber Eats", "Uber trip to the airport"]
+    assert descriptions(client, headers, "eats uber") == ["Uber Eats"]
+    assert descriptions(client, headers, "UBER ea") == ["Uber Eats"]
+    assert descriptions(client, headers, "uber taxi") == []
+    # Inside a word is not a match
+    assert descriptions(client, headers, "ber") == []
+    assert descriptions(client, headers, "cucumber") == ["Cucumbers"]
+
+def test_best_match_first(client, headers, food):
+    long = add(client, headers, food, "Coffee beans, milk, bread, eggs, butter and the rest of the weekly shop")
+    short = add(client, headers, food, "Coffee")
+    rows = search(client, headers, "coffee")
+
+    assert [row["id"] for row in rows] == [short, long]
+    assert rows[0]["rank"] > rows[1]["rank"]
+
+def test_filters_and_paging(client, headers, food):
+    rent = client.post("/categories/", json={"name": "Rent"}, headers=headers).json()["id"]
+    client.post("/expenses/bulk", json=[
+        {"description": "Market stall", "amount": 1.0, "category_id": food, "date": "2024-03-01T12:00:00"},
+        {"description": "Market rent", "amount": 2.0, "category_id": rent, "date": "2024-03-31T23:59:59"},
+        {"description": "Market day", "amount": 3.0, "category_id": food, "date": "2024-04-01T00:00:00"},
+    ], headers=headers)
+
+    assert sorted(descriptions(client, headers, "market", category_id=rent)) == ["Market rent"]
+    assert sorted(descriptions(client, headers, "market", **{"from": "2024-03-01", "to": "2024-03-31"})) == ["Market rent", "Market stall"]
+    pages = [descriptions(client, headers, "market", skip=skip, limit=2) for skip in (0, 2)]
+    assert [len(page) for page in pages] == [2, 1]
+    assert sorted(pages[0] + pages[1]) == ["Market day", "Market rent", "Market stall"]
+
+def test_new_expense_is_found_at_once(client, headers, food):
+    assert descriptions(client, headers, "sourdough") == []
+    expense_id = add(client, headers, food, "Sourdough loaf")
+    assert [row["id"] for row in search(client, headers, "sourdough")] == [expense_id]
+
+    client.post("/expenses/bulk", json=[{"description": "Sourdough starter", "amount": 2.0, "category_id": food}], headers=headers)
+    assert sorted(descriptions(client, headers, "sourdough")) == ["Sourdough loaf", "Sourdough starter"]
+
+def test_no_stale_hits_after_update_or_delete(client, headers, food):
+    expense_id = add(client, headers, food, "Pizza night")
+    assert client.put(f"/expenses/{expense_id}", json={"description": "Sushi night"}, headers=headers).status_code == 200
+    assert descriptions(client, headers, "pizza") == []
+    assert descriptions(client, headers, "sushi") == ["Sushi night"]
+
+    # Changing only the amount keeps the entry
+    client.put(f"/expenses/{expense_id}", json={"amount": 7.0}, headers=headers)
+    assert descriptions(client, headers, "sushi night") == ["Sushi night"]
+
+    assert client.delete(f"/expenses/{expense_id}", headers=headers).status_code == 204
+    assert descriptions(client, headers, "sushi") == []
+    assert descriptions(client, headers, "night") == []
+
+def test_deleted_category_leaves_no_hits(client, headers):
+    category_id = client.post("/categories/", json={"name": "Hobbies"}, headers=headers).json()["id"]
+    add(client, headers, category_id, "Climbing shoes")
+    assert client.delete(f"/categories/{category_id}", headers=headers).status_code == 204
+    assert descriptions(client, headers, "climbing") == []
+
+def test_other_users_expenses_are_never_found(client, headers, food, register):
+    add(client, headers, food, "Secret birthday present")
+    other = register()
+    assert descriptions(client, other, "secret birthday") == []
+    assert client.get("/expenses/search", params={"q": "secret", "category_id": food}, headers=other).status_code == 404
+
+def test_diacritics_and_case_are_ignored(client, headers, food):
+    add(client, headers, food, "Café Nero")
+    assert descriptions(client, headers, "cafe") == ["Café Nero"]
+    assert descriptions(client, headers, "CAFÉ NERO") == ["Café Nero"]
+
+@pytest.mark.parametrize("q", [
+    'uber"',
+    "uber*",
+    "uber OR",
+    "NEAR(uber",
+    "uber -eats",
+    "uber: eats^",
+    "{uber}",
+    "' OR 1=1 --",
+])
+def test_query_syntax_is_never_passed_through(client, headers, food, q):
+    add(client, headers, food, "Uber Eats")
+    response = client.get("/expenses/search", params={"q": q}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [row["description"] for row in response.json()] == (["Uber Eats"] if set(search_terms(q)) <= {"uber", "eats"} else [])
+
+@pytest.mark.parametrize("q, status", [
+    ("", 422),
+    ("x" * 201, 422),
+    ("   ", 400),
+    ("*", 400),
+    ('"" - ()', 400),
+])
+def test_empty_queries_are_rejected(client, headers, q, status):
+    assert client.get("/expenses/search", params={"q": q}, headers=headers).status_code == status
+
+def test_search_terms():
+    assert search_terms("Uber-Eats, 2x!") == ["uber", "eats", "2x"]
+    assert search_terms('"*()') == []
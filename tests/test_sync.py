@@ -0,0 +1,239 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.auth.jwt import create_access_token
+from app.crud import expense as crud_expense
+from app.database import Base, SyncDB, get_db
+from app.main import app
+from app.migrations import run_migrations
+from app.schemas.expense import ExpenseCreate
+from app.utils.pagination import decode_id_cursor
+
+def sync(client, headers, **params) -> dict:
+    response = client.get("/sync", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def live(page: dict, key: str) -> dict:
+    return {row["id"]: row for row in page[key]}
+
+def tombstones(page: dict) -> dict:
+    return {key: sorted(ids) for key, ids in page["deleted"].items() if ids}
+
+def drain(client, headers, since=None, limit=1000) -> list:
+    """Every page from `since` until has_more is off"""
+    pages = []
+    while True:
+        page = sync(client, headers, limit=limit, **({"since": since} if since else {}))
+        pages.append(page)
+        since = page["cursor"]
+        if not page["has_more"]:
+            return pages
+
+@pytest.fixture
+def synced(client, headers):
+    """A category with a budget and two expenses, and the cursor after them"""
+    food = client.post("/categories/", json={"name": "Food"}, headers=headers).json()
+    budget = client.post("/budgets/", json={"category_id": food["id"], "amount": 100.0, "month": "2024-03"}, headers=headers).json()
+    expenses = [
+        client.post("/expenses/", json={"description": description, "amount": 5.0, "category_id": food["id"]}, headers=headers).json()
+        for description in ("Lunch", "Dinner")
+    ]
+    return {"headers": headers, "food": food, "budget": budget, "expenses": expenses, "cursor": sync(client, headers)["cursor"]}
+
+def test_first_sync_returns_everything(client, synced):
+    page = sync(client, synced["headers"])
+    assert page["has_more"] is False
+    assert live(page, "categories") == {synced["food"]["id"]: synced["food"]}
+    assert list(live(page, "budgets")) == [synced["budget"]["id"]]
+    assert live(page, "expenses") == {expense["id"]: expense for expense in synced["expenses"]}
+    assert tombstones(page) == {}
+
+def test_deltas_since_a_cursor(client, synced):
+    headers, cursor = synced["headers"], synced["cursor"]
+    # Nothing new: an empty page that keeps the cursor
+    page = sync(client, headers, since=cursor)
+    assert (page["cursor"], page["has_more"], page["expenses"], page["categories"], page["budgets"]) == (cursor, False, [], [], [])
+
+    lunch = synced["expenses"][0]
+    client.put(f"/expenses/{lunch['id']}", json={"amount": 7.5}, headers=headers)
+    rent = client.post("/categories/", json={"name": "Rent"}, headers=headers).json()
+    page = sync(client, headers, since=cursor)
+    assert live(page, "expenses") == {lunch["id"]: {**lunch, "amount": 7.5}}
+    assert live(page, "categories") == {rent["id"]: rent}
+    assert page["budgets"] == []
+    assert decode_id_cursor(page["cursor"]) > decode_id_cursor(cursor)
+
+    # The new cursor only sees what comes after it
+    assert sync(client, headers, since=page["cursor"])["expenses"] == []
+
+def test_tombstones_for_each_entity(client, synced):
+    headers = synced["headers"]
+    lunch, dinner = synced["expenses"]
+    spare = client.post("/categories/", json={"name": "Spare"}, headers=headers).json()
+    cursor = sync(client, headers)["cursor"]
+
+    client.delete(f"/expenses/{lunch['id']}", headers=headers)
+    client.delete(f"/budgets/{synced['budget']['id']}", headers=headers)
+    client.delete(f"/categories/{spare['id']}", headers=headers)
+    page = sync(client, headers, since=cursor)
+
+    assert tombstones(page) == {"expenses": [lunch["id"]], "budgets": [synced["budget"]["id"]], "categories": [spare["id"]]}
+    assert page["expenses"] == page["budgets"] == page["categories"] == []
+    assert list(live(sync(client, headers), "expenses")) == [dinner["id"]]
+
+def test_created_then_deleted_is_only_a_tombstone(client, synced):
+    headers, cursor = synced["headers"], synced["cursor"]
+    expense = client.post("/expenses/", json={"description": "Oops", "amount": 1.0, "category_id": synced["food"]["id"]}, headers=headers).json()
+    client.delete(f"/expenses/{expense['id']}", headers=headers)
+
+    page = sync(client, headers, since=cursor)
+    assert page["expenses"] == []
+    assert tombstones(page) == {"expenses": [expense["id"]]}
+
+def test_category_delete_implies_its_children(client, synced):
+    headers, cursor = synced["headers"], synced["cursor"]
+    food_id = synced["food"]["id"]
+
+    # Children unchanged since the cursor: the category's tombstone stands for them
+    client.delete(f"/categories/{food_id}", headers=headers)
+    page = sync(client, headers, since=cursor)
+    assert tombstones(page) == {"categories": [food_id]}
+    assert page["expenses"] == page["budgets"] == []
+
+    # Children logged after an older cursor are never sent as live rows
+    page = sync(client, headers)
+    assert page["categories"] == page["expenses"] == page["budgets"] == []
+    assert tombstones(page) == {
+        "categories": [food_id],
+        "budgets": [synced["budget"]["id"]],
+        "expenses": sorted(expense["id"] for expense in synced["expenses"]),
+    }
+
+def test_bulk_writes_are_logged(client, synced):
+    headers, cursor = synced["headers"], synced["cursor"]
+    lunch, dinner = synced["expenses"]
+    rent = client.post("/categories/", json={"name": "Rent"}, headers=headers).json()
+    client.post("/expenses/bulk/recategorize", json={"ids": [lunch["id"]], "category_id": rent["id"]}, headers=headers)
+    client.post("/expenses/bulk/delete", json={"ids": [dinner["id"]]}, headers=headers)
+
+    page = sync(client, headers, since=cursor)
+    assert {expense_id: row["category_id"] for expense_id, row in live(page, "expenses").items()} == {lunch["id"]: rent["id"]}
+    assert tombstones(page) == {"expenses": [dinner["id"]]}
+
+def test_paging_advances_the_cursor(client, headers):
+    category_id = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    response = client.post("/expenses/bulk", json=[
+        {"description": f"Expense {i}", "amount": 1.0, "category_id": category_id} for i in range(7)
+    ], headers=headers)
+    assert response.json()["created"] == 7
+
+    pages = drain(client, headers, limit=3)
+    assert [page["has_more"] for page in pages] == [True, True, False]
+    assert [len(page["categories"]) + len(page["expenses"]) for page in pages] == [3, 3, 2]
+    positions = [decode_id_cursor(page["cursor"]) for page in pages]
+    assert positions == sorted(set(positions))
+    # Pages add up to a single full sync
+    full = sync(client, headers)
+    assert {row["id"] for page in pages for row in page["expenses"]} == set(live(full, "expenses"))
+    assert [row["id"] for page in pages for row in page["categories"]] == [category_id]
+
+    # Caught up: an empty page at the same position
+    last = sync(client, headers, since=pages[-1]["cursor"], limit=3)
+    assert (last["cursor"], last["has_more"], last["expenses"]) == (pages[-1]["cursor"], False, [])
+
+def test_an_entity_changed_twice_in_a_page_comes_once(client, synced):
+    headers, cursor = synced["headers"], synced["cursor"]
+    lunch = synced["expenses"][0]
+    for amount in (6.0, 7.0, 8.0):
+        client.put(f"/expenses/{lunch['id']}", json={"amount": amount}, headers=headers)
+
+    page = sync(client, headers, since=cursor)
+    assert [(row["id"], row["amount"]) for row in page["expenses"]] == [(lunch["id"], 8.0)]
+
+def test_other_users_changes_are_never_synced(client, synced, register):
+    other = register()
+    page = sync(client, other)
+    assert page["expenses"] == page["categories"] == page["budgets"] == []
+    assert tombstones(page) == {}
+
+    # Another user's cursor is only a position in this user's own log
+    client.delete(f"/categories/{synced['food']['id']}", headers=synced["headers"])
+    assert tombstones(sync(client, other, since=synced["cursor"])) == {}
+
+@pytest.mark.parametrize("params, status", [
+    ({"since": "not a cursor"}, 400),
+    ({"since": "WyJ4Il0"}, 400),
+    ({"limit": 0}, 422),
+    ({"limit": 1001}, 422),
+])
+def test_bad_requests(client, headers, params, status):
+    assert client.get("/sync", params=params, headers=headers).status_code == status
+
+@pytest.fixture
+def upgraded(baseline_engine):
+    """A baseline database with rows from before the change log, upgraded"""
+    with baseline_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, email, username, hashed_password, monthly_income) VALUES "
+            "(1, 'old@example.com', 'old', 'x', 0), (2, 'empty@example.com', 'empty', 'x', 0)"
+        ))
+        conn.execute(text("INSERT INTO categories (id, name, user_id) VALUES (10, 'Food', 1), (11, 'Rent', 1)"))
+        conn.execute(text("INSERT INTO budgets (id, category_id, user_id, amount, month) VALUES (20, 10, 1, 100, '2024-03')"))
+        conn.execute(text(
+            "INSERT INTO expenses (id, description, amount, date, category_id, user_id) VALUES "
+            "(30, 'Lunch', 10, :date, 10, 1), (31, 'Rent', 700, :date, 11, 1)"
+        ), {"date": datetime(2024, 3, 10)})
+    Base.metadata.create_all(bind=baseline_engine)
+    assert "0006_change_log_backfill" in run_migrations(baseline_engine)
+
+    async def get_upgraded_db():
+        db = SyncDB(Session(baseline_engine))
+        try:
+            yield db
+        finally:
+            await db.close()
+
+    app.dependency_overrides[get_db] = get_upgraded_db
+    try:
+        yield baseline_engine
+    finally:
+        app.dependency_overrides.clear()
+
+def bearer(username: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': username})}"}
+
+def test_backfilled_log_syncs_an_upgraded_database(upgraded):
+    client = TestClient(app)
+    headers = bearer("old")
+
+    # Parents come before children, and the user's data_version continues after them
+    with upgraded.connect() as conn:
+        log = conn.execute(text("SELECT change_seq, entity, entity_id FROM change_log WHERE user_id = 1 ORDER BY change_seq")).all()
+        assert [tuple(row) for row in log] == [
+            (1, "category", 10), (2, "category", 11), (3, "budget", 20), (4, "expense", 30), (5, "expense", 31)
+        ]
+        assert conn.execute(text("SELECT data_version FROM users WHERE id = 1")).scalar() == 5
+
+    pages = drain(client, headers, limit=2)
+    assert [page["has_more"] for page in pages] == [True, True, False]
+    assert [decode_id_cursor(page["cursor"]) for page in pages] == [2, 4, 5]
+    assert [row["id"] for page in pages for key in ("categories", "budgets", "expenses") for row in page[key]] == [10, 11, 20, 30, 31]
+    cursor = pages[-1]["cursor"]
+
+    # The first write after the upgrade lands after the backfill
+    with Session(upgraded) as db:
+        crud_expense.create_expense(db, ExpenseCreate(description="Coffee", amount=3.0, category_id=10), 1)
+        db.commit()
+    page = sync(client, headers, since=cursor)
+    assert decode_id_cursor(page["cursor"]) == 6
+    assert [row["description"] for row in page["expenses"]] == ["Coffee"]
+
+    # A user without rows starts with an empty log
+    page = sync(client, bearer("empty"))
+    assert decode_id_cursor(page["cursor"]) == 0
+    assert page["categories"] == page["expenses"] == page["budgets"] == []
@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.config import settings
+from app.utils.dates import bucket_count, buckets_between
+
+@pytest.fixture
+def spend(client, headers):
+    """Expenses on either side of day, week (Monday) and month boundaries"""
+    food = client.post("/categories/", json={"name": "Food"}, headers=headers).json()["id"]
+    rent = client.post("/categories/", json={"name": "Rent"}, headers=headers).json()["id"]
+    response = client.post("/expenses/bulk", json=[
+        {"description": "Before the range", "amount": 1.0, "category_id": food, "date": "2024-02-27T23:59:59"},
+        {"description": "Wednesday night", "amount": 2.0, "category_id": food, "date": "2024-02-28T23:59:59"},
+        {"description": "Leap day", "amount": 4.0, "category_id": rent, "date": "2024-02-29T00:00:00"},
+        {"description": "Sunday night", "amount": 8.0, "category_id": food, "date": "2024-03-03T23:59:59"},
+        {"description": "Monday morning", "amount": 16.0, "category_id": food, "date": "2024-03-04T00:00:00"},
+        {"description": "End of March", "amount": 32.0, "category_id": food, "date": "2024-03-31T23:59:59"},
+        {"description": "April", "amount": 64.0, "category_id": food, "date": "2024-04-01T00:00:00"},
+    ], headers=headers)
+    assert response.json()["created"] == 7, response.text
+    return {"headers": headers, "food": food, "rent": rent}
+
+def timeseries(client, headers, **params) -> dict:
+    response = client.get("/expenses/timeseries", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def totals(series: dict) -> list:
+    return [(bucket["start"], bucket["total"], bucket["count"], bucket["cumulative"]) for bucket in series["buckets"]]
+
+def test_days_are_zero_filled(client, spend):
+    series = timeseries(client, spend["headers"], granularity="day", **{"from": "2024-02-28", "to": "2024-03-04"})
+    assert totals(series) == [
+        ("2024-02-28", 2.0, 1, 2.0),
+        ("2024-02-29", 4.0, 1, 6.0),
+        ("2024-03-01", 0.0, 0, 6.0),
+        ("2024-03-02", 0.0, 0, 6.0),
+        ("2024-03-03", 8.0, 1, 14.0),
+        ("2024-03-04", 16.0, 1, 30.0),
+    ]
+    assert (series["from"], series["to"], series["total"], series["count"]) == ("2024-02-28", "2024-03-04", 30.0, 4)
+
+def test_weeks_start_on_monday(client, spend):
+    # The first bucket starts before `from`, but only counts from `from` on
+    series = timeseries(client, spend["headers"], granularity="week", **{"from": "2024-02-28", "to": "2024-03-31"})
+    assert totals(series) == [
+        ("2024-02-26", 14.0, 3, 14.0),
+        ("2024-03-04", 16.0, 1, 30.0),
+        ("2024-03-11", 0.0, 0, 30.0),
+        ("2024-03-18", 0.0, 0, 30.0),
+        ("2024-03-25", 32.0, 1, 62.0),
+    ]
+
+def test_months_include_their_last_second(client, spend):
+    series = timeseries(client, spend["headers"], granularity="month", **{"from": "2024-01-15", "to": "2024-04-30"})
+    assert totals(series) == [
+        ("2024-01-01", 0.0, 0, 0.0),
+        ("2024-02-01", 7.0, 3, 7.0),
+        ("2024-03-01", 56.0, 3, 63.0),
+        ("2024-04-01", 64.0, 1, 127.0),
+    ]
+
+def test_single_day_and_category_filter(client, spend):
+    series = timeseries(client, spend["headers"], **{"from": "2024-02-29", "to": "2024-02-29"})
+    assert totals(series) == [("2024-02-29", 4.0, 1, 4.0)]
+
+    series = timeseries(client, spend["headers"], granularity="month", category_id=spend["food"], **{"from": "2024-02-01", "to": "2024-02-29"})
+    assert series["category_id"] == spend["food"]
+    assert totals(series) == [("2024-02-01", 3.0, 2, 3.0)]
+
+def test_default_ranges_end_today(client, headers):
+    for granularity, count in (("day", 30), ("week", 12), ("month", 12)):
+        series = timeseries(client, headers, granularity=granularity)
+        assert len(series["buckets"]) == count
+        assert series["total"] == 0 and series["count"] == 0
+
+def test_other_users_spend_is_not_counted(client, spend, register):
+    series = timeseries(client, register(), granularity="month", **{"from": "2024-02-01", "to": "2024-04-30"})
+    assert series["total"] == 0.0
+    assert client.get("/expenses/timeseries", params={"category_id": spend["food"]}, headers=register()).status_code == 404
+
+def test_bucket_cap(client, headers):
+    limit = settings.TIMESERIES_MAX_BUCKETS
+    start = date(2020, 1, 1)
+    assert len(timeseries(client, headers, **{"from": start.isoformat(), "to": (start + timedelta(days=limit - 1)).isoformat()})["buckets"]) == limit
+
+    response = client.get("/expenses/timeseries", params={"from": start.isoformat(), "to": (start + timedelta(days=limit)).isoformat()}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Range spans more than {limit} day buckets"
+
+@pytest.mark.parametrize("params", [
+    {"from": "2024-03-02", "to": "2024-03-01"},
+    {"granularity": "day", "from": "0001-01-01", "to": "9999-01-01"},
+    {"granularity": "week", "from": "1900-01-01", "to": "2099-12-31"},
+    {"granularity": "month", "from": "1000-01-01", "to": "2024-12-31"},
+])
+def test_invalid_ranges_are_rejected(client, headers, params):
+    assert client.get("/expenses/timeseries", params=params, headers=headers).status_code == 400
+
+def test_unknown_granularity_is_rejected(client, headers):
+    assert client.get("/expenses/timeseries", params={"granularity": "hour"}, headers=headers).status_code == 422
+
+@pytest.mark.parametrize("granularity", ["day", "week", "month"])
+@pytest.mark.parametrize("start, end", [
+    (date(2024, 2, 28), date(2024, 2, 28)),
+    (date(2024, 2, 28), date(2024, 3, 4)),
+    (date(2023, 12, 31), date(2025, 1, 1)),
+    (date(2024, 3, 4), date(2024, 3, 10)),
+])
+def test_bucket_count_matches_buckets_between(granularity, start, end):
+    assert bucket_count(start, end, granularity) == len(buckets_between(start, end, granularity))
@@ -0,0 +1,80 @@
+"""UnitOfWorkRoute: a request's writes commit together, once, or not at all"""
+import pytest
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.api.auth import get_current_user
+from app.crud import category as crud_category
+from app.crud import expense as crud_expense
+from app.database import RequestDB, UnitOfWorkRoute, get_db
+from app.main import app
+from app.models.user import User
+from app.schemas.category import CategoryCreate
+from app.schemas.expense import ExpenseCreate
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+async def write_twice(fail: str, current_user: User, db: RequestDB) -> dict:
+    first = await db.run(crud_category.create_category, CategoryCreate(name="First"), current_user.id)
+    if fail == "http":
+        raise HTTPException(status_code=409, detail="Conflict")
+    if fail == "db":
+        # The category doesn't exist, so the foreign key fails the flush
+        await db.run(crud_expense.create_expense, ExpenseCreate(description="Orphan", amount=1.0, category_id=2**31 - 1), current_user.id)
+    else:
+        await db.run(crud_category.create_category, CategoryCreate(name="Second"), current_user.id)
+    return {"id": first.id}
+
+@router.post("/pair")
+async def post_pair(fail: str = None, current_user: User = Depends(get_current_user), db: RequestDB = Depends(get_db)):
+    return await write_twice(fail, current_user, db)
+
+@router.get("/pair")
+async def get_pair(current_user: User = Depends(get_current_user), db: RequestDB = Depends(get_db)):
+    return await write_twice(None, current_user, db)
+
+@pytest.fixture
+def uow_client(client):
+    """A client for a bare app with the routes above, on the same database handle as `client`"""
+    bare = FastAPI()
+    bare.include_router(router)
+    bare.dependency_overrides = dict(app.dependency_overrides)
+    return TestClient(bare, raise_server_exceptions=False)
+
+@pytest.fixture
+def commits():
+    count = []
+
+    def after_commit(session):
+        count.append(session)
+    event.listen(Session, "after_commit", after_commit)
+    yield count
+    event.remove(Session, "after_commit", after_commit)
+
+def category_names(client, headers) -> list:
+    return sorted(category["name"] for category in client.get("/categories/", headers=headers).json())
+
+def test_both_writes_commit_once(client, uow_client, headers, commits):
+    response = uow_client.post("/pair", headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(commits) == 1
+    assert category_names(client, headers) == ["First", "Second"]
+
+@pytest.mark.parametrize("fail, status", [("db", 500), ("http", 409)])
+def test_failure_after_the_first_write_persists_nothing(client, uow_client, headers, commits, fail, status):
+    response = uow_client.post("/pair", params={"fail": fail}, headers=headers)
+    assert response.status_code == status
+    assert commits == []
+    assert category_names(client, headers) == []
+    assert client.get("/expenses/", headers=headers).json() == []
+
+    # The connection went back to the pool clean; the next request works
+    assert uow_client.post("/pair", headers=headers).status_code == 200
+    assert category_names(client, headers) == ["First", "Second"]
+
+def test_safe_methods_are_never_committed(client, uow_client, headers, commits):
+    assert uow_client.get("/pair", headers=headers).status_code == 200
+    assert commits == []
+    assert category_names(client, headers) == []